@@ -0,0 +1,241 @@
+"""Deterministyczny czas dotarcia ognia - najkrótsze ścieżki zamiast losowych przebiegów.
+
+Prawdopodobieństwo zapłonu sąsiada w jednym kroku jest to samo co w RuleKernel.step:
+p = min(1, p_spread * paliwo * wiatr[kierunek]), z tymi samymi blokerami. Na froncie
+komórkę podpalają naraz sąsiedzi z trzech kierunków (jeśli mają paliwo), a płonąca
+komórka próbuje przez burn_steps() kroków - czas przejścia krawędzi to oczekiwany
+krok zapłonu pod warunkiem, że zapłon w ogóle nastąpi. Krawędzie zapalające się
+rzadziej niż min_chance są pomijane.
+
+Razem z czasem liczona jest szansa dotarcia najszybszą ścieżką - iloczyn szans jej
+krawędzi, każda podniesiona do potęgi REACH_EXPONENT (równoległe ścieżki frontu).
+Komórki z szansą poniżej MIN_REACH zostają bez czasu dotarcia, więc prognoza nie
+obejmuje miejsc, do których ogień zwykle nie dochodzi.
+
+To przybliżenie: prognoza pomija część komórek palących się w ponad połowie
+przebiegów (daleko od ognia, przy słabym rozprzestrzenianiu), średni błąd czasu
+to kilka do kilkunastu kroków.
+
+Każda krawędź trwa co najmniej jeden krok, więc Dijkstra może zamykać całe kubełki
+o szerokości 1 naraz (algorytm Diala) - jedna operacja NumPy na front zamiast kopca.
+"""
+import math
+
+import numpy as np
+
+from rasters import NOT_IGNITED
+from rules import DIRECTIONS, param_value, shifted
+
+FORECAST_HORIZON = 300  # Najdalszy prognozowany krok
+MIN_IGNITION_CHANCE = 0.1  # Szansa zapłonu w trakcie całego palenia, poniżej krawędź odpada
+# Ścieżka przez krawędzie, które rzadko się zapalają, w większości przebiegów nie powstaje -
+# czas takiej krawędzi dzielony przez chance ** CHANCE_EXPONENT (dobrane do średnich z przebiegów)
+CHANCE_EXPONENT = 0.5
+MIN_REACH = 0.5  # Szansa dotarcia, poniżej której komórka liczy się jako nieosiągnięta
+REACH_EXPONENT = 0.2  # Wykładnik szansy krawędzi w szansie dotarcia (dobrany do przebiegów)
+
+
+def _front_neighbors():
+    """Dla każdego kierunku dwa kierunki sąsiednie kątowo (indeksy w DIRECTIONS)"""
+    order = sorted(range(len(DIRECTIONS)), key=lambda k: math.atan2(DIRECTIONS[k][1], DIRECTIONS[k][0]))
+    neighbors = np.zeros((len(DIRECTIONS), 2), dtype=np.intp)
+    for position, k in enumerate(order):
+        neighbors[k] = order[position - 1], order[(position + 1) % len(order)]
+    return neighbors
+
+
+FRONT_NEIGHBORS = _front_neighbors()
+
+
+def burn_steps(kernel, params):
+    """Liczba kroków, w których świeżo zapalona komórka zapala sąsiadów"""
+    decay = param_value(params, kernel.table['burnout']['decay'])
+    steps = 0
+    intensity = 1.0
+    while intensity - decay > 0:
+        intensity -= decay
+        steps += 1
+    return max(steps, 1)
+
+
+def edge_travel_times(kernel, grid, params, min_chance=MIN_IGNITION_CHANCE):
+    """Czas przejścia do komórki z kierunku DIRECTIONS[k] (inf = brak krawędzi) i szansa zapłonu przez tę
+    krawędź - dwie tablice (8, wysokość * szerokość) float32"""
+    spread = kernel.table['spread']
+    p_spread = param_value(params, spread['probability'])
+    wind = kernel.spread_wind(params).astype(np.float64)
+    fuel_lut = np.where(kernel.burnable_lut, kernel.fuel_lut, 0).astype(np.float64)
+    has_fuel = fuel_lut[grid] > 0
+    targets = np.flatnonzero(has_fuel)
+    fuel = fuel_lut[grid.ravel()[targets]]
+    moisture = getattr(params, 'moisture', None)
+    if moisture is not None:
+        fuel = fuel * moisture.factor[targets]  # Wilgotność - tylko szansa zapłonu, burn_steps bez zmian
+    if wind.ndim > 1:
+        wind = wind[:, targets]  # Pole wiatru - mnożnik w komórce celu
+    steps = burn_steps(kernel, params)
+
+    # Szansa, że jedna płonąca komórka z kierunku k nie zapali celu w jednym kroku
+    single = [1.0 - np.minimum(1.0, p_spread * wind[k] * fuel) for k in range(len(DIRECTIONS))]
+
+    times = np.full((len(DIRECTIONS), grid.size), np.inf, dtype=np.float32)
+    chances = np.zeros((len(DIRECTIONS), grid.size), dtype=np.float32)
+    for k in range(len(DIRECTIONS)):
+        # Na froncie cel mają też płonący sąsiedzi w dwóch kierunkach obok k - o ile jest tam paliwo
+        q = single[k].copy()
+        for j in FRONT_NEIGHBORS[k]:
+            dx, dy = DIRECTIONS[j]
+            q *= np.where(shifted(has_fuel, dx, dy).ravel()[targets], single[j], 1.0)
+        q_steps = q ** steps
+        chance = 1.0 - q_steps
+        usable = chance >= min_chance
+        q, q_steps, chance = q[usable], q_steps[usable], chance[usable]
+        # E[T | T <= steps] dla rozkładu geometrycznego, wydłużone dla zawodnych krawędzi
+        expected = (1.0 - (steps + 1) * q_steps + steps * q_steps * q) / ((1.0 - q) * chance)
+        times[k, targets[usable]] = np.maximum(expected / chance ** CHANCE_EXPONENT, 1.0)
+        chances[k, targets[usable]] = chance
+    return times, chances
+
+
+def arrival_times(times, chances, sources, width, height, horizon=math.inf, min_reach=MIN_REACH):
+    """Czas dotarcia ognia (w krokach) do każdej komórki z płaskich indeksów sources.
+
+    times i chances - z edge_travel_times. Zwraca tablicę (wysokość, szerokość) float64;
+    inf - ogień nie dotrze, dotrze z szansą poniżej min_reach albo po horizon.
+    """
+    arrival = np.full(width * height, np.inf)
+    reach = np.zeros(width * height)
+    chances = chances ** REACH_EXPONENT
+    sources = np.unique(np.asarray(sources, dtype=np.intp))
+    arrival[sources] = 0.0
+    reach[sources] = 1.0
+    front = sources
+
+    while front.size:
+        front_times = arrival[front]
+        earliest = front_times.min()
+        if earliest > horizon:
+            break
+        # Krawędź trwa >= 1 krok - nic z frontu nie poprawi komórek sprzed earliest + 1
+        done = front_times < earliest + 1.0
+        batch = front[done]
+        reached = [front[~done]]
+
+        ys, xs = np.divmod(batch, width)
+        for k, (dx, dy) in enumerate(DIRECTIONS):
+            nx = xs + dx
+            ny = ys + dy
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+            targets = ny[inside] * width + nx[inside]
+            candidate = arrival[batch[inside]] + times[k, targets]
+            candidate_reach = reach[batch[inside]] * chances[k, targets]
+            # Dla jednego kierunku cele są różne - zwykłe przypisanie wystarcza
+            better = (candidate < arrival[targets]) & (candidate_reach >= min_reach)
+            arrival[targets[better]] = candidate[better]
+            reach[targets[better]] = candidate_reach[better]
+            reached.append(targets[better])
+        front = np.unique(np.concatenate(reached))
+
+    arrival[arrival > horizon] = np.inf
+    return arrival.reshape(height, width)
+
+
+def forecast(sim, horizon=math.inf, min_chance=MIN_IGNITION_CHANCE):
+    """Czas dotarcia od komórek, które teraz płoną - dla bieżącej mapy, wiatru i pogody"""
+    source = sim.rules.table['spread']['source']
+    sources = np.flatnonzero(sim.grid.ravel() == source)
+    times, chances = edge_travel_times(sim.rules, sim.grid, sim, min_chance)
+    return arrival_times(times, chances, sources, sim.grid_width, sim.grid_height, horizon)
+
+
+def arrival_steps(times, start_step=0):
+    """Czasy z arrival_times jako numery kroków int32 (jak FireRasters.ignition_step, -1 = nigdy)"""
+    reached = np.isfinite(times)
+    steps = np.full(times.shape, NOT_IGNITED, dtype=np.int32)
+    steps[reached] = start_step + np.ceil(times[reached]).astype(np.int32)
+    return steps
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+    import os
+    import random
+    import tempfile
+    import time
+
+    # Import tutaj - prognoza z wiersza poleceń działa bez okna
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from benchmark import VARIANTS, REGIMES, parse_size, prepare_regime, supports
+    from export import save_image
+    from rasters import FireRasters, isochrone_colors
+
+    parser = argparse.ArgumentParser(description="Prognoza czasu dotarcia ognia bez losowania")
+    parser.add_argument('--variant', default='koncowy2', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--regime', default='single', choices=REGIMES)
+    parser.add_argument('--wind', type=float, help="siła wiatru")
+    parser.add_argument('--horizon', type=int, default=FORECAST_HORIZON, help="najdalszy prognozowany krok")
+    parser.add_argument('--runs', type=int, default=0, help="porównaj ze średnią z tylu losowych przebiegów")
+    parser.add_argument('--output', help="plik .npz z czasami dotarcia (obok obraz .png)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(args.variant)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if not supports(sim, args.regime):
+        parser.error(f"{args.variant} nie obsluguje rodzaju pozaru {args.regime}")
+    if args.regime == 'desert':
+        sim.initialize_forest(desert=True)
+    prepare_regime(sim, args.regime)
+    if args.wind is not None:
+        sim.wind_strength = args.wind
+
+    start = time.perf_counter()
+    times = forecast(sim, args.horizon)
+    elapsed = time.perf_counter() - start
+    steps = arrival_steps(times)
+    reached = steps != NOT_IGNITED
+    print(f"Prognoza: {elapsed * 1000:.1f} ms, {reached.sum()} komórek do kroku {steps.max()}")
+
+    if args.output:
+        np.savez_compressed(args.output, arrival=times.astype(np.float32))
+        colors, mask = isochrone_colors(steps, 0, max(int(steps.max()), 1))
+        colors[~mask] = 0
+        save_image(os.path.splitext(args.output)[0] + '.png', colors)
+
+    if args.runs:
+        # Każdy przebieg startuje z tego samego stanu, ale z innym ziarnem
+        path = os.path.join(tempfile.mkdtemp(), 'start.ffsim')
+        sim.save(path)
+        start_step = sim.step_count
+        source = sim.rules.table['spread']['source']
+        sums = np.zeros(times.shape)
+        hits = np.zeros(times.shape, dtype=np.int64)
+        start = time.perf_counter()
+        for run in range(args.runs):
+            sim.load(path, mmap=False)
+            random.seed(args.seed + 1 + run)
+            np.random.seed(args.seed + 1 + run)
+            sim.rasters = FireRasters(sim.grid_height, sim.grid_width)
+            while sim.step_count - start_step < args.horizon and sim.counts.get(source, 0) > 0:
+                sim._do_simulation_step()
+            burned = sim.rasters.ignition_step != NOT_IGNITED
+            sums[burned] += sim.rasters.ignition_step[burned] - start_step
+            hits[burned] += 1
+        elapsed = time.perf_counter() - start
+        os.remove(path)
+
+        # Komórki zapalone w co najmniej połowie przebiegów
+        usually = hits * 2 >= args.runs
+        both = usually & reached
+        error = np.abs(steps[both] - sums[both] / hits[both]).mean() if both.any() else float('nan')
+        print(f"{args.runs} przebiegów: {elapsed:.1f} s, zapalone w >= połowie: {usually.sum()} "
+              f"(w prognozie {both.sum()}), średni błąd prognozy {error:.1f} kroku")
+
+
+if __name__ == "__main__":
+    main()
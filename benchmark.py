@@ -0,0 +1,283 @@
+"""Benchmark symulacji - kroki na sekundę dla wersji, rozmiarów mapy i rodzajów pożaru.
+
+Przykłady:
+    python benchmark.py
+    python benchmark.py --variants koncowy1 --sizes 300x200 1000x1000 --steps 20
+    python benchmark.py --output nowe.json --baseline stare.json
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+# Symulacje działają bez okna - sterownik musi być ustawiony przed importem pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from rules import TREES, FIRE
+from timing import PhaseTimer
+
+VARIANTS = ['koncowy', 'koncowy1', 'koncowy2']
+SIZES = ['300x200', '1000x1000', '2000x2000', '4000x4000']
+
+# Rodzaje pożaru:
+#   single  - jedno zapalenie na środku mapy
+#   front   - cała lewa krawędź w ogniu
+#   extreme - jedno zapalenie, pogoda 'extreme' i silny wiatr (wersje z pogodą)
+#   desert  - jedno zapalenie na mapie z pustynią (koncowy2)
+REGIMES = ['single', 'front', 'extreme', 'desert']
+
+PHASES = ['generate', 'step', 'draw', 'draw_overview', 'draw_ui']
+
+# Fazy wewnątrz kroku z PhaseTimer symulacji: kafelki, jądro reguł, statystyki, metryki
+STEP_PHASES = ['tiles', 'rules', 'stats', 'metrics']
+
+DEFAULT_TOLERANCE = 0.10  # Spowolnienie o ponad 10% względem bazy to regresja
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def supports(sim, regime):
+    """Czy dana wersja ma to, czego wymaga rodzaj pożaru"""
+    if regime == 'extreme':
+        return hasattr(sim, 'set_weather_preset')
+    if regime == 'desert':
+        return 'desert' in inspect.signature(sim.initialize_forest).parameters
+    return True
+
+
+def ignite_center(sim):
+    """Zapala drzewo najbliżej środka mapy"""
+    ys, xs = np.nonzero(np.isin(sim.grid, TREES))
+    if ys.size == 0:
+        return
+    nearest = np.argmin((xs - sim.grid_width // 2) ** 2 + (ys - sim.grid_height // 2) ** 2)
+    sim.start_fire(int(xs[nearest]), int(ys[nearest]), r=1)
+
+
+def ignite_front(sim):
+    """Zapala wszystkie drzewa w pierwszej kolumnie mapy"""
+    column = sim.grid[:, 0]
+    trees = np.isin(column, TREES)
+    column[trees] = FIRE
+    sim.fire_intensity[trees, 0] = 1.0
+    sim.fire_started = True
+    sim.tiles.wake_region(0, 0, 0, sim.grid_height - 1)
+
+
+def prepare_regime(sim, regime):
+    if regime == 'extreme':
+        sim.set_weather_preset('extreme')
+        sim.wind_strength = 3.0
+
+    if regime == 'front':
+        ignite_front(sim)
+    else:
+        ignite_center(sim)
+
+
+def zoom_to_fit(sim):
+    """Oddala kamerę, aż cała mapa mieści się w widoku"""
+    while sim.camera.visible_cells() != (0, 0, sim.grid_width, sim.grid_height):
+        if not sim.camera.zoom(-1):
+            break
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def summarize(samples):
+    samples = np.asarray(samples)
+    if samples.size == 0:
+        return None
+    return {
+        'mean_ms': float(samples.mean() * 1000),
+        'min_ms': float(samples.min() * 1000),
+        'p95_ms': float(np.percentile(samples, 95) * 1000),
+    }
+
+
+def state_bytes(sim):
+    """Rozmiar tablic trzymanych przez symulację"""
+    return sum(value.nbytes for value in vars(sim).values() if isinstance(value, np.ndarray))
+
+
+def run_case(module, variant, width, height, regime, steps, memory_steps, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+
+    times = {phase: [] for phase in PHASES}
+
+    start = time.perf_counter()
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    times['generate'].append(time.perf_counter() - start)
+
+    if not supports(sim, regime):
+        return None
+    if regime == 'desert':
+        # Mapa z pustynią generowana od nowa - liczy się tylko ten czas
+        times['generate'] = [timed(sim.initialize_forest, 0.75, True)]
+    prepare_regime(sim, regime)
+
+    # Kroki liczone bez rysowania - to jest właściwa miara "kroki/s".
+    # Timer symulacji rozbija każdy krok na fazy - okno mieści wszystkie kroki
+    sim.timer = PhaseTimer(window=max(1, steps))
+    sim.timer.show = True
+    for _ in range(steps):
+        sim.timer.begin_frame()
+        times['step'].append(timed(sim._do_simulation_step))
+        sim.timer.end_frame()
+    step_phases = {phase: summarize(sim.timer.samples[phase]) for phase in STEP_PHASES
+                   if sim.timer.samples[phase]}
+    sim.timer = PhaseTimer()
+    active_fraction = sim.tiles.active_fraction(sim.step_count)
+
+    # Rysowanie stanu po krokach: widok startowy, cała mapa i panel
+    for _ in range(max(1, steps // 5)):
+        sim.panel_key = None  # Wymuszenie przebudowy panelu
+        times['draw'].append(timed(sim.draw, sim.screen))
+        times['draw_ui'].append(timed(sim.draw_ui, sim.screen))
+    zoom_to_fit(sim)
+    for _ in range(max(1, steps // 5)):
+        times['draw_overview'].append(timed(sim.draw, sim.screen))
+
+    # Pamięć mierzona osobno - tracemalloc spowalnia i zafałszowałby czasy
+    tracemalloc.start()
+    for _ in range(memory_steps):
+        sim._do_simulation_step()
+    _, peak_step = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    step_total = sum(times['step'])
+    return {
+        'variant': variant,
+        'size': f"{width}x{height}",
+        'regime': regime,
+        'steps': steps,
+        'steps_per_sec': steps / step_total if step_total > 0 else None,
+        'phases': {phase: summarize(samples) for phase, samples in times.items()},
+        'step_phases': step_phases,
+        'burning_cells': int(sim.counts.get(FIRE, 0)),
+        'active_tile_fraction': float(active_fraction),
+        'memory': {
+            'state_bytes': int(state_bytes(sim)),
+            'peak_step_bytes': int(peak_step),
+            'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+    }
+
+
+def case_key(case):
+    return case['variant'], case['size'], case['regime']
+
+
+def compare(case, old_cases, tolerance):
+    """Porównanie przypadku z zapisaną bazą - zwraca listę regresji"""
+    old = old_cases.get(case_key(case))
+    if old is None:
+        return []
+    changes = {}
+    if case['steps_per_sec'] and old['steps_per_sec']:
+        changes['steps_per_sec'] = old['steps_per_sec'] / case['steps_per_sec'] - 1
+    for phase, stats in case['phases'].items():
+        old_stats = old['phases'].get(phase)
+        if stats and old_stats and old_stats['mean_ms'] > 0:
+            changes[phase] = stats['mean_ms'] / old_stats['mean_ms'] - 1
+    # Starsza baza nie ma faz kroku - porównanie tylko tego, co jest w obu
+    for phase, stats in case['step_phases'].items():
+        old_stats = old.get('step_phases', {}).get(phase)
+        if stats and old_stats and old_stats['mean_ms'] > 0:
+            changes[f"step.{phase}"] = stats['mean_ms'] / old_stats['mean_ms'] - 1
+    case['vs_baseline'] = changes  # > 0 - wolniej niż w bazie
+
+    return [(case_key(case), name, change) for name, change in changes.items() if change > tolerance]
+
+
+def print_case(case):
+    phases = case['phases']
+    step_phases = {phase: stats['mean_ms'] for phase, stats in case['step_phases'].items()}
+    line = (f"{case['variant']:<9} {case['size']:>10} {case['regime']:<8} "
+            f"{case['steps_per_sec']:9.1f} kr/s  "
+            f"gen {phases['generate']['mean_ms']:8.1f} ms  "
+            f"reguly {step_phases.get('rules', 0):7.2f} ms  kafelki {step_phases.get('tiles', 0):6.2f} ms  "
+            f"draw {phases['draw']['mean_ms']:6.2f} ms  "
+            f"ui {phases['draw_ui']['mean_ms']:5.2f} ms  "
+            f"szczyt {case['memory']['peak_step_bytes'] / 2 ** 20:7.1f} MB")
+    if 'vs_baseline' in case and 'steps_per_sec' in case['vs_baseline']:
+        line += f"  ({case['vs_baseline']['steps_per_sec']:+.0%} czasu kroku)"
+    print(line, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark symulacji pożaru lasu")
+    parser.add_argument('--variants', nargs='+', default=VARIANTS, choices=VARIANTS)
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help="np. 300x200 1000x1000")
+    parser.add_argument('--regimes', nargs='+', default=REGIMES, choices=REGIMES)
+    parser.add_argument('--steps', type=int, default=50, help="liczba mierzonych kroków")
+    parser.add_argument('--memory-steps', type=int, default=3, help="kroki pomiaru pamięci")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="plik JSON z wynikami")
+    parser.add_argument('--baseline', help="plik JSON z poprzednimi wynikami do porównania")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="dopuszczalne spowolnienie (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'steps': args.steps,
+        'seed': args.seed,
+        'cases': [],
+    }
+
+    old_cases = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            old_cases = {case_key(case): case for case in json.load(f)['cases']}
+    regressions = []
+
+    for variant in args.variants:
+        module = importlib.import_module(variant)
+        for size in args.sizes:
+            width, height = parse_size(size)
+            for regime in args.regimes:
+                case = run_case(module, variant, width, height, regime,
+                                args.steps, args.memory_steps, args.seed)
+                if case is None:
+                    continue
+                results['cases'].append(case)
+                regressions += compare(case, old_cases, args.tolerance)
+                print_case(case)
+
+    for (variant, size, regime), name, change in regressions:
+        print(f"REGRESJA: {variant} {size} {regime} - {name} wolniej o {change:.0%}")
+    results['regressions'] = [
+        {'variant': key[0], 'size': key[1], 'regime': key[2], 'metric': name, 'change': change}
+        for key, name, change in regressions
+    ]
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
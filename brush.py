@@ -0,0 +1,54 @@
+"""Pędzle narzędzi myszy - stemple liczone wektorowo na wycinku mapy.
+
+Stempel jest przeciągany od poprzedniej do bieżącej komórki pod kursorem,
+więc szybki ruch myszy nie zostawia przerw, a całe pociągnięcie (także duży
+pędzel albo długi pas wycinki) to jedna operacja na tablicy.
+"""
+import numpy as np
+
+
+def _axis_range(p, a, d, half):
+    """Przedział t, w którym stempel w punkcie a + t*d pokrywa współrzędną p"""
+    if d == 0:
+        inside = np.abs(p - a) <= half
+        return np.where(inside, 0.0, np.inf), np.where(inside, 1.0, -np.inf)
+    t1 = (p - half - a) / d
+    t2 = (p + half - a) / d
+    return np.minimum(t1, t2), np.maximum(t1, t2)
+
+
+def stroke_mask(x0, y0, x1, y1, radius, width, height, shape='square'):
+    """(rows, cols, mask) - wycinek mapy i maska komórek pokrytych pociągnięciem
+    od (x0, y0) do (x1, y1), albo None, gdy jest ono całkiem poza mapą.
+
+    shape='square' - kwadrat (2r+1)x(2r+1), 'disc' - koło dx²+dy² <= r².
+    Pojedynczy stempel (x0, y0) == (x1, y1) pokrywa te same komórki co dawne pętle.
+    """
+    left = max(0, min(x0, x1) - radius)
+    top = max(0, min(y0, y1) - radius)
+    right = min(width - 1, max(x0, x1) + radius)
+    bottom = min(height - 1, max(y0, y1) + radius)
+    if left > right or top > bottom:
+        return None
+
+    ys, xs = np.ogrid[top:bottom + 1, left:right + 1]
+    dx, dy = x1 - x0, y1 - y0
+    if shape == 'disc':
+        # Kapsuła - odległość od najbliższego punktu odcinka
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else np.clip(((xs - x0) * dx + (ys - y0) * dy) / length2, 0.0, 1.0)
+        px = xs - (x0 + t * dx)
+        py = ys - (y0 + t * dy)
+        mask = px * px + py * py <= radius * radius
+    else:
+        # Kwadrat o połowie boku r + 0.5 - przy r = 0 daje linię bez przerw po przekątnych
+        low_x, high_x = _axis_range(xs, x0, dx, radius + 0.5)
+        low_y, high_y = _axis_range(ys, y0, dy, radius + 0.5)
+        mask = np.maximum(np.maximum(low_x, low_y), 0.0) <= np.minimum(np.minimum(high_x, high_y), 1.0)
+    return slice(top, bottom + 1), slice(left, right + 1), mask
+
+
+def flat_indices(hit, rows, cols, width):
+    """Płaskie indeksy komórek maski hit wycinka [rows, cols]"""
+    ys, xs = np.nonzero(hit)
+    return (ys + rows.start) * width + xs + cols.start
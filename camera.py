@@ -0,0 +1,107 @@
+import math
+
+import pygame
+
+# Zakres zoomu (piksele na komórkę). Poniżej 1 px mapa rysowana jest z pominięciem
+# części komórek (poziom szczegółowości), więc koszt zależy od okna, a nie od mapy.
+MIN_CELL_SIZE = 1 / 16
+MAX_CELL_SIZE = 20
+
+
+class Camera:
+    """Widok mapy w oknie o stałym rozmiarze - przesuwanie i zoom"""
+
+    def __init__(self, view_width, view_height, cell_size, map_width, map_height):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.cell_size = cell_size
+        self.map_width = map_width
+        self.map_height = map_height
+
+        # Lewy górny róg widoku w komórkach siatki
+        self.x = 0.0
+        self.y = 0.0
+
+    def set_map_size(self, map_width, map_height):
+        self.map_width = map_width
+        self.map_height = map_height
+        self.clamp()
+
+    def clamp(self):
+        """Nie pozwala wyjechać widokiem poza mapę"""
+        max_x = self.map_width - self.view_width / self.cell_size
+        max_y = self.map_height - self.view_height / self.cell_size
+        self.x = max(0.0, min(self.x, max_x))
+        self.y = max(0.0, min(self.y, max_y))
+
+    def pan(self, dx_px, dy_px):
+        """Przesuwa widok o podaną liczbę pikseli ekranu"""
+        self.x -= dx_px / self.cell_size
+        self.y -= dy_px / self.cell_size
+        self.clamp()
+
+    def zoom(self, amount):
+        """Zoom wokół środka widoku - od 1 px w górę co 1 px, poniżej co połowę"""
+        if amount > 0:
+            new_size = self.cell_size * 2 if self.cell_size < 1 else self.cell_size + amount
+        else:
+            new_size = self.cell_size / 2 if self.cell_size <= 1 else self.cell_size + amount
+        new_size = max(MIN_CELL_SIZE, min(MAX_CELL_SIZE, new_size))
+
+        if new_size != self.cell_size:
+            center_x, center_y = self.screen_to_map(self.view_width / 2, self.view_height / 2)
+            self.cell_size = new_size
+            self.x = center_x - self.view_width / 2 / self.cell_size
+            self.y = center_y - self.view_height / 2 / self.cell_size
+            self.clamp()
+            return True
+        return False
+
+    def screen_to_map(self, mx, my):
+        return self.x + mx / self.cell_size, self.y + my / self.cell_size
+
+    def screen_to_grid(self, mx, my):
+        """Komórka pod kursorem lub (-1, -1) gdy kursor jest poza widokiem mapy"""
+        if not (0 <= mx < self.view_width and 0 <= my < self.view_height):
+            return -1, -1
+        gx, gy = self.screen_to_map(mx, my)
+        return int(math.floor(gx)), int(math.floor(gy))
+
+    def grid_to_screen(self, gx, gy):
+        return (round((gx - self.x) * self.cell_size),
+                round((gy - self.y) * self.cell_size))
+
+    def visible_cells(self):
+        """Zakres widocznych komórek (x0, y0, x1, y1) przycięty do mapy"""
+        x0 = max(0, int(math.floor(self.x)))
+        y0 = max(0, int(math.floor(self.y)))
+        x1 = min(self.map_width, int(math.ceil(self.x + self.view_width / self.cell_size)))
+        y1 = min(self.map_height, int(math.ceil(self.y + self.view_height / self.cell_size)))
+        return x0, y0, x1, y1
+
+    def lod_step(self):
+        """Co którą komórkę rysować, żeby na piksel przypadała co najwyżej jedna"""
+        return max(1, int(math.ceil(1 / self.cell_size)))
+
+    def draw_map(self, surface, compose_colors):
+        """Rysuje tylko widoczny fragment mapy.
+
+        compose_colors(rows, cols) zwraca tablicę kolorów (wys, szer, 3)
+        dla wycinka siatki grid[rows, cols].
+        """
+        x0, y0, x1, y1 = self.visible_cells()
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        step = self.lod_step()
+        frame = compose_colors(slice(y0, y1, step), slice(x0, x1, step))
+        rows, cols = frame.shape[:2]
+
+        cells_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
+        size = (max(1, round(cols * step * self.cell_size)),
+                max(1, round(rows * step * self.cell_size)))
+
+        old_clip = surface.get_clip()
+        surface.set_clip(pygame.Rect(0, 0, self.view_width, self.view_height))
+        surface.blit(pygame.transform.scale(cells_surface, size), self.grid_to_screen(x0, y0))
+        surface.set_clip(old_clip)
@@ -0,0 +1,270 @@
+"""Punkty kontrolne - pełny stan symulacji w jednym pliku.
+
+Plik: nagłówek JSON (atrybuty, stan generatorów losowych, opis tablic), a po nim
+surowe tablice wyrównane do ALIGNMENT bajtów. Dzięki temu tablice można przy
+wczytywaniu zmapować w pamięć (np.memmap) - narzędzia czytające tylko część stanu
+nie czytają reszty pliku. Symulacja po wczytaniu kopiuje tablice do pamięci, żeby
+plik można było nadpisać albo usunąć (autozapis) w trakcie dalszego przebiegu.
+
+Długi przebieg bez okna z automatycznym zapisem co 1000 kroków:
+    python checkpoint.py --variant koncowy2 --size 2000x2000 --steps 100000 --every 1000 --keep 5
+    python checkpoint.py --resume checkpoints/step_00050000.ffsim --steps 50000
+    python checkpoint.py --steps 100000 --metrics metryki/  # metryki kolumnowo
+"""
+import glob
+import json
+import os
+import random
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'FFSIMCKP'
+VERSION = 1
+ALIGNMENT = 64
+LENGTH = struct.Struct('<Q')
+EXTENSION = '.ffsim'
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_checkpoint(path, arrays, meta):
+    """Zapisuje tablice i słownik meta. Zapis przez plik tymczasowy - bez połówkowych plików."""
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Przesunięcia liczone od początku danych - długość nagłówka nie jest jeszcze znana
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += array.nbytes
+
+    header = json.dumps({'version': VERSION, 'meta': meta, 'arrays': layout}).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + LENGTH.size + len(header))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + LENGTH.pack(len(header)) + header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def _read_header(f, path):
+    """(nagłówek, początek danych) z otwartego pliku"""
+    start = f.read(len(MAGIC) + LENGTH.size)
+    if len(start) != len(MAGIC) + LENGTH.size or start[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} nie jest punktem kontrolnym symulacji")
+    header_len, = LENGTH.unpack(start[len(MAGIC):])
+    header = json.loads(f.read(header_len).decode('utf-8'))
+    return header, _aligned(len(MAGIC) + LENGTH.size + header_len)
+
+
+def read_meta(path):
+    """Sam słownik meta - bez czytania tablic"""
+    with open(path, 'rb') as f:
+        return _read_header(f, path)[0]['meta']
+
+
+def read_checkpoint(path, mmap=True):
+    """(arrays, meta). Przy mmap=True tablice są mapowane kopiowaniem przy zapisie -
+    symulacja może je zmieniać, a plik na dysku zostaje nietknięty."""
+    with open(path, 'rb') as f:
+        header, data_start = _read_header(f, path)
+
+        arrays = {}
+        for name, info in header['arrays'].items():
+            dtype = np.dtype(info['dtype'])
+            shape = tuple(info['shape'])
+            offset = data_start + info['offset']
+            if mmap and int(np.prod(shape)) > 0:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=shape)
+            else:
+                f.seek(offset)
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    return arrays, header['meta']
+
+
+def rng_state():
+    """Stan obu generatorów (random i np.random) jako (meta, tablice)"""
+    kind, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    version, internal, gauss_next = random.getstate()
+    meta = {
+        'numpy': [kind, pos, has_gauss, cached_gaussian],
+        'random': [version, gauss_next],
+    }
+    arrays = {
+        'rng_numpy_keys': keys,
+        'rng_random_internal': np.array(internal, dtype=np.uint64),
+    }
+    return meta, arrays
+
+
+def set_rng_state(meta, arrays):
+    kind, pos, has_gauss, cached_gaussian = meta['numpy']
+    np.random.set_state((kind, np.asarray(arrays['rng_numpy_keys']), pos, has_gauss, cached_gaussian))
+    version, gauss_next = meta['random']
+    internal = tuple(int(value) for value in arrays['rng_random_internal'])
+    random.setstate((version, internal, gauss_next))
+
+
+def save_simulation(sim, path, variant, attributes, arrays):
+    """Wspólna część ForestFireSimulation.save - atrybuty, tablice, kafelki, RNG"""
+    sim.tiles.sync_ages(sim.grid, sim.age_grid, sim.step_count)  # Uśpione kafelki nadrabiają wiek leniwie
+    meta = {name: getattr(sim, name) for name in attributes}
+    meta['variant'] = variant
+    meta['rng'], rng_arrays = rng_state()
+    # Warstwy włączane klawiszami T i H - wilgotność zapisywana w całości, bez niej wraca do równowagi
+    meta['terrain_wind'] = sim.wind_field is not None
+    meta['moisture_step'] = None if sim.moisture is None else sim.moisture.last_step
+    meta['tiles_rates'] = None if sim.tiles.rates is None else list(sim.tiles.rates)
+
+    arrays = {name: getattr(sim, name) for name in arrays}
+    if sim.moisture is not None:
+        arrays['moisture_values'] = sim.moisture.values
+    arrays['tiles_active'] = sim.tiles.active
+    arrays['tiles_wake_step'] = sim.tiles.wake_step
+    arrays['tiles_last_step'] = sim.tiles.last_step
+    arrays['tiles_random_step'] = sim.tiles.random_step
+    arrays['tiles_due'] = sim.tiles.due
+    arrays.update(rng_arrays)
+    write_checkpoint(path, arrays, meta)
+
+
+def load_simulation(sim, path, variant, mmap=True):
+    """Wspólna część ForestFireSimulation.load - zwraca meta (z moisture_values, jeśli zapisano
+    wilgotność), tablice są już podstawione jako zwykłe tablice w pamięci"""
+    arrays, meta = read_checkpoint(path, mmap)
+    if meta['variant'] != variant:
+        raise ValueError(f"Punkt kontrolny z {meta['variant']}, a nie z {variant}")
+
+    height, width = arrays['grid'].shape
+    if (width, height) != (sim.grid_width, sim.grid_height):
+        sim.grid_width = width
+        sim.grid_height = height
+        sim.initialize_arrays()
+        sim.camera.set_map_size(width, height)
+
+    for name, array in arrays.items():
+        if name.startswith(('tiles_', 'rng_', 'moisture_')):
+            continue
+        setattr(sim, name, np.array(array) if mmap else array)  # Bez trzymania otwartego pliku
+    if 'moisture_values' in arrays:
+        meta['moisture_values'] = np.array(arrays['moisture_values'])
+
+    sim.tiles = type(sim.tiles)(height, width, **sim.rules.tile_activity())
+    sim.tiles.active[...] = arrays['tiles_active']
+    sim.tiles.wake_step[...] = arrays['tiles_wake_step']
+    sim.tiles.last_step[...] = arrays['tiles_last_step']
+    # Plan przejść losowych - bez niego (starszy plik) kafelki losują plan od nowa
+    if meta.get('tiles_rates') is not None:
+        sim.tiles.rates = tuple(meta['tiles_rates'])
+        sim.tiles.random_step[...] = arrays['tiles_random_step']
+        sim.tiles.due[...] = arrays['tiles_due']
+
+    set_rng_state(meta['rng'], arrays)
+    return meta
+
+
+class AutoCheckpointer:
+    """Zapis co every kroków do katalogu; trzyma tylko keep najnowszych plików"""
+
+    def __init__(self, directory, every=1000, keep=5):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self.saved = sorted(glob.glob(os.path.join(directory, f"step_*{EXTENSION}")))
+
+    def maybe_save(self, sim):
+        if sim.step_count % self.every != 0:
+            return None
+        path = os.path.join(self.directory, f"step_{sim.step_count:08d}{EXTENSION}")
+        sim.save(path)
+        if path not in self.saved:
+            self.saved.append(path)
+        while len(self.saved) > self.keep:
+            old = self.saved.pop(0)
+            if os.path.exists(old):
+                os.remove(old)
+        return path
+
+
+def quicksave_path():
+    return time.strftime(f"checkpoint_%Y%m%d_%H%M%S{EXTENSION}")
+
+
+def _saved_by(path, variant):
+    try:
+        return read_meta(path).get('variant') == variant
+    except (ValueError, OSError):
+        return False  # Uszkodzony lub obcy plik - pomijany
+
+
+def latest_checkpoint(directory='.', variant=None):
+    """Najnowszy plik punktu kontrolnego w katalogu (zapisany przez variant, jeśli podany) lub None"""
+    paths = glob.glob(os.path.join(directory, f"*{EXTENSION}"))
+    if variant is not None:
+        paths = [path for path in paths if _saved_by(path, variant)]
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+
+    # Import tutaj - przebieg z wiersza poleceń działa bez okna
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from benchmark import VARIANTS, REGIMES, parse_size, prepare_regime, supports
+
+    parser = argparse.ArgumentParser(description="Długi przebieg bez okna z punktami kontrolnymi")
+    parser.add_argument('--variant', default='koncowy2', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--regime', default='single', choices=REGIMES)
+    parser.add_argument('--resume', help="punkt kontrolny, od którego kontynuować")
+    parser.add_argument('--steps', type=int, default=10000)
+    parser.add_argument('--every', type=int, default=1000, help="co ile kroków zapis")
+    parser.add_argument('--keep', type=int, default=5, help="ile najnowszych zapisów trzymać")
+    parser.add_argument('--directory', default='checkpoints')
+    parser.add_argument('--metrics', help="plik CSV lub katalog kolumnowy na metryki kroków")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        args.variant = read_meta(args.resume)['variant']
+
+    module = importlib.import_module(args.variant)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if args.resume:
+        sim.load(args.resume)
+    else:
+        if not supports(sim, args.regime):
+            parser.error(f"{args.variant} nie obsluguje rodzaju pozaru {args.regime}")
+        if args.regime == 'desert':
+            sim.initialize_forest(desert=True)
+        prepare_regime(sim, args.regime)
+
+    sim.autosave = AutoCheckpointer(args.directory, args.every, args.keep)
+    if args.metrics:
+        from metrics import MetricsStream
+        sim.metrics = MetricsStream(args.metrics, module.COLORS.keys())
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        sim._do_simulation_step()
+    elapsed = time.perf_counter() - start
+    if sim.metrics is not None:
+        sim.metrics.close()
+    print(f"Krok {sim.step_count}, {args.steps / elapsed:.1f} kr/s, zapisy: {len(sim.autosave.saved)}")
+
+
+if __name__ == "__main__":
+    main()
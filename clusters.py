@@ -0,0 +1,401 @@
+"""Indeks spójnych fragmentów lasu - ile komórek może spłonąć od pożaru w danej komórce.
+
+Fragment to spójna składowa (8-sąsiedztwo, jak rozprzestrzenianie ognia) komórek
+z paliwem, które nie są blokerami. Indeks porównuje maskę paliwa z poprzednią
+i poprawia tylko zmienione komórki:
+  - nowe drzewa łączą etykiety sąsiadów (find-union na etykietach),
+  - usunięta komórka (spalona, wycięta, pustynia) zmniejsza rozmiar fragmentu;
+    fragment może się rozpaść tylko wtedy, gdy jej sąsiedzi nie są połączeni
+    wokół niej - wtedy fragment jest oznaczany i etykietowany od nowa dopiero
+    przy następnym zapytaniu.
+Każdy korzeń trzyma prostokąt obejmujący jego komórki (łączony przy find-union,
+po usunięciu komórek najwyżej za duży), więc ponowne etykietowanie fragmentu
+i spalenie go w całości przeglądają tylko ten prostokąt, a nie całą mapę.
+Rozmiar fragmentu komórki i udział największego fragmentu są wtedy odczytami z tablic.
+"""
+import numpy as np
+
+from rules import DIRECTIONS, EMPTY, TREE_MATURE, state_lut
+
+# Połowa kierunków - każda krawędź między komórkami liczona raz
+HALF_DIRECTIONS = [(1, 0), (0, 1), (1, 1), (-1, 1)]
+NO_CLUSTER = -1
+BOX_BOUNDS = (np.minimum, np.minimum, np.maximum, np.maximum)  # Łączenie x0, y0, x1, y1 prostokątów
+CLUSTER_HIGHLIGHT = (255, 60, 255)  # Fragment pod kursorem na mapie
+
+
+def _ring_splits():
+    """Dla 256 wzorów obecności 8 sąsiadów (bit k = DIRECTIONS[k]): czy obecni sąsiedzi
+    tworzą więcej niż jedną grupę połączoną bez środka"""
+    splits = np.zeros(256, dtype=bool)
+    for pattern in range(256):
+        present = [k for k in range(len(DIRECTIONS)) if pattern >> k & 1]
+        groups = 0
+        seen = set()
+        for start in present:
+            if start in seen:
+                continue
+            groups += 1
+            stack = [start]
+            seen.add(start)
+            while stack:
+                k = stack.pop()
+                for j in present:
+                    close = max(abs(DIRECTIONS[k][0] - DIRECTIONS[j][0]), abs(DIRECTIONS[k][1] - DIRECTIONS[j][1])) == 1
+                    if j not in seen and close:
+                        seen.add(j)
+                        stack.append(j)
+        splits[pattern] = groups > 1
+    return splits
+
+
+RING_SPLITS = _ring_splits()
+
+
+def _neighbors(cells, dx, dy, width, height):
+    """(indeksy, maska wewnątrz mapy) sąsiadów w kolejności cells - poza mapą indeks 0"""
+    ys, xs = np.divmod(cells, width)
+    nx = xs + dx
+    ny = ys + dy
+    inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+    return np.where(inside, ny * width + nx, 0), inside
+
+
+def _find(parent, ids):
+    """Korzenie ids z kompresją ścieżek (parent zmieniany w miejscu)"""
+    roots = parent[ids]
+    while True:
+        above = parent[roots]
+        if np.array_equal(above, roots):
+            break
+        roots = above
+    parent[ids] = roots
+    return roots
+
+
+def _box_cells(x0, y0, x1, y1, width):
+    """Płaskie indeksy komórek prostokątów [x0, x1] x [y0, y1] (tablice, po jednym na prostokąt)"""
+    rows = y1 - y0 + 1
+    box = np.repeat(np.arange(x0.size), rows)
+    y = y0[box] + np.arange(box.size) - np.repeat(np.cumsum(rows) - rows, rows)
+    starts = y * width + x0[box]
+    lengths = (x1 - x0 + 1)[box]
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+
+def component_labels(mask):
+    """Spójne składowe komórek maski (wysokość, szerokość).
+
+    Zwraca (płaskie indeksy komórek, ich etykiety 0..k-1, k). Łączenie wektorowe:
+    podpięcie większego korzenia pod mniejszy dla wszystkich krawędzi naraz,
+    potem skoki wskaźników.
+    """
+    height, width = mask.shape
+    cells = np.flatnonzero(mask)
+    position = np.full(mask.shape, -1, dtype=np.int32)
+    position.ravel()[cells] = np.arange(cells.size, dtype=np.int32)
+    first, second = [], []
+    for dx, dy in HALF_DIRECTIONS:
+        source = position[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+        target = position[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)]
+        linked = (source >= 0) & (target >= 0)
+        first.append(source[linked])
+        second.append(target[linked])
+    return (cells,) + _link(np.concatenate(first), np.concatenate(second), cells.size)
+
+
+def cell_components(cells, width, height):
+    """Jak component_labels, ale dla posortowanych płaskich indeksów cells - (etykiety, k).
+
+    Sąsiedzi szukani są w cells (searchsorted), więc koszt zależy od liczby komórek, nie od mapy.
+    """
+    first, second = [], []
+    for dx, dy in HALF_DIRECTIONS:
+        idx, inside = _neighbors(cells, dx, dy, width, height)
+        position = np.minimum(np.searchsorted(cells, idx), cells.size - 1)
+        linked = inside & (cells[position] == idx)
+        first.append(np.flatnonzero(linked))
+        second.append(position[linked])
+    return _link(np.concatenate(first), np.concatenate(second), cells.size)
+
+
+def _link(first, second, count):
+    """Etykiety 0..k-1 dla count elementów połączonych parami (first[i], second[i]) i liczba k"""
+    parent = np.arange(count, dtype=np.int64)
+    while first.size:
+        a = parent[first]
+        b = parent[second]
+        apart = a != b
+        if not apart.any():
+            break
+        a, b = a[apart], b[apart]
+        # Wystarczy dowolny mniejszy korzeń - zwykłe przypisanie zamiast minimum
+        parent[np.maximum(a, b)] = np.minimum(a, b)
+        first, second = first[apart], second[apart]
+        # Wskaźnik na wskaźnik, aż każda komórka wskazuje korzeń
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+    unique, labels = np.unique(parent, return_inverse=True)
+    return labels, unique.size
+
+
+class ClusterIndex:
+    """Etykiety fragmentów lasu komórek i rozmiary fragmentów, aktualizowane z różnicy masek"""
+
+    def __init__(self, flammable_lut, grid):
+        self.lut = flammable_lut
+        self.height, self.width = grid.shape
+        self.rebuild(grid)
+
+    def rebuild(self, grid):
+        """Etykietowanie od zera"""
+        self.mask = self.lut[grid].ravel()
+        self.marked = np.zeros(self.mask.size, dtype=bool)
+        self._relabel()
+
+    def _relabel(self):
+        cells, labels, count = component_labels(self.mask.reshape(self.height, self.width))
+        self.label = np.full(self.mask.size, NO_CLUSTER, dtype=np.int64)
+        self.label[cells] = labels
+        self.parent = np.arange(count, dtype=np.int64)
+        self.size = np.bincount(labels, minlength=count).astype(np.int64)
+        self.count = count  # Użyte etykiety - tablice mają zapas, podwajany przy braku
+        self.dirty = set()  # Etykiety fragmentów, które mogły się rozpaść
+        self.box = np.zeros((4, count), dtype=np.int64)  # x0, y0, x1, y1 prostokąta korzenia
+        self._fit_boxes(cells, labels)
+
+    def _fit_boxes(self, cells, labels):
+        """Prostokąty nowych etykiet labels dokładnie wokół ich komórek"""
+        ys, xs = np.divmod(cells, self.width)
+        self.box[:2, labels] = [[self.width], [self.height]]
+        self.box[2:, labels] = -1
+        for row, values, reduce in zip(self.box, (xs, ys, xs, ys), BOX_BOUNDS):
+            reduce.at(row, labels, values)
+
+    def _members(self, roots):
+        """Aktualne komórki korzeni roots (posortowane) - przegląd ich prostokątów"""
+        x0, y0, x1, y1 = self.box[:, roots]
+        cells = _box_cells(x0, y0, x1, y1, self.width)
+        cells = cells[self.mask[cells]]
+        if roots.size > 1:
+            # Prostokąty różnych korzeni mogą na siebie zachodzić
+            cells = np.unique(cells)
+        return cells[np.isin(_find(self.parent, self.label[cells]), roots)]
+
+    def _new_labels(self, count):
+        first = self.count
+        self.count += count
+        if self.count > self.parent.size:
+            capacity = max(self.parent.size * 2, self.count)
+            self.parent = np.concatenate([self.parent, np.arange(self.parent.size, capacity, dtype=np.int64)])
+            self.size = np.concatenate([self.size, np.zeros(capacity - self.size.size, dtype=np.int64)])
+            self.box = np.concatenate([self.box, np.zeros((4, capacity - self.box.shape[1]), dtype=np.int64)], axis=1)
+        return np.arange(first, self.count)
+
+    def _union(self, first, second):
+        """Łączy fragmenty par etykiet (first[i], second[i])"""
+        a = _find(self.parent, first)
+        b = _find(self.parent, second)
+        involved = np.unique(np.concatenate([a, b]))
+        while True:
+            apart = a != b
+            if not apart.any():
+                break
+            np.minimum.at(self.parent, np.maximum(a[apart], b[apart]), np.minimum(a[apart], b[apart]))
+            a = _find(self.parent, a)
+            b = _find(self.parent, b)
+        roots = _find(self.parent, involved)
+        sizes = self.size[involved]
+        self.size[involved] = 0
+        np.add.at(self.size, roots, sizes)
+        for row, reduce in zip(self.box, BOX_BOUNDS):
+            reduce.at(row, roots, row[involved])
+        if self.dirty:
+            self.dirty = set(_find(self.parent, np.array(sorted(self.dirty))).tolist())
+
+    def _remove(self, cells):
+        roots = _find(self.parent, self.label[cells])
+        np.subtract.at(self.size, roots, 1)
+        # Usuwanie po kolei wg indeksu: sąsiad usuwany później w chwili usuwania komórki jeszcze jest
+        self.marked[cells] = True
+        pattern = np.zeros(cells.size, dtype=np.intp)
+        for k, (dx, dy) in enumerate(DIRECTIONS):
+            idx, inside = _neighbors(cells, dx, dy, self.width, self.height)
+            present = self.mask[idx] & (~self.marked[idx] | (idx > cells))
+            pattern |= (inside & present).astype(np.intp) << k
+        self.marked[cells] = False
+        self.mask[cells] = False
+        self.label[cells] = NO_CLUSTER
+        self.dirty.update(np.unique(roots[RING_SPLITS[pattern]]).tolist())
+
+    def add(self, cells):
+        """Nowe komórki z paliwem (płaskie indeksy) - łączą się z fragmentami sąsiadów"""
+        self.mask[cells] = True
+        labels = self._new_labels(cells.size)
+        self.label[cells] = labels
+        self.size[labels] = 1
+        ys, xs = np.divmod(cells, self.width)
+        self.box[:, labels] = [xs, ys, xs, ys]
+        first, second = [], []
+        for dx, dy in DIRECTIONS:
+            idx, inside = _neighbors(cells, dx, dy, self.width, self.height)
+            linked = inside & self.mask[idx]
+            first.append(self.label[cells[linked]])
+            second.append(self.label[idx[linked]])
+        self._union(np.concatenate(first), np.concatenate(second))
+        # Etykiety nowych drzew tylko przybywają - co jakiś czas porządek od zera
+        if self.count > 4 * self.mask.size:
+            self._relabel()
+
+    def take_cluster(self, cell):
+        """Usuwa cały fragment z komórką cell (płaski indeks) i zwraca jego komórki - spalenie naraz"""
+        self._clean()
+        label = self.label[cell]
+        if label == NO_CLUSTER:
+            return np.zeros(0, dtype=np.intp)
+        root = _find(self.parent, np.array([label]))[0]
+        cells = self._members(np.array([root]))
+        self.size[root] = 0
+        self.mask[cells] = False
+        self.label[cells] = NO_CLUSTER
+        return cells
+
+    def sync(self, grid):
+        """Dostosowuje indeks do bieżącej siatki - koszt zależy od liczby zmienionych komórek"""
+        mask = self.lut[grid].ravel()
+        changed = np.flatnonzero(mask != self.mask)
+        if changed.size == 0:
+            return
+        added = mask[changed]
+        if (~added).any():
+            self._remove(changed[~added])
+        if added.any():
+            self.add(changed[added])
+
+    def _clean(self):
+        """Etykietuje od nowa fragmenty oznaczone jako możliwe do rozpadu"""
+        if not self.dirty:
+            return
+        dirty = np.unique(_find(self.parent, np.array(sorted(self.dirty))))
+        self.dirty = set()
+        cells = self._members(dirty)
+        self.size[dirty] = 0
+        if cells.size == 0:
+            return
+        labels, count = cell_components(cells, self.width, self.height)
+        new = self._new_labels(count)
+        self.label[cells] = new[labels]
+        self.size[new] = np.bincount(labels, minlength=count)
+        self._fit_boxes(cells, new[labels])
+
+    def cluster_size(self, x, y):
+        """Liczba komórek fragmentu lasu z komórką (x, y) - najwięcej, ile spłonie od niej (0 = brak paliwa)"""
+        self._clean()
+        label = self.label[y * self.width + x]
+        if label == NO_CLUSTER:
+            return 0
+        return int(self.size[_find(self.parent, np.array([label]))[0]])
+
+    def largest(self):
+        """Rozmiar największego fragmentu"""
+        self._clean()
+        return int(self.size.max()) if self.size.size else 0
+
+    def largest_fraction(self):
+        """Udział największego fragmentu w całej mapie"""
+        return self.largest() / self.mask.size
+
+    def highlight(self, x, y, rows=slice(None), cols=slice(None)):
+        """Maska wycinka [rows, cols]: komórki z tego samego fragmentu co (x, y)"""
+        self._clean()
+        labels = self.label.reshape(self.height, self.width)[rows, cols]
+        target = self.label[y * self.width + x]
+        if target == NO_CLUSTER:
+            return np.zeros(labels.shape, dtype=bool)
+        target = _find(self.parent, np.array([target]))[0]
+        mask = labels != NO_CLUSTER
+        result = np.zeros(labels.shape, dtype=bool)
+        result[mask] = _find(self.parent, labels[mask]) == target
+        return result
+
+    def colors(self, x, y, rows=slice(None), cols=slice(None)):
+        """(kolory, maska) do rasters.blend_layer - fragment lasu z komórką (x, y)"""
+        mask = self.highlight(x, y, rows, cols)
+        return np.broadcast_to(np.array(CLUSTER_HIGHLIGHT, dtype=np.uint8), mask.shape + (3,)), mask
+
+    def forest_size(self):
+        """Liczba komórek, przez które może przejść ogień"""
+        return int(np.count_nonzero(self.mask))
+
+    def spanning(self):
+        """Czy jakiś fragment łączy lewą i prawą krawędź mapy (perkolacja)"""
+        self._clean()
+        grid_labels = self.label.reshape(self.height, self.width)
+        left = grid_labels[:, 0][grid_labels[:, 0] != NO_CLUSTER]
+        right = grid_labels[:, -1][grid_labels[:, -1] != NO_CLUSTER]
+        if left.size == 0 or right.size == 0:
+            return False
+        return bool(np.intersect1d(_find(self.parent, left), _find(self.parent, right)).size)
+
+
+def flammable_lut(kernel):
+    """Stany, przez które ogień może przejść - paliwo reguł bez blokerów"""
+    return kernel.burnable_lut & (kernel.fuel_lut > 0)
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+    import os
+    import time
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from benchmark import VARIANTS, parse_size
+
+    parser = argparse.ArgumentParser(description="Próg perkolacji - udział największego fragmentu lasu od gęstości")
+    parser.add_argument('--variant', choices=VARIANTS, help="mapy z terenem wariantu (domyślnie losowa siatka)")
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--densities', default='0.3:0.8:0.025', help="start:stop:krok")
+    parser.add_argument('--runs', type=int, default=5, help="map na każdą gęstość")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    width, height = parse_size(args.size)
+    low, high, step = (float(v) for v in args.densities.split(':'))
+    densities = np.arange(low, high + step / 2, step)
+    rng = np.random.default_rng(args.seed)
+
+    sim = None
+    if args.variant:
+        import random
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        module = importlib.import_module(args.variant)
+        sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+        lut = flammable_lut(sim.rules)
+    else:
+        lut = state_lut({TREE_MATURE: True})
+
+    print(f"{'gestosc':>8} {'najwiekszy':>11} {'perkolacja':>11}")
+    start = time.perf_counter()
+    for density in densities:
+        fractions = []
+        spans = 0
+        for _ in range(args.runs):
+            if sim is not None:
+                sim.initialize_forest(density=density)
+                grid = sim.grid
+            else:
+                grid = np.where(rng.random((height, width)) < density, TREE_MATURE, EMPTY).astype(np.uint8)
+            index = ClusterIndex(lut, grid)
+            fractions.append(index.largest_fraction())
+            spans += index.spanning()
+        print(f"{density:8.3f} {np.mean(fractions):11.3f} {spans / args.runs:11.2f}")
+    print(f"{len(densities) * args.runs} map w {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
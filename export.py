@@ -0,0 +1,215 @@
+"""Eksport klatek przebiegu do sekwencji PNG albo filmu (ffmpeg) - bez okna.
+
+Klatki pochodzą z render_rgb() (te same kolory co draw()) i trafiają do
+ograniczonej kolejki. Kodowanie odbywa się w osobnym wątku, więc symulacja
+czeka tylko wtedy, gdy kolejka jest pełna.
+
+    python export.py --variant koncowy2 --regime front --steps 600 --every 2 --output pozar.mp4
+    python export.py --variant koncowy1 --steps 300 --output klatki/
+    python export.py --regime front --steps 400 --overlay isochrones --rasters --output izochrony.mp4
+"""
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+EXPORT_QUEUE_SIZE = 8  # Klatki czekające na zapis - duże mapy zajmują dużo pamięci
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.mov', '.avi', '.gif')
+
+
+def default_output():
+    """Film, gdy jest ffmpeg, a w przeciwnym razie katalog na klatki PNG"""
+    name = time.strftime("export_%Y%m%d_%H%M%S")
+    return name + '.mp4' if shutil.which('ffmpeg') else name
+
+
+def upscale(frame, scale):
+    """Powiększenie klatki całkowitą skalą (każda komórka jako kwadrat scale x scale)"""
+    if scale == 1:
+        return frame
+    return np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1)
+
+
+def save_image(path, frame):
+    """Tablica RGB (wysokość, szerokość, 3) jako plik PNG"""
+    import pygame
+    pygame.image.save(pygame.surfarray.make_surface(frame.swapaxes(0, 1)), path)
+
+
+def save_rasters(rasters, output):
+    """Warstwy zapłonu (rasters.FireRasters) obok filmu albo w katalogu klatek:
+    surowe tablice w .npz i obie nakładki jako PNG. Zwraca ścieżkę .npz."""
+    if output.lower().endswith(VIDEO_EXTENSIONS):
+        base = os.path.splitext(output)[0]
+    else:
+        os.makedirs(output, exist_ok=True)
+        base = os.path.join(output, 'fire')
+    np.savez_compressed(base + '_rasters.npz', ignition_step=rasters.ignition_step,
+                        burn_count=rasters.burn_count)
+    for mode, suffix in (('isochrones', '_ignition_step.png'), ('heatmap', '_burn_count.png')):
+        save_image(base + suffix, rasters.render(mode))
+    return base + '_rasters.npz'
+
+
+class _PngWriter:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def write(self, index, frame):
+        save_image(os.path.join(self.directory, f"frame_{index:06d}.png"), frame)
+
+    def close(self):
+        pass
+
+
+class _FfmpegWriter:
+    """Surowe klatki RGB do ffmpeg przez potok; ffmpeg uruchamiany przy pierwszej klatce"""
+
+    def __init__(self, path, fps):
+        self.ffmpeg = shutil.which('ffmpeg')
+        if self.ffmpeg is None:
+            raise RuntimeError("Nie znaleziono ffmpeg - podaj katalog, żeby zapisać klatki PNG")
+        self.path = path
+        self.fps = fps
+        self.process = None
+
+    def write(self, index, frame):
+        if self.process is None:
+            height, width = frame.shape[:2]
+            self.process = subprocess.Popen(
+                [self.ffmpeg, '-y', '-loglevel', 'error',
+                 '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{width}x{height}",
+                 '-r', str(self.fps), '-i', '-',
+                 # yuv420p wymaga parzystych wymiarów
+                 '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', self.path],
+                stdin=subprocess.PIPE)
+        self.process.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+
+
+class FrameExporter:
+    """Co every kroków zapisuje klatkę symulacji w tle.
+
+    output kończący się rozszerzeniem filmu (.mp4, .webm...) idzie do ffmpeg,
+    każda inna ścieżka to katalog na sekwencję PNG.
+    """
+
+    def __init__(self, output, every=1, fps=30, scale=1, queue_size=EXPORT_QUEUE_SIZE):
+        self.output = output
+        self.every = every
+        self.scale = scale
+        if output.lower().endswith(VIDEO_EXTENSIONS):
+            self.writer = _FfmpegWriter(output, fps)
+        else:
+            self.writer = _PngWriter(output)
+
+        self.frames = 0
+        self.waited = 0.0  # Czas, przez który symulacja czekała na pełną kolejkę
+        self.error = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.thread.start()
+
+    def push(self, frame):
+        """Dodaje klatkę do kolejki - czeka tylko, gdy kolejka jest pełna"""
+        if self.error is not None:
+            raise self.error
+        start = time.perf_counter()
+        self.queue.put(frame)
+        self.waited += time.perf_counter() - start
+
+    def maybe_push(self, sim):
+        if sim.step_count % self.every == 0:
+            self.push(sim.render_rgb())
+
+    def _write_loop(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            if self.error is not None:
+                continue  # Opróżniamy kolejkę, żeby push nie zawisł
+            try:
+                self.writer.write(self.frames, upscale(frame, self.scale))
+                self.frames += 1
+            except Exception as error:
+                self.error = error
+        self.writer.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+    import random
+
+    # Import tutaj - eksport z wiersza poleceń działa bez okna
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from benchmark import VARIANTS, REGIMES, parse_size, prepare_regime, supports
+
+    parser = argparse.ArgumentParser(description="Film lub klatki PNG z przebiegu bez okna")
+    parser.add_argument('--variant', default='koncowy2', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--regime', default='single', choices=REGIMES)
+    parser.add_argument('--resume', help="punkt kontrolny, od którego zacząć")
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--every', type=int, default=1, help="co ile kroków klatka")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--scale', type=int, default=2, help="pikseli na komórkę")
+    parser.add_argument('--output', default='export.mp4', help="plik filmu albo katalog na PNG")
+    parser.add_argument('--rasters', action='store_true', help="zapisz też warstwy zapłonu i spaleń")
+    parser.add_argument('--overlay', choices=['isochrones', 'heatmap'], help="nakładka na klatkach")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.resume:
+        from checkpoint import read_meta
+        args.variant = read_meta(args.resume)['variant']
+
+    module = importlib.import_module(args.variant)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if args.resume:
+        sim.load(args.resume)
+    else:
+        if not supports(sim, args.regime):
+            parser.error(f"{args.variant} nie obsluguje rodzaju pozaru {args.regime}")
+        if args.regime == 'desert':
+            sim.initialize_forest(desert=True)
+        prepare_regime(sim, args.regime)
+
+    if args.rasters or args.overlay:
+        from rasters import FireRasters
+        sim.rasters = FireRasters(sim.grid_height, sim.grid_width)
+        sim.overlay = args.overlay
+    sim.exporter = FrameExporter(args.output, args.every, args.fps, args.scale)
+    sim.exporter.push(sim.render_rgb())
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        sim._do_simulation_step()
+    sim.exporter.close()
+    elapsed = time.perf_counter() - start
+    print(f"{sim.exporter.frames} klatek -> {args.output} ({elapsed:.1f} s, "
+          f"czekanie na zapis {sim.exporter.waited:.1f} s)")
+    if sim.rasters is not None:
+        print(f"Warstwy zapłonu: {save_rasters(sim.rasters, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""Rozmieszczenie pasów ochronnych - które drzewa wyciąć, żeby pożar spalił najmniej.
+
+Płonąca komórka przez burn_steps() kroków próbuje zapalić każdego sąsiada
+niezależnie, z tym samym p co w RuleKernel.step. Pożar bez odrostu sprowadza się
+więc do jednej liczby losowej U na krawędź: krawędź zapala cel w próbie
+j = floor(log(1 - U) / log(1 - p)) + 1, o ile j <= burn_steps. Liczby U losowane
+są raz na REPLICAS przebiegów (uint8) i każdy układ pasów liczony jest na tych
+samych losowaniach - mniejszy szum porównań. Ocena układu to algorytm Dijkstry
+po czasie (kubełki co krok) dla wszystkich przebiegów naraz, bez kroków symulacji.
+Pożar trwa setki kroków, a drzewa w tym czasie dorastają, więc p liczone jest
+dla stanu celu w kroku, w którym zapaliło się źródło. Wiatr terenu (T) i wilgotność
+paliwa (H) z wczytanego stanu zmieniają p krawędzi jak w arrival.py, a wilgotność
+także liczbę prób źródła (tempo wypalania).
+
+Pojedyncza wycięta komórka w otwartym lesie prawie nic nie daje - ogień ją
+obchodzi. Dlatego najpierw oceniane są całe linie zatrzymania: granice obszarów,
+do których według arrival.py ogień dociera w czasie <= t. Linia dłuższa niż
+budżet przycinana jest do komórek z największym poddrzewem zapłonów (ile spłonęło
+"przez nie") - domknąć ją mogą woda i skały. Resztę budżetu wydaje wybór
+zachłanny po pojedynczych komórkach. Kandydaci liczeni są w puli procesów.
+
+Przykłady:
+    python firebreak.py --variant koncowy1 --budget 60 --wind 2
+    python firebreak.py --load checkpoint_20240101_120000.ffsim --ignition 50,80 --output pasy.ffsim
+"""
+import argparse
+import importlib
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Symulacje działają bez okna - sterownik musi być ustawiony przed importem pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from arrival import arrival_times, burn_steps, edge_travel_times
+from brush import stroke_mask, flat_indices
+from rules import DIRECTIONS, FIREBREAK, TREES, param_value, shifted
+
+REPLICAS = 32  # Przebiegi (losowania krawędzi)
+CANDIDATES = 8  # Kandydaci dokładnie liczeni w rundzie
+LINES = 24  # Linie zatrzymania (progi czasu dotarcia) oceniane na starcie
+NEVER = np.iinfo(np.int64).max  # Krok zapłonu komórki, do której ogień nie dotarł
+NEVER_ATTEMPT = 255
+
+
+class FirebreakEvaluator:
+    """Oczekiwane pole pożaru dla układu pasów - na wspólnych losowaniach krawędzi"""
+
+    def __init__(self, kernel, grid, age_grid, params, ignition, replicas=REPLICAS, seed=None):
+        height, width = grid.shape
+        self.width = width
+        self.size = grid.size
+        self.replicas = replicas
+        self.ignition = np.asarray(ignition, dtype=np.int64)
+        # Komórka self.size to "poza mapą" - bez paliwa
+        self.states = np.append(grid.ravel(), grid.flat[0]).astype(np.intp)
+        self.ages = np.append(age_grid.ravel().astype(np.int64), 0)
+        fuel_lut = np.where(kernel.burnable_lut, kernel.fuel_lut, 0).astype(np.float64)
+        self.blocked = np.append(fuel_lut[grid.ravel()] <= 0, True)
+        self.aging = kernel.table['aging']
+        self.steps = np.full(self.size + 1, burn_steps(kernel, params), dtype=np.int64)  # Próby źródła
+
+        # p krawędzi z kierunku k = p_spread * paliwo stanu celu * scale[k, cel]
+        self.p_spread = param_value(params, kernel.table['spread']['probability'])
+        self.fuel = fuel_lut
+        wind = kernel.spread_wind(params).astype(np.float64)  # (8,) albo pole wiatru (8, wysokość * szerokość)
+        self.scale = np.array(np.broadcast_to(wind.reshape(len(DIRECTIONS), -1), (len(DIRECTIONS), self.size)))
+        moisture = getattr(params, 'moisture', None)
+        if moisture is not None:
+            # Wilgotność mnoży szansę zapłonu celu i tempo wypalania źródła - jak w RuleKernel.step
+            self.scale *= moisture.factor
+            decay = param_value(params, kernel.table['burnout']['decay']) * moisture.factor
+            self.steps[:-1] = np.maximum(1, np.ceil(1.0 / decay) - 1)
+        self.log_miss_u = np.log1p(-(np.arange(256) + 0.5) / 256)  # log(1 - U) środka przedziału U
+
+        ys, xs = np.divmod(np.arange(self.size), width)
+        self.neighbors = np.full((len(DIRECTIONS), self.size), self.size, dtype=np.int64)
+        for k, (dx, dy) in enumerate(DIRECTIONS):
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+            self.neighbors[k, inside] = ny[inside] * width + nx[inside]
+        # U[r, k, cel] krawędzi od sąsiada z kierunku k - jeden z 256 przedziałów
+        rng = np.random.default_rng(seed)
+        self.draws = rng.integers(0, 256, (replicas, len(DIRECTIONS), self.size + 1), dtype=np.uint8)
+
+    def _attempts(self, k, sources, targets, states, draws):
+        """Próba, w której krawędź z kierunku k (od komórki sources) zapala cel; NEVER_ATTEMPT - wcale"""
+        p = np.minimum(1.0, self.p_spread * self.fuel[states] * self.scale[k, targets])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            attempt = np.where(p < 1.0, np.floor(self.log_miss_u[draws] / np.log1p(-p)) + 1, 1)
+        attempt[(p <= 0) | ~(attempt <= self.steps[sources])] = NEVER_ATTEMPT
+        return attempt.astype(np.uint8)
+
+    def _states(self, cells, step):
+        """Stany komórek w kroku step - po starzeniu"""
+        states = self.states[cells]
+        ages = self.ages[cells] + step
+        for rule in self.aging:
+            states = np.where((states == rule['from']) & (ages > rule['after']), rule['into'], states)
+        return states
+
+    def burn(self, cut, subtrees=False):
+        """(średnie pole pożaru, ile razy spłonęła każda komórka, poddrzewa albo None).
+
+        cut - płaskie indeksy wyciętych komórek. subtrees - suma po przebiegach liczby
+        komórek zapalonych przez daną komórkę (pośrednio).
+        """
+        size = self.size + 1
+        blocked = self.blocked.copy()
+        blocked[cut] = True
+        arrival = np.full(self.replicas * size, NEVER, dtype=np.int64)
+        parent = np.full(self.replicas * size, -1, dtype=np.int64)
+        starts = self.ignition[~blocked[self.ignition]]
+        pending = (np.arange(self.replicas)[:, None] * size + starts[None, :]).ravel()
+        pending_at = np.zeros(pending.size, dtype=np.int64)
+        arrival[pending] = 0
+        directions = np.arange(len(DIRECTIONS))[:, None]
+        batches = []
+
+        step = 0
+        while pending.size:
+            now = pending_at == step
+            batch = pending[now]
+            pending, pending_at = pending[~now], pending_at[~now]
+            batch = batch[arrival[batch] == step]  # Później poprawione na wcześniejszy krok - już przetworzone
+            step += 1
+            if batch.size == 0:
+                continue
+            batches.append(batch)
+            replica, cells = np.divmod(batch, size)
+            targets = self.neighbors[:, cells]
+            flat = replica * size + targets
+            # Zapłon najwcześniej w następnym kroku - cele już zapalone do teraz odpadają od razu
+            open_ = ~blocked[targets] & (arrival[flat] > step)
+            targets, flat = targets[open_], flat[open_]
+            replica = np.broadcast_to(replica, open_.shape)[open_]
+            sources = np.broadcast_to(batch, open_.shape)[open_]
+            k = np.broadcast_to(directions, open_.shape)[open_]
+            source_cells = np.broadcast_to(cells, open_.shape)[open_]
+            attempt = self._attempts(k, source_cells, targets, self._states(targets, step - 1),
+                                     self.draws[replica, k, targets])
+            when = step - 1 + attempt.astype(np.int64)
+            better = (attempt != NEVER_ATTEMPT) & (when < arrival[flat])
+            flat, when, sources = flat[better], when[better], sources[better]
+            # Kilka źródeł naraz - przy powtórzonym indeksie wygrywa ostatni zapis, czyli najwcześniejszy zapłon
+            order = np.argsort(-when, kind='stable')
+            flat, when, sources = flat[order], when[order], sources[order]
+            arrival[flat] = when
+            parent[flat] = sources
+            won = parent[flat] == sources
+            pending = np.concatenate([pending, flat[won]])
+            pending_at = np.concatenate([pending_at, when[won]])
+
+        reached = arrival != NEVER
+        burned = reached.reshape(self.replicas, size)[:, :-1]
+        tree = None
+        if subtrees:
+            tree = reached.astype(np.float64)
+            for batch in reversed(batches):
+                linked = batch[parent[batch] >= 0]
+                np.add.at(tree, parent[linked], tree[linked])
+            tree = tree.reshape(self.replicas, size)[:, :-1].sum(axis=0)
+        return burned.sum() / self.replicas, burned.sum(axis=0), tree
+
+
+_worker = None
+
+
+def _init_worker(evaluator):
+    global _worker
+    _worker = evaluator
+
+
+def _expected_area(cut):
+    return _worker.burn(cut)[0]
+
+
+def containment_lines(kernel, grid, params, ignition, cuttable, count=LINES):
+    """Do count linii (płaskie indeksy do wycięcia) wokół obszarów arrival <= t, od najbliższej podpalenia"""
+    height, width = grid.shape
+    times, chances = edge_travel_times(kernel, grid, params)
+    arrival = arrival_times(times, chances, ignition, width, height)
+    thresholds = np.unique(np.ceil(arrival[np.isfinite(arrival)]))
+    if thresholds.size > count:
+        thresholds = thresholds[np.linspace(0, thresholds.size - 1, count).round().astype(int)]
+    cuttable = cuttable.reshape(height, width)
+    lines = []
+    for threshold in thresholds:
+        inside = arrival <= threshold
+        # Ogień idzie też po skosie - linia to wszyscy sąsiedzi (8) obszaru
+        around = np.zeros_like(inside)
+        for dx, dy in DIRECTIONS:
+            around |= shifted(inside, dx, dy)
+        line = np.flatnonzero(around & ~inside & cuttable)
+        if line.size:
+            lines.append(line)
+    return lines
+
+
+def _evaluate(evaluator, layouts, pool):
+    return list(pool.map(_expected_area, layouts)) if pool else [evaluator.burn(layout)[0] for layout in layouts]
+
+
+def optimize(evaluator, cuttable, budget, lines=(), candidates=CANDIDATES, pool=None, report=print):
+    """Wybór do budget komórek z cuttable (maska płaska); zwraca (wycięte, pola po rundach).
+
+    Najpierw najlepsza z linii zatrzymania (przyciętych do budżetu), potem rundy
+    zachłanne po jednej komórce.
+    """
+    cut = np.zeros(0, dtype=np.int64)
+    area, _, tree = evaluator.burn(cut, subtrees=True)
+    history = [area]
+    start = time.perf_counter()
+    if len(lines):
+        layouts = [line if line.size <= budget else line[np.argsort(tree[line])[::-1][:budget]]
+                   for line in lines]
+        areas = _evaluate(evaluator, layouts, pool)
+        choice = int(np.argmin(areas))
+        if areas[choice] < area:
+            cut = np.sort(layouts[choice])
+            area, _, tree = evaluator.burn(cut, subtrees=True)
+            history.append(area)
+            report(f"Linia {choice + 1}/{len(layouts)}: wyciete {cut.size} komorek (z {lines[choice].size}), "
+                   f"pole {history[0]:.0f} -> {area:.0f} ({area / history[0] - 1:+.1%}), "
+                   f"{time.perf_counter() - start:.1f} s")
+    for round_number in range(1, budget - cut.size + 1):
+        scores = np.where(cuttable, tree, 0)
+        scores[cut] = 0
+        best = np.argsort(scores)[::-1][:candidates]
+        best = best[scores[best] > 0]
+        if best.size == 0:
+            break
+        layouts = [np.append(cut, cell) for cell in best]
+        areas = _evaluate(evaluator, layouts, pool)
+        choice = int(np.argmin(areas))
+        if areas[choice] >= area:
+            report(f"Runda {round_number}: zadne wyciecie nie zmniejsza pozaru - koniec")
+            break
+        cut = layouts[choice]
+        area, _, tree = evaluator.burn(cut, subtrees=True)
+        history.append(area)
+        y, x = divmod(int(best[choice]), evaluator.width)
+        report(f"Runda {round_number}: wyciete ({x}, {y}), "
+               f"pole {history[0]:.0f} -> {area:.0f} ({area / history[0] - 1:+.1%}), "
+               f"{time.perf_counter() - start:.1f} s")
+    return cut, history
+
+
+def apply_firebreaks(sim, cells):
+    """Wycina komórki jak cut_forest_area - tylko drzewa stają się pasem ochronnym"""
+    grid = sim.grid.ravel()
+    cells = cells[np.isin(grid[cells], TREES)]
+    grid[cells] = FIREBREAK
+    sim.age_grid.ravel()[cells] = 0
+
+
+def main(argv=None):
+    from benchmark import VARIANTS, parse_size
+
+    parser = argparse.ArgumentParser(description="Optymalizacja pasow ochronnych pod budzet wycietych komorek")
+    parser.add_argument('--variant', default='koncowy1', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--load', help="punkt kontrolny z mapą (zamiast nowej mapy)")
+    parser.add_argument('--ignition', help="x,y miejsca podpalenia (domyślnie środek mapy)")
+    parser.add_argument('--radius', type=int, default=2, help="promień podpalenia jak LPM")
+    parser.add_argument('--budget', type=int, default=60, help="ile komórek wolno wyciąć")
+    parser.add_argument('--wind', type=float, help="siła wiatru")
+    parser.add_argument('--wind-direction', help="dx,dy kierunku wiatru, np. 1,0")
+    parser.add_argument('--weather', help="preset pogody wariantu")
+    parser.add_argument('--replicas', type=int, default=REPLICAS)
+    parser.add_argument('--candidates', type=int, default=CANDIDATES, help="kandydaci liczeni w rundzie")
+    parser.add_argument('--lines', type=int, default=LINES, help="linie zatrzymania oceniane na starcie (0 - bez)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='pasy_ochronne.ffsim',
+                        help="punkt kontrolny z wyciętymi pasami (F8 w oknie), obok .npz z szansami spalenia")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    module = importlib.import_module(args.variant)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if not hasattr(sim, 'cut_forest_area'):
+        parser.error(f"{args.variant} nie ma pasow ochronnych (wycinania lasu)")
+    if args.load:
+        sim.load(args.load, mmap=False)
+        width, height = sim.grid_width, sim.grid_height
+    if args.weather:
+        sim.set_weather_preset(args.weather)
+    if args.wind is not None:
+        sim.wind_strength = args.wind
+    if args.wind_direction:
+        sim.wind_direction = [int(v) for v in args.wind_direction.split(',')]
+
+    x, y = (int(v) for v in args.ignition.split(',')) if args.ignition else (width // 2, height // 2)
+    rows, cols, mask = stroke_mask(x, y, x, y, args.radius, width, height)
+    region = flat_indices(mask, rows, cols, width)
+    ignition = region[np.isin(sim.grid.ravel()[region], TREES)]
+    if ignition.size == 0:
+        parser.error(f"brak drzew do podpalenia wokol ({x}, {y})")
+    cuttable = np.isin(sim.grid.ravel(), TREES)
+    cuttable[region] = False
+
+    start = time.perf_counter()
+    evaluator = FirebreakEvaluator(sim.rules, sim.grid, sim.age_grid, sim, ignition, args.replicas, args.seed)
+    print(f"{args.replicas} losowan krawedzi: {time.perf_counter() - start:.1f} s, "
+          f"podpalenie ({x}, {y}), wiatr {sim.wind_direction} x {sim.wind_strength}")
+    _, before, _ = evaluator.burn(np.zeros(0, dtype=np.int64))
+    lines = containment_lines(sim.rules, sim.grid, sim, ignition, cuttable, args.lines) if args.lines > 0 else []
+
+    if args.jobs > 1:
+        # Jak w sweep.py - zamknięcie puli bez SIGTERM, który pygame (SDL) w procesach potomnych połyka
+        with ProcessPoolExecutor(args.jobs, initializer=_init_worker, initargs=(evaluator,)) as pool:
+            cut, history = optimize(evaluator, cuttable, args.budget, lines, args.candidates, pool)
+    else:
+        cut, history = optimize(evaluator, cuttable, args.budget, lines, args.candidates)
+    _, after, _ = evaluator.burn(cut)
+    print(f"Wyciete {cut.size} komorek: oczekiwane pole {history[0]:.0f} -> {history[-1]:.0f} "
+          f"({history[-1] / history[0] - 1:+.1%}), {time.perf_counter() - start:.1f} s")
+
+    apply_firebreaks(sim, cut)
+    sim.save(args.output)
+    base = os.path.splitext(args.output)[0]
+    np.savez_compressed(base + '.npz', firebreaks=cut,
+                        chance_before=(before / args.replicas).reshape(height, width).astype(np.float32),
+                        chance_after=(after / args.replicas).reshape(height, width).astype(np.float32))
+    print(f"Zapisano: {args.output}, {base}.npz")
+
+
+if __name__ == "__main__":
+    main()
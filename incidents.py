@@ -0,0 +1,248 @@
+"""Śledzenie pożarów - każda płonąca komórka ma numer pożaru, który dziedziczą zapalone od niej.
+
+Komórki zapalone w kroku (rules.ignited) dostają numer płonącego sąsiada; gdy
+sąsiadują z kilkoma pożarami, te łączą się w strukturze find-union (numerem
+zostaje starszy). Dla każdego pożaru na bieżąco liczone są: krok startu
+i wygaśnięcia, pole (liczba zapłonów), liczba płonących komórek i obwód -
+krawędzie 4-sąsiedztwa jego płonących komórek, po których drugiej stronie nie ma
+ognia; brzeg mapy też się liczy (tak samo liczy metrics.fire_perimeter).
+Pożary, których płonące komórki zetknęły się bokiem, są łączone od razu - wspólne
+krawędzie łączonych pożarów mają więc tylko komórki zapalone w tej samej operacji.
+Aktualizacja dotyka tylko komórek zmienionych w kroku, bez etykietowania siatki.
+"""
+import numpy as np
+
+from rules import DIRECTIONS, DIRECTIONS_4
+
+NO_FIRE = 0  # fire_id komórki, która nie płonie
+ACTIVE = -1  # end_step pożaru, który jeszcze płonie
+INCIDENT_FIELDS = ['start_step', 'end_step', 'area', 'burning', 'perimeter']
+INCIDENT_ROWS = 6  # Wiersze tabeli pożarów w panelu
+
+
+def _neighbors(cells, dx, dy, width, height):
+    """(indeksy, maska wewnątrz mapy) sąsiadów w kolejności cells - poza mapą indeks 0"""
+    ys, xs = np.divmod(cells, width)
+    nx = xs + dx
+    ny = ys + dy
+    inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+    return np.where(inside, ny * width + nx, 0), inside
+
+
+class FireIncidents:
+    """Numery pożarów komórek (fire_id) i statystyki pożarów w tablicach indeksowanych numerem"""
+
+    def __init__(self, height, width, capacity=64):
+        self.width = width
+        self.height = height
+        self.fire_id = np.zeros(height * width, dtype=np.int32)
+        self.marked = np.zeros(height * width, dtype=bool)  # Komórki zmieniane w bieżącej operacji
+        self.parent = np.arange(capacity, dtype=np.int32)
+        self.stats = {name: np.zeros(capacity, dtype=np.int64) for name in INCIDENT_FIELDS}
+        self.count = 1  # Numer 0 to NO_FIRE
+        self.stroke = NO_FIRE  # Pożar bieżącego pociągnięcia pędzlem
+
+    def _new(self, number, step):
+        """Rezerwuje number kolejnych numerów pożarów, zwraca pierwszy"""
+        first = self.count
+        self.count += number
+        if self.count > self.parent.size:
+            capacity = max(self.parent.size * 2, self.count)
+            self.parent = np.concatenate([self.parent, np.arange(self.parent.size, capacity, dtype=np.int32)])
+            for name, values in self.stats.items():
+                self.stats[name] = np.concatenate([values, np.zeros(capacity - values.size, dtype=np.int64)])
+        self.stats['start_step'][first:self.count] = step
+        self.stats['end_step'][first:self.count] = ACTIVE
+        return first
+
+    def find(self, ids):
+        """Korzenie numerów ids (tablica) z kompresją ścieżek; find(NO_FIRE) = NO_FIRE"""
+        roots = self.parent[ids]
+        while True:
+            above = self.parent[roots]
+            if np.array_equal(above, roots):
+                break
+            roots = above
+        self.parent[ids] = roots
+        return roots
+
+    def _same_neighbors(self, cells, roots):
+        """Dla każdej komórki: płonący sąsiedzi (4 kierunki) z tego samego pożaru - wszyscy i oznaczeni"""
+        same = np.zeros(cells.size, dtype=np.int64)
+        same_marked = np.zeros(cells.size, dtype=np.int64)
+        for dx, dy in DIRECTIONS_4:
+            idx, inside = _neighbors(cells, dx, dy, self.width, self.height)
+            hit = inside & (self.find(self.fire_id[idx]) == roots)
+            same += hit
+            same_marked += hit & self.marked[idx]
+        return same, same_marked
+
+    def _add(self, cells, roots):
+        """Komórki zaczynają płonąć w pożarach roots (korzenie)"""
+        self.fire_id[cells] = roots
+        self.marked[cells] = True
+        same, same_marked = self._same_neighbors(cells, roots)
+        self.marked[cells] = False
+        # Obwód 4|N| - 2 * (krawędzie do starych komórek) - 2 * (krawędzie między nowymi)
+        delta = 4 - 2 * same + same_marked
+        size = self.parent.size
+        added = np.bincount(roots, minlength=size)
+        self.stats['area'] += added
+        self.stats['burning'] += added
+        self.stats['perimeter'] += np.bincount(roots, delta, minlength=size).astype(np.int64)
+        self.stats['end_step'][np.unique(roots)] = ACTIVE
+
+    def remove(self, cells, step):
+        """Komórki przestają płonąć (wypalenie albo nadpisanie narzędziem)"""
+        cells = cells[self.fire_id[cells] != NO_FIRE]
+        if cells.size == 0:
+            return
+        roots = self.find(self.fire_id[cells])
+        self.marked[cells] = True
+        same, same_marked = self._same_neighbors(cells, roots)
+        self.marked[cells] = False
+        self.fire_id[cells] = NO_FIRE
+        size = self.parent.size
+        delta = -4 + 2 * same - same_marked
+        self.stats['burning'] -= np.bincount(roots, minlength=size)
+        self.stats['perimeter'] += np.bincount(roots, delta, minlength=size).astype(np.int64)
+        touched = np.unique(roots)
+        self.stats['end_step'][touched[self.stats['burning'][touched] == 0]] = step
+
+    def _merge(self, a, b, cells):
+        """Łączy pożary o korzeniach a i b; cells - komórki zapalone w bieżącej operacji.
+        Zwraca korzeń (starszy numer)."""
+        keep, gone = min(a, b), max(a, b)
+        # Krawędzie między płonącymi komórkami obu pożarów przestają być obwodem - każda ma koniec w cells
+        roots = self.find(self.fire_id[cells])
+        cells, roots = cells[(roots == a) | (roots == b)], roots[(roots == a) | (roots == b)]
+        self.marked[cells] = True
+        shared = both = 0
+        for dx, dy in DIRECTIONS_4:
+            idx, inside = _neighbors(cells, dx, dy, self.width, self.height)
+            hit = inside & (self.find(self.fire_id[idx]) == np.where(roots == a, b, a))
+            shared += np.count_nonzero(hit)
+            both += np.count_nonzero(hit & self.marked[idx])
+        self.marked[cells] = False
+        shared -= both // 2  # Krawędź między dwiema komórkami z cells policzona z obu stron
+
+        stats = self.stats
+        stats['start_step'][keep] = min(stats['start_step'][keep], stats['start_step'][gone])
+        for name in ('area', 'burning', 'perimeter'):
+            stats[name][keep] += stats[name][gone]
+        stats['perimeter'][keep] -= 2 * shared
+        stats['end_step'][keep] = ACTIVE if stats['burning'][keep] > 0 else stats['end_step'][keep]
+        self.parent[gone] = keep
+        return keep
+
+    def _join_touching(self, cells):
+        """Łączy z pożarami komórek cells (właśnie zapalonych) inne pożary stykające się z nimi bokiem"""
+        for dx, dy in DIRECTIONS_4:
+            idx, inside = _neighbors(cells, dx, dy, self.width, self.height)
+            own = self.find(self.fire_id[cells])
+            other = np.where(inside, self.find(self.fire_id[idx]), NO_FIRE)
+            clash = (other != NO_FIRE) & (other != own)
+            if clash.any():
+                for a, b in np.unique(np.stack([own[clash], other[clash]], axis=1), axis=0).tolist():
+                    a, b = self.find(np.array([a, b]))
+                    if a != b:
+                        self._merge(a, b, cells)
+
+    def update(self, step, ignited, burned_out):
+        """Po kroku reguł: ignited i burned_out - płaskie indeksy z RuleKernel"""
+        self.remove(burned_out, step)
+        if ignited.size == 0:
+            return
+
+        # Pożar dziedziczony po płonącym sąsiedzie (8 kierunków); kilka różnych - łączenie
+        parents = np.zeros(ignited.size, dtype=np.int32)
+        for dx, dy in DIRECTIONS:
+            idx, inside = _neighbors(ignited, dx, dy, self.width, self.height)
+            roots = np.where(inside, self.find(self.fire_id[idx]), NO_FIRE)
+            clash = (parents != NO_FIRE) & (roots != NO_FIRE) & (parents != roots)
+            if clash.any():
+                for a, b in np.unique(np.stack([parents[clash], roots[clash]], axis=1), axis=0).tolist():
+                    a, b = self.find(np.array([a, b]))
+                    if a != b:
+                        self._merge(a, b, ignited)
+                parents = self.find(parents)
+                roots = self.find(roots)
+            parents = np.where(parents != NO_FIRE, parents, roots)
+
+        # Zapłon bez płonącego sąsiada (np. po wczytaniu stanu) - nowy pożar
+        orphans = parents == NO_FIRE
+        if orphans.any():
+            parents[orphans] = self._new(1, step)
+        self._add(ignited, parents)
+        # Zapalone w tym kroku od różnych pożarów mogą się stykać
+        self._join_touching(ignited)
+
+    def ignite(self, cells, step, new=True):
+        """Podpalenie przez użytkownika: new - nowy pożar, inaczej ciąg dalszy pociągnięcia"""
+        if cells.size == 0:
+            return
+        if new or self.stroke == NO_FIRE:
+            self.stroke = self._new(1, step)
+        stroke = self.find(np.array([self.stroke]))[0]
+        self._add(cells, np.full(cells.size, stroke, dtype=np.int32))
+        self._join_touching(cells)
+
+    def seed(self, burning, step):
+        """Numery dla komórek, które już płoną (płaskie indeksy) - spójne składowe 8-sąsiedztwa"""
+        if burning.size == 0:
+            return
+        # Etykieta składowej to najmniejszy indeks w niej - propagacja minimum do ustalenia się
+        labels = np.full(self.fire_id.size, np.iinfo(np.int64).max, dtype=np.int64)
+        labels[burning] = burning
+        changed = True
+        while changed:
+            changed = False
+            for dx, dy in DIRECTIONS:
+                idx, inside = _neighbors(burning, dx, dy, self.width, self.height)
+                lowest = np.minimum(labels[burning], np.where(inside, labels[idx], labels[burning]))
+                if (lowest < labels[burning]).any():
+                    labels[burning] = lowest
+                    changed = True
+        components, index = np.unique(labels[burning], return_inverse=True)
+        first = self._new(components.size, step)
+        self._add(burning, (first + index).astype(np.int32))
+
+    def labels(self):
+        """(wysokość, szerokość) int32 - numer pożaru (korzeń) każdej komórki, NO_FIRE = nie płonie"""
+        return self.find(self.fire_id).reshape(self.height, self.width)
+
+    def incident_at(self, x, y):
+        """Numer pożaru komórki (x, y) albo NO_FIRE"""
+        return int(self.find(np.array([self.fire_id[y * self.width + x]]))[0])
+
+    def incidents(self, step, active_only=False):
+        """Lista słowników z danymi pożarów (tylko korzenie), od najstarszego.
+
+        rate - średni przyrost pola na krok od startu do wygaśnięcia (albo do step).
+        """
+        ids = np.arange(1, self.count)
+        ids = ids[self.parent[1:self.count] == ids]
+        if active_only:
+            ids = ids[self.stats['end_step'][ids] == ACTIVE]
+        result = []
+        for i in ids.tolist():
+            record = {'id': i}
+            record.update({name: int(self.stats[name][i]) for name in INCIDENT_FIELDS})
+            end = step if record['end_step'] == ACTIVE else record['end_step']
+            record['rate'] = record['area'] / max(end - record['start_step'], 1)
+            if record['end_step'] == ACTIVE:
+                record['end_step'] = None
+            result.append(record)
+        return result
+
+    def active_count(self):
+        """Liczba pożarów, które jeszcze płoną"""
+        ids = np.arange(1, self.count)
+        return int(np.count_nonzero((self.parent[1:self.count] == ids) & (self.stats['end_step'][1:self.count] == ACTIVE)))
+
+    def overlay_rows(self, step, limit=INCIDENT_ROWS):
+        """Wiersze tabeli w panelu: płonące pożary od największego, potem ostatnio wygasłe"""
+        records = self.incidents(step)
+        active = sorted((r for r in records if r['end_step'] is None), key=lambda r: -r['area'])
+        ended = sorted((r for r in records if r['end_step'] is not None), key=lambda r: -r['end_step'])
+        return (active + ended)[:limit]
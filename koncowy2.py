@@ -3,83 +3,100 @@ import random
 import numpy as np
 import math
 
+from camera import Camera
+from rules import (RULE_PRESETS, compile_rules, EMPTY, TREE_YOUNG, TREE_MATURE, TREE_OLD, FIRE,
+                   ASH, WATER, ROCK, FIREBREAK, DESERT)
+from tiles import TileActivityIndex
+from brush import stroke_mask, flat_indices
+from incidents import FireIncidents
+from clusters import ClusterIndex, flammable_lut, CLUSTER_HIGHLIGHT
+from timing import PhaseTimer, OVERLAY_REFRESH_MS
+from profiler import ProfileCapture
+from replay import ReplayRecorder
+from checkpoint import save_simulation, load_simulation, quicksave_path, latest_checkpoint
+from export import FrameExporter, default_output, save_rasters
+from metrics import MetricsStream, metrics_path
+from sparkline import HistoryCharts, CHART_WIDTH
+from rasters import FireRasters, OVERLAY_NAMES, next_overlay, isochrone_colors, blend_layer
+from arrival import forecast, arrival_steps, FORECAST_HORIZON
+from risk import RiskPreview, RISK_STEPS_PER_FRAME
+from soc import LightningRun, P_LIGHTNING, SOC_FAST_FORWARD
+from wind import WindField, ARROW_SPACING, ARROW_SCALE
+from moisture import FuelMoisture
+
 # --- KONFIGURACJA STARTOWA ---
 START_CELL_SIZE = 5
 START_GRID_WIDTH = 300
 START_GRID_HEIGHT = 200
+# Stały rozmiar widoku mapy w oknie - zoom i przesuwanie obsługuje kamera
+VIEW_WIDTH = START_GRID_WIDTH * START_CELL_SIZE
+VIEW_HEIGHT = START_GRID_HEIGHT * START_CELL_SIZE
 FPS = 60
+BACKGROUND_COLOR = (20, 20, 20)
+REGROWTH_FPS = 10  # Odświeżanie ekranu gdy nic nie płonie (sam odrost lasu)
 
 # Prawdopodobieństwa BAZOWE
 P_SPREAD_BASE = 0.25
 P_GROW_BASE = 0.0005
 P_ASH_DECAY_BASE = 0.005
 FIRE_DECAY_BASE = 0.15
-P_DESERT_SPREAD = 0.03  # Bardzo wolne rozprzestrzenianie pustyni
-
-# Stany komórek
-EMPTY = 0
-TREE_YOUNG = 1
-TREE_MATURE = 2
-TREE_OLD = 3
-FIRE = 4
-ASH = 6
-WATER = 7
-ROCK = 8
-FIREBREAK = 9
-DESERT = 10
-
-# Kolory z wariacjami dla lepszej grafiki
-def get_water_color(x, y, step):
-    """Animowane fale wody z jaśniejszymi smugami"""
-    wave1 = math.sin((x * 0.3 + y * 0.2 + step * 0.08)) * 20
-    wave2 = math.cos((x * 0.2 - y * 0.3 + step * 0.05)) * 15
-    
+
+# Kolory z wariacjami dla lepszej grafiki (liczone wektorowo dla całych tablic)
+def get_water_colors(phase1, phase2, step):
+    """Animowane fale wody z jaśniejszymi smugami - fazy liczone raz na mapę"""
+    wave1 = np.sin(phase1 + step * 0.08) * 20
+    wave2 = np.cos(phase2 + step * 0.05) * 15
+
     combined_wave = wave1 + wave2
-    
-    r = max(20, min(60, 30 + int(combined_wave * 0.3)))
-    g = max(80, min(130, 100 + int(combined_wave * 0.5)))
-    b = max(180, min(255, 220 + int(combined_wave)))
-    
-    return (r, g, b)
-
-def get_rock_color(x, y):
+
+    colors = np.empty(combined_wave.shape + (3,), dtype=np.uint8)
+    colors[..., 0] = np.clip(30 + (combined_wave * 0.3).astype(np.int32), 20, 60)
+    colors[..., 1] = np.clip(100 + (combined_wave * 0.5).astype(np.int32), 80, 130)
+    colors[..., 2] = np.clip(220 + combined_wave.astype(np.int32), 180, 255)
+    return colors
+
+def get_rock_colors(seed_val):
     """Zróżnicowane kolory skał - różne odcienie szarości"""
-    seed_val = hash((x, y)) % 100
-    
-    if seed_val < 20:
-        base = 50 + (seed_val % 15)
-        return (base, base, base + 5)
-    elif seed_val < 60:
-        base = 70 + (seed_val % 25)
-        return (base, base - 5, base)
-    else:
-        base = 95 + (seed_val % 30)
-        return (base, base, base + 10)
-
-def get_tree_color(state, age):
+    base = np.where(seed_val < 20, 50 + seed_val % 15,
+                    np.where(seed_val < 60, 70 + seed_val % 25, 95 + seed_val % 30))
+    offset = np.where(seed_val < 20, 5, np.where(seed_val < 60, 0, 10))
+
+    colors = np.empty(seed_val.shape + (3,), dtype=np.uint8)
+    colors[..., 0] = base
+    colors[..., 1] = np.where((seed_val >= 20) & (seed_val < 60), base - 5, base)
+    colors[..., 2] = base + offset
+    return colors
+
+def get_tree_colors(state, age):
     """Kolory drzew z wiekiem"""
-    if state == TREE_YOUNG:
-        green_val = 220 + (age % 35)
-        return (80, min(255, green_val), 80)
-    elif state == TREE_MATURE:
-        green_val = 139 - (age % 20)
-        return (34, green_val, 34)
-    else:  # OLD
-        green_val = 60 + (age % 20)
-        return (0, green_val, 0)
-
-def get_desert_color(x, y):
+    colors = np.zeros(state.shape + (3,), dtype=np.uint8)
+
+    young = state == TREE_YOUNG
+    colors[young, 0] = 80
+    colors[young, 1] = np.minimum(255, 220 + age[young] % 35)
+    colors[young, 2] = 80
+
+    mature = state == TREE_MATURE
+    colors[mature, 0] = 34
+    colors[mature, 1] = 139 - age[mature] % 20
+    colors[mature, 2] = 34
+
+    old = state == TREE_OLD
+    colors[old, 1] = 60 + age[old] % 20
+    return colors
+
+# Odcienie pustyni: jasny piasek, tan, burly wood, jasny beż
+DESERT_PALETTE = np.array([(194, 178, 128), (210, 180, 140), (222, 184, 135), (238, 203, 173)],
+                          dtype=np.uint8)
+
+def get_desert_colors(seed_val):
     """Zróżnicowane kolory pustyni - odcienie żółtego/piaskowego"""
-    seed_val = hash((x, y)) % 100
-    
-    if seed_val < 30:
-        return (194, 178, 128)  # Jasny piasek
-    elif seed_val < 60:
-        return (210, 180, 140)  # Tan
-    elif seed_val < 85:
-        return (222, 184, 135)  # Burly wood
-    else:
-        return (238, 203, 173)  # Jasny beż
+    return DESERT_PALETTE[np.searchsorted([30, 60, 85], seed_val, side='right')]
+
+def cell_seed(width, height):
+    """Stała pseudolosowa wartość 0-99 dla każdej komórki (zamiast hash((x, y)))"""
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.int64)
+    return ((xs * 73856093) ^ (ys * 19349663)) % 100
 
 # Podstawowe kolory (fallback)
 COLORS = {
@@ -95,6 +112,11 @@ COLORS = {
     DESERT: (210, 180, 140)
 }
 
+# Tablica kolorów indeksowana stanem komórki (do rysowania całej siatki naraz)
+COLOR_LUT = np.zeros((256, 3), dtype=np.uint8)
+for _state, _color in COLORS.items():
+    COLOR_LUT[_state] = _color
+
 # PRESETY WARUNKÓW POGODOWYCH
 WEATHER_PRESETS = {
     'very_wet': {
@@ -137,20 +159,73 @@ font = pygame.font.Font(None, 38)
 small_font = pygame.font.Font(None, 28)
 tiny_font = pygame.font.Font(None, 22)
 
+# Pamięć podręczna wyrenderowanych napisów: (czcionka, tekst, kolor) -> Surface
+TEXT_CACHE_LIMIT = 2000
+text_cache = {}
+
+
+def render_text(text_font, text, color):
+    """Renderuje napis tylko raz - kolejne wywołania zwracają gotową powierzchnię"""
+    key = (text_font, text, color)
+    text_surf = text_cache.get(key)
+    if text_surf is None:
+        if len(text_cache) >= TEXT_CACHE_LIMIT:
+            text_cache.clear()
+        text_surf = text_font.render(text, True, color)
+        text_cache[key] = text_surf
+    return text_surf
+
+
+# Stan zapisywany w punkcie kontrolnym (save/load, F7/F8) poza kafelkami i RNG
+CHECKPOINT_ARRAYS = ['grid', 'age_grid', 'fire_intensity', 'water_width']
+CHECKPOINT_ATTRIBUTES = ['step_count', 'fire_started', 'wind_direction', 'wind_strength',
+                         'current_weather', 'simulation_speed', 'paused', 'update_counter',
+                         'has_desert']
+
 
 # --- KLASA SYMULACJI ---
 class ForestFireSimulation:
-    def __init__(self, width, height, cell_size):
+    def __init__(self, width, height, cell_size, headless=False):
         self.grid_width = width
         self.grid_height = height
-        self.cell_size = cell_size
+        self.headless = headless  # Bez okna - np. benchmarki i długie przebiegi
+        self.camera = Camera(VIEW_WIDTH, VIEW_HEIGHT, cell_size, width, height)
         self.ui_width = 320
 
+        self.panel_surface = None
+        self.panel_key = None
+
+        self.timer = PhaseTimer()  # Czasy faz - nakładka F3, zapis do CSV F4
+        self.timing_surface = None
+        self.timing_refreshed = 0
+        self.profiler = ProfileCapture()  # Profil kolejnych klatek - F5
+        self.recorder = None  # Nagrywanie powtórki - F6
+        self.autosave = None  # AutoCheckpointer przy długich przebiegach bez okna
+        self.exporter = None  # Eksport klatek do filmu lub PNG - F9
+        self.metrics = None  # Strumień metryk na krok - F10
+        self.history = HistoryCharts(COLORS.keys(), COLORS, 16)  # Wykresy w legendzie
+        self.chart_rows = []  # (stan, y) wierszy legendy z wykresem
+        self.step_row = (0, 0)  # (x, y) wiersza "Krok:" - rysowany poza buforowanym panelem
+        self.rasters = None  # Krok zapłonu i liczba spaleń komórek - I
+        self.overlay = None
+        self.forecast = None  # Prognozowany krok dotarcia ognia do komórek - P
+        self.forecast_range = (0, 1)
+        self.risk = None  # Mapa ryzyka z propagacji prawdopodobieństw - M
+        self.risk_key = None
+        self.incidents = None  # Numery i statystyki pożarów - tabela N
+        self.show_incidents = False
+        self.incident_surface = None
+        self.incident_refreshed = 0
+        self.clusters = None  # Indeks fragmentów lasu - podgląd K pod kursorem
+        self.cluster_cell = None
+
         self.update_window_size()
 
         self.wind_direction = [1, 0]
         self.wind_strength = 1.0
         self.wind_mode = False
+        self.wind_field = None  # Wiatr zależny od terenu (rzeki, skały) - T
+        self.moisture = None  # Wilgotność paliwa w komórkach (moisture.FuelMoisture) - H
         self.cutting_mode = False
 
         self.paused = False
@@ -161,6 +236,8 @@ class ForestFireSimulation:
         self.burn_rate_multiplier = WEATHER_PRESETS['normal']['multiplier']
 
         self.update_burn_parameters()
+        self.p_lightning = P_LIGHTNING  # Pioruny trybu SOC - L
+        self.rules = compile_rules(RULE_PRESETS['koncowy2'])
         self.initialize_arrays()
         self.initialize_forest()
 
@@ -179,17 +256,31 @@ class ForestFireSimulation:
             self.update_burn_parameters()
 
     def update_window_size(self):
-        self.window_width = self.grid_width * self.cell_size + self.ui_width
-        self.window_height = self.grid_height * self.cell_size
+        self.window_width = self.camera.view_width + self.ui_width
+        self.window_height = self.camera.view_height
         if self.window_height < 800:
             self.window_height = 800
-        self.screen = pygame.display.set_mode((self.window_width, self.window_height))
+        if self.headless:
+            self.screen = pygame.Surface((self.window_width, self.window_height))
+        else:
+            self.screen = pygame.display.set_mode((self.window_width, self.window_height))
 
     def initialize_arrays(self):
         self.grid = np.zeros((self.grid_height, self.grid_width), dtype=np.int8)
         self.age_grid = np.zeros((self.grid_height, self.grid_width), dtype=np.int16)
         self.fire_intensity = np.zeros((self.grid_height, self.grid_width), dtype=np.float32)
         self.water_width = np.zeros((self.grid_height, self.grid_width), dtype=np.float32)
+        self.build_terrain_layer()
+
+    def build_terrain_layer(self):
+        """Stałe cieniowanie terenu i fazy fal - liczone raz na mapę, a nie co klatkę"""
+        seed_val = cell_seed(self.grid_width, self.grid_height)
+        self.rock_layer = get_rock_colors(seed_val)
+        self.desert_layer = get_desert_colors(seed_val)
+
+        ys, xs = np.mgrid[0:self.grid_height, 0:self.grid_width].astype(np.float32)
+        self.water_phase1 = xs * 0.3 + ys * 0.2
+        self.water_phase2 = xs * 0.2 - ys * 0.3
 
     def change_grid_size(self, dw, dh):
         new_w = max(50, self.grid_width + dw)
@@ -198,14 +289,12 @@ class ForestFireSimulation:
             self.grid_width = new_w
             self.grid_height = new_h
             self.initialize_arrays()
-            self.update_window_size()
+            self.camera.set_map_size(new_w, new_h)
             self.initialize_forest()
 
     def change_cell_size(self, amount):
-        new_size = max(1, min(20, self.cell_size + amount))
-        if new_size != self.cell_size:
-            self.cell_size = new_size
-            self.update_window_size()
+        """Zoom widoku - okno zachowuje stały rozmiar"""
+        self.camera.zoom(amount)
 
     def draw_circle_safe(self, cx, cy, radius, state, store_width=None):
         """
@@ -330,31 +419,37 @@ class ForestFireSimulation:
                         if self.grid[ny][nx] == EMPTY:
                             self.grid[ny][nx] = DESERT
 
-    def cut_forest_area(self, x, y, radius=3):
-        """Wycina las (tworzy pas ochronny)"""
-        for dy in range(-radius, radius + 1):
-            for dx in range(-radius, radius + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                    if self.grid[ny][nx] in [TREE_YOUNG, TREE_MATURE, TREE_OLD]:
-                        self.grid[ny][nx] = FIREBREAK
-                        self.age_grid[ny][nx] = 0
-
-    def plant_trees_area(self, x, y, radius=2):
-        """Sadzi drzewa w małym kółku (promień 2)"""
-        for dy in range(-radius, radius + 1):
-            for dx in range(-radius, radius + 1):
-                # DODANE: Sprawdzenie czy jest w kółku
-                if dx*dx + dy*dy <= radius*radius:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                        # Można sadzić na: pustej przestrzeni, popiele, pustyni
-                        if self.grid[ny][nx] in [EMPTY, ASH, DESERT]:
-                            self.grid[ny][nx] = TREE_MATURE
-                            self.age_grid[ny][nx] = 50
+    def cut_forest_area(self, x, y, radius=3, start=None):
+        """Wycina las (tworzy pas ochronny) - cały odcinek od start jednym stemplem"""
+        stroke = stroke_mask(*(start or (x, y)), x, y, radius, self.grid_width, self.grid_height)
+        if stroke is None:
+            return
+        rows, cols, mask = stroke
+        grid = self.grid[rows, cols]
+        hit = mask & (grid >= TREE_YOUNG) & (grid <= TREE_OLD)
+        grid[hit] = FIREBREAK
+        self.age_grid[rows, cols][hit] = 0
+
+    def plant_trees_area(self, x, y, radius=2, start=None):
+        """Sadzi drzewa w kółku o promieniu radius - na pustej ziemi, popiele i pustyni"""
+        stroke = stroke_mask(*(start or (x, y)), x, y, radius, self.grid_width, self.grid_height, 'disc')
+        if stroke is None:
+            return
+        rows, cols, mask = stroke
+        self.tiles.wake_region(cols.start, rows.start, cols.stop - 1, rows.stop - 1)
+        grid = self.grid[rows, cols]
+        hit = mask & ((grid == EMPTY) | (grid == ASH) | (grid == DESERT))
+        grid[hit] = TREE_MATURE
+        self.age_grid[rows, cols][hit] = 50
 
-    def initialize_forest(self, density=0.75):
-        """Inicjalizacja lasu - POPRAWIONA KOLEJNOŚĆ"""
+    def initialize_forest(self, density=0.75, desert=None):
+        """Inicjalizacja lasu - POPRAWIONA KOLEJNOŚĆ
+
+        desert=None - pustynia losowo (co trzecia mapa), True/False - wymuszona
+        """
+        self.stop_recording()  # Nowa mapa - kroki liczone od zera
+        self.stop_export()
+        self.stop_metrics()
         self.grid.fill(EMPTY)
         self.age_grid.fill(0)
         self.fire_intensity.fill(0)
@@ -365,7 +460,9 @@ class ForestFireSimulation:
         self.has_desert = False
 
         # KROK 1: Co trzecia symulacja - dodaj pustynię NAJPIERW
-        if random.random() < 0.33:
+        if desert is None:
+            desert = random.random() < 0.33
+        if desert:
             self.generate_desert()
             self.has_desert = True
 
@@ -398,31 +495,50 @@ class ForestFireSimulation:
         self.grid[tree_mask] = tree_types[tree_mask]
         self.age_grid[tree_mask] = np.random.randint(0, 100, size=np.count_nonzero(tree_mask))
 
+        self.rebuild_map()
+
+    def rebuild_map(self, meta=None):
+        """Stan zależny od mapy po jej wymianie - nowy las, przewinięcie SOC albo punkt kontrolny (meta).
+        Wiatr terenu i wilgotność zostają jak były, przy wczytaniu - jak przy zapisie."""
+        self.history.clear()
+        self.rules.prepare_map(self.grid)
+        if meta is None:
+            meta = {}
+            # Nowe kafelki - bez nadrabiania wieku za kroki sprzed wymiany mapy
+            self.tiles = TileActivityIndex(self.grid_height, self.grid_width, **self.rules.tile_activity())
+            self.tiles.last_step.fill(self.step_count)
+        # Starszy punkt kontrolny nie ma tych pól - zostaje bieżący wybór
+        terrain_wind = meta.get('terrain_wind', self.wind_field is not None)
+        moisture_step = meta.get('moisture_step', None if self.moisture is None else self.step_count)
+        self.wind_field = WindField(self.grid) if terrain_wind else None
+        self.moisture = None
+        if moisture_step is not None:
+            self.moisture = FuelMoisture(self.grid, self.burn_rate_multiplier, moisture_step)
+            if 'moisture_values' in meta:
+                self.moisture.restore(meta['moisture_values'])
+        if self.clusters is not None:
+            self.clusters = ClusterIndex(flammable_lut(self.rules), self.grid)
+        self.cluster_cell = None
+        if self.rasters is not None:
+            self.rasters = FireRasters(self.grid_height, self.grid_width)
+        self.forecast = None
+        self.risk_key = None
+        # Pożary z nowego stanu dostają numery wg spójnych fragmentów ognia
+        self.incidents = FireIncidents(self.grid_height, self.grid_width)
+        self.incidents.seed(np.flatnonzero(self.grid.ravel() == FIRE), self.step_count)
+        self.incident_surface = None
         self.update_stats()
 
-    def get_neighbors(self, x, y):
-        neighbors = []
-        directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                wind_mod = 1.0
-                if self.wind_strength > 0:
-                    dot = dx * self.wind_direction[0] + dy * self.wind_direction[1]
-                    if dot > 0:
-                        wind_mod += self.wind_strength * 3.0 * dot
-                    else:
-                        wind_mod *= 0.2
-                neighbors.append((nx, ny, wind_mod))
-        return neighbors
-
     def update_stats(self):
-        unique, counts = np.unique(self.grid, return_counts=True)
-        self.counts = dict(zip(unique, counts))
-        for k in COLORS.keys():
-            if k not in self.counts:
-                self.counts[k] = 0
+        # bincount zamiast np.unique - bez sortowania całej siatki
+        self.count_bins = np.bincount(self.grid.ravel(), minlength=len(COLOR_LUT))
+        self.counts = {k: int(self.count_bins[k]) for k in COLORS.keys()}
+
+    def is_idle(self):
+        """Czy symulacja stoi w miejscu (nic się nie zmieni bez akcji użytkownika)"""
+        if self.risk is not None and (self.risk_key is None or not self.risk.done):
+            return False  # Mapa ryzyka liczy się dalej także przed podpaleniem i przy pauzie
+        return self.paused or not self.fire_started
 
     def update(self):
         if self.paused or not self.fire_started:
@@ -437,164 +553,276 @@ class ForestFireSimulation:
         self.update_counter -= steps_to_do
 
         for _ in range(steps_to_do):
-            self._do_simulation_step()
-
-    def is_near_water(self, x, y, max_distance=8):
-        """Sprawdza czy komórka jest blisko wody"""
-        for dy in range(-max_distance, max_distance + 1):
-            for dx in range(-max_distance, max_distance + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                    if self.grid[ny][nx] == WATER:
-                        dist = (dx*dx + dy*dy)**0.5
-                        if dist <= max_distance:
-                            return True
-        return False
-
-    def can_fire_cross_water(self, x, y, wind_factor):
-        """Sprawdza czy ogień może przeskoczyć przez wodę przy silnym wietrze"""
-        if self.grid[y][x] != WATER:
-            return False
-        
-        water_w = self.water_width[y][x]
-        
-        if water_w < 3.5 and wind_factor > 3.0:
-            jump_chance = (wind_factor - 3.0) * 0.4 * (3.5 - water_w) / 3.5
-            if random.random() < jump_chance:
-                return True
-        
-        return False
+            with self.timer.measure('step'):
+                self._do_simulation_step()
 
     def _do_simulation_step(self):
         """Pojedynczy krok symulacji"""
         self.step_count += 1
-        new_grid = self.grid.copy()
-        new_fire = self.fire_intensity.copy()
-
-        rows, cols = self.grid.shape
-
-        for y in range(rows):
-            for x in range(cols):
-                state = self.grid[y][x]
-
-                if state == FIRE:
-                    new_fire[y][x] -= self.fire_decay
-
-                    if new_fire[y][x] <= 0:
-                        new_grid[y][x] = ASH
-                        new_fire[y][x] = 0
-                    else:
-                        for nx, ny, w_factor in self.get_neighbors(x, y):
-                            n_state = self.grid[ny][nx]
-
-                            if n_state in [ROCK, FIREBREAK, DESERT]:
-                                continue
-
-                            if n_state == WATER:
-                                if not self.can_fire_cross_water(nx, ny, w_factor):
-                                    continue
-
-                            if n_state in [TREE_YOUNG, TREE_MATURE, TREE_OLD]:
-                                base_prob = self.p_spread
-
-                                if n_state == TREE_YOUNG:
-                                    prob = base_prob * 0.5
-                                elif n_state == TREE_MATURE:
-                                    prob = base_prob * 1.0
-                                else:
-                                    prob = base_prob * 1.8
-
-                                prob *= w_factor
-                                prob = min(1.0, prob)
-
-                                if random.random() < prob:
-                                    new_grid[ny][nx] = FIRE
-                                    new_fire[ny][nx] = 1.0
-
-                elif state == ASH:
-                    if random.random() < self.p_ash_decay:
-                        new_grid[y][x] = EMPTY
-
-                elif state == EMPTY:
-                    if random.random() < self.p_grow:
-                        has_desert_neighbor = False
-                        for dx, dy in [(-1,0), (1,0), (0,-1), (0,1)]:
-                            nx, ny = x + dx, y + dy
-                            if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                                if self.grid[ny][nx] == DESERT:
-                                    has_desert_neighbor = True
-                                    break
-                        
-                        if not has_desert_neighbor:
-                            new_grid[y][x] = TREE_YOUNG
-                            self.age_grid[y][x] = 0
-
-                elif state in [TREE_YOUNG, TREE_MATURE]:
-                    self.age_grid[y][x] += 1
-                    age = self.age_grid[y][x]
-                    if state == TREE_YOUNG and age > 80:
-                        new_grid[y][x] = TREE_MATURE
-                    elif state == TREE_MATURE and age > 250:
-                        new_grid[y][x] = TREE_OLD
-
-                elif state == DESERT:
-                    if random.random() < P_DESERT_SPREAD:
-                        dx, dy = random.choice([(-1,0), (1,0), (0,-1), (0,1)])
-                        nx, ny = x + dx, y + dy
-                        
-                        if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                            neighbor_state = self.grid[ny][nx]
-                            
-                            if neighbor_state in [TREE_YOUNG, TREE_MATURE, TREE_OLD, EMPTY, ASH]:
-                                if not self.is_near_water(nx, ny, max_distance=8):
-                                    new_grid[ny][nx] = DESERT
 
+        # Tylko aktywne kafelki - reszta mapy w tym kroku się nie zmienia
+        with self.timer.measure('tiles'):
+            cells, cell_tiles = self.tiles.active_cells(self.step_count)
+            self.tiles.catch_up_ages(self.grid, self.age_grid, cells, cell_tiles, self.step_count)
+
+        with self.timer.measure('rules'):
+            if self.moisture is not None:
+                self.moisture.update(self.step_count, self.burn_rate_multiplier, self.wind_strength)
+            new_grid, new_fire = self.rules.step(self.grid, self.age_grid, self.fire_intensity, self, cells)
+
+        with self.timer.measure('tiles'):
+            self.tiles.refresh(self.grid, new_grid, self.age_grid, cells, cell_tiles, self.step_count, self)
         self.grid = new_grid
         self.fire_intensity = new_fire
-        self.update_stats()
+        with self.timer.measure('stats'):
+            self.update_stats()
+            self.history.record(self.count_bins)
+            if self.rasters is not None:
+                self.rasters.update(self.step_count, self.rules.ignited)
+            self.incidents.update(self.step_count, self.rules.ignited, self.rules.burned_out)
+            if self.clusters is not None:
+                self.clusters.sync(self.grid)
+        if self.metrics is not None:
+            with self.timer.measure('metrics'):
+                self.metrics.record(self)
+
+        if self.recorder is not None:
+            with self.timer.measure('record'):
+                self.recorder.record(self.step_count, self.grid, self.fire_intensity, self.age_grid)
+        if self.autosave is not None:
+            self.autosave.maybe_save(self)
+        if self.exporter is not None:
+            with self.timer.measure('export'):
+                self.exporter.maybe_push(self)
+
+    def toggle_recording(self):
+        """Nagrywanie przebiegu do pliku powtórki (F6)"""
+        if self.recorder is None:
+            self.recorder = ReplayRecorder('koncowy2', self.grid, self.fire_intensity, self.age_grid,
+                                           self.step_count)
+        else:
+            self.stop_recording()
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            print(f"Powtorka zapisana: {self.recorder.path}")
+            self.recorder = None
+
+    def toggle_export(self):
+        """Eksport klatek po każdym kroku - film przez ffmpeg lub katalog PNG (F9)"""
+        if self.exporter is None:
+            self.exporter = FrameExporter(default_output())
+        else:
+            self.stop_export()
+
+    def toggle_metrics(self):
+        """Zapis metryk każdego kroku do pliku CSV (F10)"""
+        if self.metrics is None:
+            self.metrics = MetricsStream(metrics_path(), COLORS.keys())
+        else:
+            self.stop_metrics()
+
+    def stop_metrics(self):
+        if self.metrics is not None:
+            self.metrics.close()
+            print(f"Metryki zapisane: {self.metrics.path} ({self.metrics.written} krokow)")
+            self.metrics = None
+
+    def cycle_overlay(self):
+        """Nakładka warstw zapłonu (I): brak -> izochrony -> mapa spaleń.
+        Warstwy zbierane są od pierwszego włączenia."""
+        if self.rasters is None:
+            self.rasters = FireRasters(self.grid_height, self.grid_width)
+        self.overlay = next_overlay(self.overlay)
+
+    def toggle_forecast(self):
+        """Prognoza dotarcia ognia od płonących komórek (P) - migawka dla bieżącej mapy, wiatru i pogody"""
+        if self.forecast is not None:
+            self.forecast = None
+            return
+        self.forecast = arrival_steps(forecast(self, FORECAST_HORIZON), self.step_count)
+        self.forecast_range = (self.step_count, max(int(self.forecast.max()), self.step_count + 1))
+
+    def toggle_risk(self):
+        """Mapa ryzyka (M) - szansa zapalenia komórek liczona bez losowania"""
+        if self.risk is not None:
+            self.risk = None
+            return
+        self.risk_key = None
+        self.update_risk()
+
+    def run_lightning(self, steps=SOC_FAST_FORWARD):
+        """Przewija steps kroków trybem SOC (L) - piorun spala cały fragment lasu naraz"""
+        self.stop_recording()
+        run = LightningRun(self)
+        sizes = run.advance(steps)
+        run.apply(self)
+        self.rebuild_map()
+        print(f"SOC: {steps} krokow, {len(sizes)} pozarow, najwiekszy {max(sizes, default=0)} komorek")
+
+    def toggle_clusters(self):
+        """Podgląd fragmentu lasu pod kursorem (K) - indeks tworzony przy włączeniu"""
+        if self.clusters is not None:
+            self.clusters = None
+            self.cluster_cell = None
+            return
+        self.clusters = ClusterIndex(flammable_lut(self.rules), self.grid)
 
-    def start_fire(self, x, y, r=2):
+    def update_cluster_hover(self, gx, gy):
+        """Komórka pod kursorem do podglądu fragmentu; indeks nadąża też za edycją narzędziami"""
+        inside = 0 <= gx < self.grid_width and 0 <= gy < self.grid_height
+        if self.clusters is None or self.wind_mode or not inside:
+            self.cluster_cell = None
+            return
+        self.clusters.sync(self.grid)
+        self.cluster_cell = (gx, gy)
+
+    def toggle_terrain_wind(self):
+        """Wiatr zależny od terenu (T) - rzeki kierują wiatr, skały go osłaniają"""
+        self.wind_field = None if self.wind_field is not None else WindField(self.grid)
+
+    def toggle_moisture(self):
+        """Wilgotność paliwa w komórkach (H) - wilgotniej przy wodzie, sucho na zboczach skał"""
+        if self.moisture is not None:
+            self.moisture = None
+            return
+        self.moisture = FuelMoisture(self.grid, self.burn_rate_multiplier, self.step_count)
+
+    def status_labels(self):
+        """Napisy włączonych trybów (profil, nagrywanie, nakładki...) w kolejności wyświetlania"""
+        labels = [f"PROFIL: {self.profiler.remaining}"] if self.profiler.active else []
+        modes = [
+            (self.recorder, "NAGRYWANIE"),
+            (self.exporter, "EKSPORT"),
+            (self.metrics, "METRYKI"),
+            (self.overlay, OVERLAY_NAMES.get(self.overlay)),
+            (self.forecast, "PROGNOZA"),
+            (self.risk, "RYZYKO"),
+            (self.clusters, "FRAGMENTY"),
+        ]
+        return labels + [label for state, label in modes if state is not None]
+
+    def draw_wind_rose(self, surface):
+        """Tryb W - kierunek wiatru na środku widoku i strzałki wiatru terenu"""
+        cx, cy = self.camera.view_width // 2, self.camera.view_height // 2
+        pygame.draw.circle(surface, (50, 50, 200), (cx, cy), 40, 2)
+        wx, wy = self.wind_direction
+        end_x = cx + wx * 60
+        end_y = cy + wy * 60
+        pygame.draw.line(surface, (255, 255, 0), (cx, cy), (end_x, end_y), 3)
+        if self.wind_field is not None:
+            self.draw_wind_field(surface)
+
+    def draw_wind_field(self, surface):
+        """Strzałki wiatru w komórkach widoku (tryb W z wiatrem terenu)"""
+        self.rules.spread_wind(self)  # Pole nadąża za wiatrem także w pauzie
+        spacing = max(1, round(ARROW_SPACING / self.camera.cell_size))
+        for x, y, vx, vy in self.wind_field.arrows(*self.camera.visible_cells(), spacing):
+            sx, sy = self.camera.grid_to_screen(x + 0.5, y + 0.5)
+            pygame.draw.line(surface, (255, 255, 0), (sx, sy), (sx + vx * ARROW_SCALE, sy + vy * ARROW_SCALE), 1)
+            pygame.draw.circle(surface, (255, 255, 0), (sx, sy), 2)
+
+    def update_risk(self):
+        """Po zmianie wiatru, pogody albo podpaleniu liczy od nowa, potem kilka kroków na klatkę.
+        Zwraca True, gdy mapa się zmieniła."""
+        key = (tuple(self.wind_direction), self.wind_strength, self.wind_field is not None,
+               self.moisture is not None, self.p_spread, self.fire_decay)
+        if key != self.risk_key:
+            self.risk_key = key
+            self.risk = RiskPreview(self.rules, self.grid, self.fire_intensity, self)
+        return self.risk.advance(RISK_STEPS_PER_FRAME)
+
+    def stop_export(self):
+        if self.exporter is not None:
+            self.exporter.close()
+            if self.rasters is not None:
+                print(f"Warstwy zaplonu: {save_rasters(self.rasters, self.exporter.output)}")
+            print(f"Eksport zapisany: {self.exporter.output} ({self.exporter.frames} klatek)")
+            self.exporter = None
+
+    def save(self, path):
+        """Zapis pełnego stanu symulacji (punkt kontrolny)"""
+        save_simulation(self, path, 'koncowy2', CHECKPOINT_ATTRIBUTES, CHECKPOINT_ARRAYS)
+
+    def load(self, path, mmap=True):
+        """Wczytanie punktu kontrolnego - tablice czytane przez mapowanie pliku i kopiowane do pamięci"""
+        self.stop_recording()
+        meta = load_simulation(self, path, 'koncowy2', mmap)
+        for name in CHECKPOINT_ATTRIBUTES:
+            setattr(self, name, meta[name])
+        self.set_weather_preset(self.current_weather)
+        self.rebuild_map(meta)
+
+    def start_fire(self, x, y, r=2, start=None):
+        """Podpala drzewa w kwadracie o promieniu r; start - poprzednia komórka przy przeciąganiu"""
         self.fire_started = True
-        for dy in range(-r, r + 1):
-            for dx in range(-r, r + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.grid_width and 0 <= ny < self.grid_height:
-                    if self.grid[ny][nx] in [TREE_YOUNG, TREE_MATURE, TREE_OLD]:
-                        self.grid[ny][nx] = FIRE
-                        self.fire_intensity[ny][nx] = 1.0
+        stroke = stroke_mask(*(start or (x, y)), x, y, r, self.grid_width, self.grid_height)
+        if stroke is None:
+            return
+        rows, cols, mask = stroke
+        self.tiles.wake_region(cols.start, rows.start, cols.stop - 1, rows.stop - 1)
+        grid = self.grid[rows, cols]
+        hit = mask & (grid >= TREE_YOUNG) & (grid <= TREE_OLD)
+        grid[hit] = FIRE
+        self.fire_intensity[rows, cols][hit] = 1.0
+        ignited = flat_indices(hit, rows, cols, self.grid_width)
+        self.incidents.ignite(ignited, self.step_count, new=start is None)  # Pociągnięcie to jeden pożar
+        if self.rasters is not None:
+            self.rasters.update(self.step_count, ignited)
+        self.risk_key = None  # Mapa ryzyka policzy się od nowego ognia
+
+    def compose_colors(self, rows=slice(None), cols=slice(None)):
+        """Kolory wycinka siatki grid[rows, cols] jako tablica (wysokość, szerokość, 3)"""
+        grid = self.grid[rows, cols]
+        frame = COLOR_LUT[grid]
+
+        water = grid == WATER
+        frame[water] = get_water_colors(self.water_phase1[rows, cols][water],
+                                        self.water_phase2[rows, cols][water], self.step_count)
+
+        rock = grid == ROCK
+        frame[rock] = self.rock_layer[rows, cols][rock]
+
+        desert = grid == DESERT
+        frame[desert] = self.desert_layer[rows, cols][desert]
+
+        trees = (grid >= TREE_YOUNG) & (grid <= TREE_OLD)
+        self.tiles.sync_ages(self.grid, self.age_grid, self.step_count, rows, cols)
+        frame[trees] = get_tree_colors(grid[trees], self.age_grid[rows, cols][trees])
+
+        fire = grid == FIRE
+        frame[fire, 0] = 255
+        frame[fire, 1] = np.clip((255 * self.fire_intensity[rows, cols][fire]).astype(np.int32), 0, 255)
+        frame[fire, 2] = 0
+
+        if self.overlay is not None:
+            frame = self.rasters.blend(frame, self.overlay, rows, cols)
+        if self.forecast is not None:
+            frame = blend_layer(frame, *isochrone_colors(self.forecast[rows, cols], *self.forecast_range))
+        if self.risk is not None:
+            frame = blend_layer(frame, *self.risk.colors(rows, cols))
+        if self.cluster_cell is not None:
+            frame = blend_layer(frame, *self.clusters.colors(*self.cluster_cell, rows, cols))
+        return frame
+
+    def render_rgb(self, step=1):
+        """Cała mapa jako tablica RGB (wysokość, szerokość, 3) - te same kolory co draw(), bez okna"""
+        return self.compose_colors(slice(None, None, step), slice(None, None, step))
 
     def draw(self, surface):
         """Rysowanie mapy z ulepszoną grafiką"""
-        for y in range(self.grid_height):
-            for x in range(self.grid_width):
-                state = self.grid[y][x]
-                
-                if state == WATER:
-                    color = get_water_color(x, y, self.step_count)
-                elif state == ROCK:
-                    color = get_rock_color(x, y)
-                elif state == DESERT:
-                    color = get_desert_color(x, y)
-                elif state in [TREE_YOUNG, TREE_MATURE, TREE_OLD]:
-                    color = get_tree_color(state, self.age_grid[y][x])
-                elif state == FIRE:
-                    intensity = self.fire_intensity[y][x]
-                    g = int(255 * intensity)
-                    color = (255, max(0, min(255, g)), 0)
-                else:
-                    color = COLORS.get(state, (0, 0, 0))
+        self.camera.draw_map(surface, self.compose_colors)
 
-                pygame.draw.rect(surface, color,
-                                 (x * self.cell_size, y * self.cell_size,
-                                  self.cell_size, self.cell_size))
+        # Włączone tryby jeden pod drugim w prawym górnym rogu mapy
+        for row, label in enumerate(self.status_labels()):
+            label_surf = small_font.render(label, True, (255, 80, 80))
+            surface.blit(label_surf, (self.camera.view_width - label_surf.get_width() - 10, 10 + 20 * row))
+        if self.cluster_cell is not None:
+            self.draw_cluster_tooltip(surface)
 
         if self.wind_mode:
-            cx, cy = (self.grid_width * self.cell_size) // 2, (self.grid_height * self.cell_size) // 2
-            pygame.draw.circle(surface, (50, 50, 200), (cx, cy), 40, 2)
-            wx, wy = self.wind_direction
-            end_x = cx + wx * 60
-            end_y = cy + wy * 60
-            pygame.draw.line(surface, (255, 255, 0), (cx, cy), (end_x, end_y), 3)
+            self.draw_wind_rose(surface)
 
         if self.cutting_mode:
             text_surf = font.render("WYCINANIE", True, (255, 200, 0))
@@ -602,7 +830,7 @@ class ForestFireSimulation:
 
         if self.paused:
             pause_surf = font.render("PAUZA", True, (255, 255, 0))
-            pause_rect = pause_surf.get_rect(center=(self.grid_width * self.cell_size // 2, 30))
+            pause_rect = pause_surf.get_rect(center=(self.camera.view_width // 2, 30))
             bg_rect = pause_rect.inflate(20, 10)
             pygame.draw.rect(surface, (0, 0, 0), bg_rect)
             pygame.draw.rect(surface, (255, 255, 0), bg_rect, 2)
@@ -623,9 +851,115 @@ class ForestFireSimulation:
             pygame.draw.rect(surface, speed_color, bg_rect, 2)
             surface.blit(speed_surf, speed_rect)
 
+    def panel_state(self):
+        """Wszystko, od czego zależy wygląd panelu bocznego"""
+        return (tuple(sorted(self.counts.items())), self.grid_width, self.grid_height, self.camera.cell_size,
+                self.window_height, self.wind_strength, self.wind_field is not None,
+                None if self.moisture is None else round(self.moisture.mean, 2), self.current_weather,
+                self.simulation_speed, self.has_desert)
+
     def draw_ui(self, surface):
+        """Panel boczny - przebudowywany w tle tylko gdy zmienią się jego dane"""
+        panel_key = self.panel_state()
+        if panel_key != self.panel_key:
+            self.panel_key = panel_key
+            if self.panel_surface is None or self.panel_surface.get_height() != self.window_height:
+                self.panel_surface = pygame.Surface((self.ui_width, self.window_height))
+            self.panel_surface.fill(BACKGROUND_COLOR)
+            self.build_panel(self.panel_surface)
+
+        surface.blit(self.panel_surface, (self.camera.view_width, 0))
+        # Licznik kroków zmienia się co krok - bez przebudowy panelu i bez zapisu w pamięci napisów
+        step_x, step_y = self.step_row
+        surface.blit(tiny_font.render(f"Krok: {self.step_count}", True, (180, 180, 180)),
+                     (self.camera.view_width + step_x, step_y))
+
+        # Wykresy poza buforowanym panelem - przesuwane o nowe kroki w każdej klatce
+        charts = self.history.update()
+        chart_x = self.camera.view_width + self.ui_width - 20 - CHART_WIDTH
+        for state_id, y in self.chart_rows:
+            surface.blit(charts[state_id].surface, (chart_x, y))
+        if self.timer.show:
+            self.draw_timing_overlay(surface)
+        if self.show_incidents:
+            self.draw_incident_overlay(surface)
+
+    def draw_timing_overlay(self, surface):
+        """Czasy faz (F3) na dole panelu - odświeżane co OVERLAY_REFRESH_MS"""
+        now = pygame.time.get_ticks()
+        if self.timing_surface is None or now - self.timing_refreshed >= OVERLAY_REFRESH_MS:
+            self.timing_refreshed = now
+            rows = self.timer.overlay_rows()
+            line_height = 20
+            self.timing_surface = pygame.Surface((self.ui_width, (len(rows) + 1) * line_height + 10))
+            self.timing_surface.fill((0, 0, 0))
+
+            title = "CZASY FAZ [ms]  min / sr / p95"
+            if self.timer.csv_writer is not None:
+                title += "  (CSV)"
+            self.timing_surface.blit(tiny_font.render(title, True, (255, 255, 100)), (10, 5))
+            y = 5 + line_height
+            for name, low, mean, p95 in rows:
+                self.timing_surface.blit(tiny_font.render(name, True, (180, 180, 180)), (10, y))
+                for col, value in enumerate((low, mean, p95)):
+                    value_surf = tiny_font.render(f"{value:.2f}", True, (220, 220, 220))
+                    self.timing_surface.blit(value_surf, (110 + col * 70, y))
+                y += line_height
+
+        overlay_y = self.window_height - self.timing_surface.get_height()
+        surface.blit(self.timing_surface, (self.camera.view_width, overlay_y))
+
+    def draw_cluster_tooltip(self, surface):
+        """Podpowiedź przy kursorze: ile lasu może spłonąć od pożaru w tej komórce"""
+        size = self.clusters.cluster_size(*self.cluster_cell)
+        total = self.grid_width * self.grid_height
+        lines = [f"Fragment lasu: {size} komorek ({100 * size / total:.1f}% mapy)" if size else "Brak paliwa - ogien nie ruszy",
+                 f"Najwiekszy fragment: {100 * self.clusters.largest_fraction():.1f}% mapy"]
+        texts = [tiny_font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(t.get_width() for t in texts) + 10
+        height = sum(t.get_height() for t in texts) + 10
+        mx, my = pygame.mouse.get_pos()
+        x = min(mx + 16, self.camera.view_width - width)
+        y = min(my + 16, self.camera.view_height - height)
+        pygame.draw.rect(surface, (0, 0, 0), (x, y, width, height))
+        pygame.draw.rect(surface, CLUSTER_HIGHLIGHT, (x, y, width, height), 1)
+        for t in texts:
+            surface.blit(t, (x + 5, y + 5))
+            y += t.get_height()
+
+    def draw_incident_overlay(self, surface):
+        """Tabela pożarów (N) na dole panelu, nad czasami faz - odświeżana co OVERLAY_REFRESH_MS"""
+        now = pygame.time.get_ticks()
+        if self.incident_surface is None or now - self.incident_refreshed >= OVERLAY_REFRESH_MS:
+            self.incident_refreshed = now
+            rows = self.incidents.overlay_rows(self.step_count)
+            line_height = 20
+            self.incident_surface = pygame.Surface((self.ui_width, (len(rows) + 2) * line_height + 10))
+            self.incident_surface.fill((0, 0, 0))
+
+            title = f"POZARY  plonace: {self.incidents.active_count()}"
+            self.incident_surface.blit(tiny_font.render(title, True, (255, 255, 100)), (10, 5))
+            y = 5 + line_height
+            for col, name in enumerate(["nr", "start", "pole", "plonie", "obwod", "tempo"]):
+                self.incident_surface.blit(tiny_font.render(name, True, (180, 180, 180)), (10 + col * 52, y))
+            y += line_height
+            for record in rows:
+                # Wygasłe pożary szarym kolorem
+                color = (220, 220, 220) if record['end_step'] is None else (120, 120, 120)
+                values = (record['id'], record['start_step'], record['area'], record['burning'],
+                          record['perimeter'], f"{record['rate']:.1f}")
+                for col, value in enumerate(values):
+                    self.incident_surface.blit(tiny_font.render(str(value), True, color), (10 + col * 52, y))
+                y += line_height
+
+        overlay_y = self.window_height - self.incident_surface.get_height()
+        if self.timer.show and self.timing_surface is not None:
+            overlay_y -= self.timing_surface.get_height()
+        surface.blit(self.incident_surface, (self.camera.view_width, overlay_y))
+
+    def build_panel(self, surface):
         """Odświeżony interfejs z większymi napisami"""
-        ui_x = self.grid_width * self.cell_size + 10
+        ui_x = 10
         y = 15
         total_cells = self.grid_width * self.grid_height
 
@@ -636,15 +970,18 @@ class ForestFireSimulation:
         pygame.draw.rect(surface, (25, 25, 25), weather_box)
         pygame.draw.rect(surface, weather_info['color'], weather_box, 3)
 
-        weather_text = small_font.render(f"{weather_info['name']}", True, weather_info['color'])
+        weather_text = render_text(small_font, f"{weather_info['name']}", weather_info['color'])
         surface.blit(weather_text, (ui_x + 3, y))
         y += 28
 
-        mult_text = tiny_font.render(f"Spalanie: {self.burn_rate_multiplier}x", True, (220, 220, 220))
+        mult_line = f"Spalanie: {self.burn_rate_multiplier}x"
+        if self.moisture is not None:
+            mult_line += f" | Wilgotnosc: {self.moisture.mean:.0%}"
+        mult_text = render_text(tiny_font, mult_line, (220, 220, 220))
         surface.blit(mult_text, (ui_x + 3, y))
         y += 24
 
-        spread_text = tiny_font.render(f"Rozprz.: {self.p_spread:.2f}", True, (180, 180, 180))
+        spread_text = render_text(tiny_font, f"Rozprz.: {self.p_spread:.2f}", (180, 180, 180))
         surface.blit(spread_text, (ui_x + 3, y))
         y += 28
 
@@ -652,7 +989,7 @@ class ForestFireSimulation:
         pygame.draw.line(surface, (60, 60, 60), (ui_x, y), (ui_x + self.ui_width - 20, y), 1)
         y += 8
         
-        legend_title = small_font.render("LEGENDA", True, (255, 255, 255))
+        legend_title = render_text(small_font, "LEGENDA", (255, 255, 255))
         surface.blit(legend_title, (ui_x, y))
         y += 26
 
@@ -667,14 +1004,16 @@ class ForestFireSimulation:
             ("Popiol", ASH),
         ]
 
+        self.chart_rows = []
         for name, state_id in legend_items:
             count = self.counts.get(state_id, 0)
             pct = (count / total_cells) * 100
 
+            self.chart_rows.append((state_id, y))
             pygame.draw.rect(surface, COLORS[state_id], (ui_x, y, 16, 16))
             pygame.draw.rect(surface, (80, 80, 80), (ui_x, y, 16, 16), 1)
 
-            text = tiny_font.render(f"{name}: {pct:.1f}%", True, (200, 200, 200))
+            text = render_text(tiny_font, f"{name}: {pct:.1f}%", (200, 200, 200))
             surface.blit(text, (ui_x + 20, y + 1))
             y += 21
 
@@ -683,11 +1022,13 @@ class ForestFireSimulation:
         y += 8
 
         # === PARAMETRY ===
-        params_title = small_font.render("PARAMETRY", True, (255, 255, 255))
+        params_title = render_text(small_font, "PARAMETRY", (255, 255, 255))
         surface.blit(params_title, (ui_x, y))
         y += 26
 
         wind_strength_text = f"Wiatr: {self.wind_strength:.1f}"
+        if self.wind_field is not None:
+            wind_strength_text += " teren"
         if self.wind_strength > 3.0:
             wind_color = (255, 50, 50)
             wind_strength_text += " EKSTR!"
@@ -703,22 +1044,25 @@ class ForestFireSimulation:
 
         params = [
             f"Mapa: {self.grid_width}x{self.grid_height}",
-            f"Zoom: {self.cell_size}px",
+            f"Zoom: {self.camera.cell_size:g}px",
             (wind_strength_text, wind_color),
-            f"Krok: {self.step_count}",
+            None,  # Krok - rysowany w draw_ui
             f"Predkosc: {self.simulation_speed:.1f}x",
         ]
 
         for param in params:
-            if isinstance(param, tuple):
-                t = tiny_font.render(param[0], True, param[1])
+            if param is None:
+                self.step_row = (ui_x, y)
             else:
-                t = tiny_font.render(param, True, (180, 180, 180))
-            surface.blit(t, (ui_x, y))
+                if isinstance(param, tuple):
+                    t = render_text(tiny_font, param[0], param[1])
+                else:
+                    t = render_text(tiny_font, param, (180, 180, 180))
+                surface.blit(t, (ui_x, y))
             y += 20
 
         if self.has_desert:
-            desert_warning = tiny_font.render("! PUSTYNIA AKTYWNA !", True, (255, 200, 50))
+            desert_warning = render_text(tiny_font, "! PUSTYNIA AKTYWNA !", (255, 200, 50))
             surface.blit(desert_warning, (ui_x, y))
             y += 20
 
@@ -727,7 +1071,7 @@ class ForestFireSimulation:
         y += 8
 
         # === STEROWANIE ===
-        controls_title = small_font.render("STEROWANIE", True, (255, 200, 50))
+        controls_title = render_text(small_font, "STEROWANIE", (255, 200, 50))
         surface.blit(controls_title, (ui_x, y))
         y += 26
 
@@ -742,22 +1086,37 @@ class ForestFireSimulation:
             "PODSTAWY:",
             "  LPM - Podpal",
             "  PPM - Sadz 3x3",
-            "  C - Wytnij",
-            "  W - Wiatr",
+            "  C - Wytnij, H - Wilgotnosc",
+            "  W - Wiatr, T - Wiatr terenu",
             "  +/- Sila wiatru",
             "  SCROLL - Reset",
+            "  PgUp/PgDn - Zoom",
+            "  SPM - Przesun widok",
+            "  F3 - Czasy faz",
+            "  F4 - Zapis do CSV",
+            "  F5 - Profil 120 klatek",
+            "  F6 - Nagrywanie powtorki",
+            "  F7 - Zapisz stan",
+            "  F8 - Wczytaj ostatni zapis",
+            "  F9 - Eksport filmu / PNG",
+            "  F10 - Metryki do CSV",
+            "  I - Izochrony / spalenia",
+            "  P - Prognoza ognia",
+            "  M - Mapa ryzyka",
+            "  N - Tabela pozarow",
+            "  K - Fragmenty lasu, L - SOC",
         ]
 
         for c in controls:
             if c.startswith("POGODA") or c.startswith("CZAS") or c.startswith("PODSTAWY"):
-                t = tiny_font.render(c, True, (255, 220, 100))
+                t = render_text(tiny_font, c, (255, 220, 100))
             else:
-                t = tiny_font.render(c, True, (170, 170, 170))
+                t = render_text(tiny_font, c, (170, 170, 170))
             surface.blit(t, (ui_x, y))
             y += 17
 
     def set_wind_from_mouse(self, mx, my):
-        cx, cy = (self.grid_width * self.cell_size) / 2, (self.grid_height * self.cell_size) / 2
+        cx, cy = self.camera.view_width / 2, self.camera.view_height / 2
         dx, dy = mx - cx, my - cy
         length = (dx * dx + dy * dy) ** 0.5
         if length > 0:
@@ -765,107 +1124,213 @@ class ForestFireSimulation:
 
 
 # --- START ---
-sim = ForestFireSimulation(START_GRID_WIDTH, START_GRID_HEIGHT, START_CELL_SIZE)
-running = True
-mouse_btn = [False, False, False]
-
-while running:
-    clock.tick(FPS)
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        elif event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                sim.paused = not sim.paused
-
-            elif event.key == pygame.K_LEFTBRACKET:
-                sim.simulation_speed = max(0.1, sim.simulation_speed * 0.5)
-            elif event.key == pygame.K_RIGHTBRACKET:
-                sim.simulation_speed = min(10.0, sim.simulation_speed * 2.0)
-            elif event.key == pygame.K_0:
-                sim.simulation_speed = 1.0
-
-            elif event.key == pygame.K_1:
-                sim.set_weather_preset('very_wet')
-            elif event.key == pygame.K_2:
-                sim.set_weather_preset('wet')
-            elif event.key == pygame.K_3:
-                sim.set_weather_preset('normal')
-            elif event.key == pygame.K_4:
-                sim.set_weather_preset('dry')
-            elif event.key == pygame.K_5:
-                sim.set_weather_preset('very_dry')
-            elif event.key == pygame.K_6:
-                sim.set_weather_preset('extreme')
-
-            elif event.key == pygame.K_c:
-                sim.cutting_mode = not sim.cutting_mode
-                if sim.cutting_mode:
-                    sim.wind_mode = False
-            elif event.key == pygame.K_w:
-                sim.wind_mode = not sim.wind_mode
-                if sim.wind_mode:
-                    sim.cutting_mode = False
-            elif event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS:
-                sim.wind_strength = min(5.0, sim.wind_strength + 0.2)
-            elif event.key == pygame.K_MINUS:
-                sim.wind_strength = max(0.0, sim.wind_strength - 0.2)
-
-            elif event.key == pygame.K_RIGHT:
-                sim.change_grid_size(20, 0)
-            elif event.key == pygame.K_LEFT:
-                sim.change_grid_size(-20, 0)
-            elif event.key == pygame.K_DOWN:
-                sim.change_grid_size(0, 20)
-            elif event.key == pygame.K_UP:
-                sim.change_grid_size(0, -20)
-
-            elif event.key == pygame.K_PAGEUP:
-                sim.change_cell_size(1)
-            elif event.key == pygame.K_PAGEDOWN:
-                sim.change_cell_size(-1)
-
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:
-                mouse_btn[0] = True
-            elif event.button == 3:
-                mouse_btn[2] = True
-            elif event.button == 4 or event.button == 5:
-                sim.initialize_forest()
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if event.button == 1:
-                mouse_btn[0] = False
-            elif event.button == 3:
-                mouse_btn[2] = False
-
-    mx, my = pygame.mouse.get_pos()
-
-    if sim.wind_mode:
-        sim.set_wind_from_mouse(mx, my)
-        if mouse_btn[0]:
-            sim.wind_mode = False
-    elif sim.cutting_mode:
-        gx, gy = mx // sim.cell_size, my // sim.cell_size
-        if 0 <= gx < sim.grid_width and 0 <= gy < sim.grid_height:
-            if mouse_btn[0]:
-                sim.cut_forest_area(gx, gy, radius=3)
-    else:
-        gx, gy = mx // sim.cell_size, my // sim.cell_size
-        if 0 <= gx < sim.grid_width and 0 <= gy < sim.grid_height:
+def main():
+    sim = ForestFireSimulation(START_GRID_WIDTH, START_GRID_HEIGHT, START_CELL_SIZE)
+    running = True
+    stroke_start = None  # Komórka z poprzedniej klatki przeciągania pędzlem
+    mouse_btn = [False, False, False]
+    needs_redraw = True
+    last_redraw = 0
+
+    while running:
+        if sim.is_idle() and not needs_redraw and not any(mouse_btn):
+            # Nic się nie zmienia - czekamy na zdarzenie zamiast rysować w kółko
+            events = [pygame.event.wait()] + pygame.event.get()
+        else:
+            clock.tick(FPS)
+            events = pygame.event.get()
+        sim.timer.begin_frame()
+
+        for event in events:
+            # Samo przesunięcie myszy nie zmienia obrazu (poza trybem wiatru, rysowaniem i podglądem K)
+            if event.type != pygame.MOUSEMOTION or sim.wind_mode or any(mouse_btn) or sim.clusters is not None:
+                needs_redraw = True
+
+            if event.type == pygame.QUIT:
+                running = False
+
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    sim.paused = not sim.paused
+
+                elif event.key == pygame.K_LEFTBRACKET:
+                    sim.simulation_speed = max(0.1, sim.simulation_speed * 0.5)
+                elif event.key == pygame.K_RIGHTBRACKET:
+                    sim.simulation_speed = min(10.0, sim.simulation_speed * 2.0)
+                elif event.key == pygame.K_0:
+                    sim.simulation_speed = 1.0
+
+                elif event.key == pygame.K_1:
+                    sim.set_weather_preset('very_wet')
+                elif event.key == pygame.K_2:
+                    sim.set_weather_preset('wet')
+                elif event.key == pygame.K_3:
+                    sim.set_weather_preset('normal')
+                elif event.key == pygame.K_4:
+                    sim.set_weather_preset('dry')
+                elif event.key == pygame.K_5:
+                    sim.set_weather_preset('very_dry')
+                elif event.key == pygame.K_6:
+                    sim.set_weather_preset('extreme')
+
+                elif event.key == pygame.K_c:
+                    sim.cutting_mode = not sim.cutting_mode
+                    if sim.cutting_mode:
+                        sim.wind_mode = False
+                elif event.key == pygame.K_w:
+                    sim.wind_mode = not sim.wind_mode
+                    if sim.wind_mode:
+                        sim.cutting_mode = False
+                elif event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS:
+                    sim.wind_strength = min(5.0, sim.wind_strength + 0.2)
+                elif event.key == pygame.K_MINUS:
+                    sim.wind_strength = max(0.0, sim.wind_strength - 0.2)
+
+                elif event.key == pygame.K_RIGHT:
+                    sim.change_grid_size(20, 0)
+                elif event.key == pygame.K_LEFT:
+                    sim.change_grid_size(-20, 0)
+                elif event.key == pygame.K_DOWN:
+                    sim.change_grid_size(0, 20)
+                elif event.key == pygame.K_UP:
+                    sim.change_grid_size(0, -20)
+
+                elif event.key == pygame.K_PAGEUP:
+                    sim.change_cell_size(1)
+                elif event.key == pygame.K_PAGEDOWN:
+                    sim.change_cell_size(-1)
+
+                elif event.key == pygame.K_F3:
+                    sim.timer.toggle_overlay()
+                elif event.key == pygame.K_F4:
+                    sim.timer.toggle_csv()
+                elif event.key == pygame.K_F5:
+                    sim.profiler.start()
+                elif event.key == pygame.K_F6:
+                    sim.toggle_recording()
+                elif event.key == pygame.K_F7:
+                    checkpoint_path = quicksave_path()
+                    sim.save(checkpoint_path)
+                    print(f"Stan zapisany: {checkpoint_path}")
+                elif event.key == pygame.K_F8:
+                    checkpoint_path = latest_checkpoint('.', 'koncowy2')
+                    if checkpoint_path:
+                        try:
+                            sim.load(checkpoint_path)
+                        except (ValueError, OSError) as error:
+                            print(f"Nie wczytano {checkpoint_path}: {error}")
+                        else:
+                            print(f"Wczytano: {checkpoint_path}")
+                elif event.key == pygame.K_F9:
+                    sim.toggle_export()
+                elif event.key == pygame.K_F10:
+                    sim.toggle_metrics()
+                elif event.key == pygame.K_i:
+                    sim.cycle_overlay()
+                elif event.key == pygame.K_p:
+                    sim.toggle_forecast()
+                elif event.key == pygame.K_m:
+                    sim.toggle_risk()
+                elif event.key == pygame.K_n:
+                    sim.show_incidents = not sim.show_incidents
+                elif event.key == pygame.K_k:
+                    sim.toggle_clusters()
+                elif event.key == pygame.K_l:
+                    sim.run_lightning()
+                    needs_redraw = True
+                elif event.key == pygame.K_t:
+                    sim.toggle_terrain_wind()
+                elif event.key == pygame.K_h:
+                    sim.toggle_moisture()
+
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:
+                    mouse_btn[0] = True
+                elif event.button == 2:
+                    mouse_btn[1] = True
+                elif event.button == 3:
+                    mouse_btn[2] = True
+                elif event.button == 4 or event.button == 5:
+                    sim.initialize_forest()
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:
+                    mouse_btn[0] = False
+                elif event.button == 2:
+                    mouse_btn[1] = False
+                elif event.button == 3:
+                    mouse_btn[2] = False
+            elif event.type == pygame.MOUSEMOTION:
+                if mouse_btn[1]:
+                    sim.camera.pan(*event.rel)
+
+        mx, my = pygame.mouse.get_pos()
+
+        if sim.wind_mode:
+            sim.set_wind_from_mouse(mx, my)
             if mouse_btn[0]:
-                sim.start_fire(gx, gy, 2)
-            elif mouse_btn[2]:
-                # ZMIENIONE: Sadzenie drzew w obszarze 9x9 (radius=4)
-                sim.plant_trees_area(gx, gy, radius=2)
-
-    sim.update()
-
-    sim.screen.fill((20, 20, 20))
-    sim.draw(sim.screen)
-    sim.draw_ui(sim.screen)
-
-    pygame.display.flip()
-
-pygame.quit()
\ No newline at end of file
+                sim.wind_mode = False
+        elif sim.cutting_mode:
+            gx, gy = sim.camera.screen_to_grid(mx, my)
+            if 0 <= gx < sim.grid_width and 0 <= gy < sim.grid_height:
+                if any(mouse_btn):
+                    needs_redraw = True
+                if mouse_btn[0]:
+                    sim.cut_forest_area(gx, gy, radius=3, start=stroke_start)
+        else:
+            gx, gy = sim.camera.screen_to_grid(mx, my)
+            if 0 <= gx < sim.grid_width and 0 <= gy < sim.grid_height:
+                if any(mouse_btn):
+                    needs_redraw = True
+                if mouse_btn[0]:
+                    sim.start_fire(gx, gy, 2, stroke_start)
+                elif mouse_btn[2]:
+                    # ZMIENIONE: Sadzenie drzew w obszarze 9x9 (radius=4)
+                    sim.plant_trees_area(gx, gy, radius=2, start=stroke_start)
+
+        # Poprzednia komórka pod kursorem - w następnej klatce pędzel pociągnie odcinek od niej
+        gx, gy = sim.camera.screen_to_grid(mx, my)
+        painting = (mouse_btn[0] or mouse_btn[2]) and not sim.wind_mode
+        if painting and 0 <= gx < sim.grid_width and 0 <= gy < sim.grid_height:
+            stroke_start = (gx, gy)
+        else:
+            stroke_start = None
+        sim.update_cluster_hover(gx, gy)
+
+        steps_before = sim.step_count
+        sim.update()
+        # Mapa ryzyka dolicza kilka kroków na klatkę i startuje od nowa po ruchu wiatru
+        if sim.risk is not None and sim.update_risk():
+            needs_redraw = True
+
+        if sim.step_count != steps_before:
+            # Sam odrost lasu zmienia mapę powoli - wystarczy rzadsze odświeżanie
+            now = pygame.time.get_ticks()
+            if sim.counts.get(FIRE, 0) > 0 or now - last_redraw >= 1000 // REGROWTH_FPS:
+                needs_redraw = True
+
+        if needs_redraw:
+            sim.screen.fill(BACKGROUND_COLOR)
+            with sim.timer.measure('draw'):
+                sim.draw(sim.screen)
+            with sim.timer.measure('draw_ui'):
+                sim.draw_ui(sim.screen)
+
+            with sim.timer.measure('flip'):
+                pygame.display.flip()
+            needs_redraw = False
+            last_redraw = pygame.time.get_ticks()
+
+        sim.timer.end_frame()
+        profile_path = sim.profiler.advance()
+        if profile_path:
+            print(f"Profil zapisany: {profile_path}")
+
+    sim.timer.stop_csv()
+    sim.stop_recording()
+    sim.stop_export()
+    sim.stop_metrics()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Metryki przebiegu zapisywane krok po kroku.
+
+Wiersz na krok: liczba komórek każdego stanu, nowe zapalenia, wypalenia,
+łączna spalona powierzchnia i długość obwodu ognia. Wiersze trafiają do
+prealokowanego bufora kołowego i są zapisywane hurtem, gdy bufor się zapełni.
+
+Format pliku zależy od ścieżki: '.csv' to CSV, inna ścieżka to katalog
+kolumnowy - jeden plik int64 na kolumnę (np.fromfile / np.memmap) i columns.json.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+from rules import (DIRECTIONS_4, EMPTY, TREE_YOUNG, TREE_MATURE, TREE_OLD, FIRE, ASH, WATER, ROCK,
+                   FIREBREAK, DESERT, neighbor_indices)
+
+METRICS_CAPACITY = 4096  # Wiersze w buforze przed zapisem na dysk
+
+STATE_NAMES = {
+    EMPTY: 'empty',
+    TREE_YOUNG: 'tree_young',
+    TREE_MATURE: 'tree_mature',
+    TREE_OLD: 'tree_old',
+    FIRE: 'fire',
+    ASH: 'ash',
+    WATER: 'water',
+    ROCK: 'rock',
+    FIREBREAK: 'firebreak',
+    DESERT: 'desert',
+}
+
+
+def metrics_path():
+    return time.strftime("metrics_%Y%m%d_%H%M%S.csv")
+
+
+class RingBuffer:
+    """Tablica (capacity, kolumny) zapisywana w kółko - najstarsze wiersze są nadpisywane"""
+
+    def __init__(self, capacity, columns, dtype=np.int64):
+        self.data = np.zeros((capacity, columns), dtype=dtype)
+        self.capacity = capacity
+        self.head = 0  # Miejsce na następny wiersz
+        self.size = 0
+        self.total = 0  # Wszystkie dopisane wiersze, także nadpisane
+
+    @property
+    def full(self):
+        return self.size == self.capacity
+
+    def append(self, row):
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self.total += 1
+
+    def ordered(self):
+        """Wiersze od najstarszego do najnowszego"""
+        if self.size < self.capacity:
+            return self.data[:self.size]
+        return np.concatenate([self.data[self.head:], self.data[:self.head]])
+
+    def latest(self):
+        return self.data[(self.head - 1) % self.capacity]
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+
+def fire_perimeter(burning, flat_grid, width, height):
+    """Liczba krawędzi (4-sąsiedztwo) płonących komórek, po których drugiej stronie nie ma ognia.
+    Krawędź na brzegu mapy też się liczy - jak obwód pożaru w incidents.py."""
+    edges = 4 * burning.size
+    for dx, dy in DIRECTIONS_4:
+        neighbors = neighbor_indices(burning, dx, dy, width, height)
+        edges -= np.count_nonzero(flat_grid[neighbors] == FIRE)
+    return edges
+
+
+class MetricsStream:
+    """Strumień metryk na krok z zapisem hurtowym do CSV lub katalogu kolumnowego"""
+
+    def __init__(self, path, states, capacity=METRICS_CAPACITY):
+        self.path = path
+        self.states = np.array(sorted(states))
+        self.columns = (['step'] + [f"count_{STATE_NAMES[state]}" for state in self.states] +
+                        ['ignited', 'burned_out', 'burned_area', 'perimeter'])
+        self.buffer = RingBuffer(capacity, len(self.columns))
+        self.row = np.zeros(len(self.columns), dtype=np.int64)
+        self.burned_area = 0
+        self.written = 0
+
+        self.csv = path.lower().endswith('.csv')
+        self.files = None
+
+    def record(self, sim):
+        """Dopisuje wiersz dla bieżącego kroku (po update_stats)"""
+        rules = sim.rules
+        n = self.states.size
+        self.burned_area += rules.ignited.size
+
+        row = self.row
+        row[0] = sim.step_count
+        row[1:1 + n] = sim.count_bins[self.states]
+        row[1 + n] = rules.ignited.size
+        row[2 + n] = rules.burned_out.size
+        row[3 + n] = self.burned_area
+        row[4 + n] = fire_perimeter(rules.burning, sim.grid.ravel(), sim.grid_width, sim.grid_height)
+        self.buffer.append(row)
+
+        if self.buffer.full:
+            self.flush()
+
+    def _open(self):
+        if self.csv:
+            self.files = [open(self.path, 'w', encoding='utf-8')]
+            self.files[0].write(','.join(self.columns) + '\n')
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, 'columns.json'), 'w', encoding='utf-8') as f:
+                json.dump({'columns': self.columns, 'dtype': '<i8'}, f)
+            self.files = [open(os.path.join(self.path, f"{name}.i64"), 'wb') for name in self.columns]
+
+    def flush(self):
+        """Zapisuje zebrane wiersze jednym blokiem i opróżnia bufor"""
+        rows = self.buffer.ordered()
+        if rows.size == 0:
+            return
+        if self.files is None:
+            self._open()
+        if self.csv:
+            np.savetxt(self.files[0], rows, fmt='%d', delimiter=',')
+        else:
+            for column, f in zip(rows.T, self.files):
+                column.astype('<i8').tofile(f)
+        for f in self.files:
+            f.flush()
+        self.written += len(rows)
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        if self.files is None:
+            self._open()  # Sam nagłówek, gdy nie było żadnego kroku
+        for f in self.files:
+            f.close()
+        self.files = None
+
+
+def read_columns(path):
+    """Wczytuje katalog kolumnowy jako słownik nazwa -> tablica (mapowana z pliku)"""
+    with open(os.path.join(path, 'columns.json'), encoding='utf-8') as f:
+        info = json.load(f)
+    columns = {}
+    for name in info['columns']:
+        column_path = os.path.join(path, f"{name}.i64")
+        if os.path.getsize(column_path) == 0:
+            columns[name] = np.zeros(0, dtype=info['dtype'])
+        else:
+            columns[name] = np.memmap(column_path, dtype=info['dtype'], mode='r')
+    return columns
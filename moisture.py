@@ -0,0 +1,85 @@
+"""Wilgotność paliwa w każdej komórce - zamiast jednego mnożnika pogody dla całej mapy.
+
+Wilgotność m (0 - sucho, 1 - mokro) daje mnożnik spalania exp(SENSITIVITY * (MOISTURE_NORMAL - m)),
+więc preset pogody o mnożniku x odpowiada wilgotności target_moisture(x). Przy wodzie
+paliwo jest wilgotniejsze, na zboczach przy skałach suchsze; wilgotność co
+MOISTURE_INTERVAL kroków dąży do celu pogody (schnie szybciej przy wietrze).
+
+p_spread i fire_decay symulacji zawierają już mnożnik presetu, więc RuleKernel.step
+mnoży je przez factor = exp(SENSITIVITY * (target_moisture(x) - m)) - skutek zależy
+tylko od wilgotności komórki. p_grow i p_ash_decay zostają przy mnożniku presetu.
+"""
+import numpy as np
+
+from rules import ROCK, WATER, dilate
+
+MOISTURE_NORMAL = 0.5  # Wilgotność przy pogodzie 'normal' (mnożnik 1)
+SENSITIVITY = 3.0  # Jak mocno wilgotność zmienia mnożnik spalania
+WET_DISTANCE = 10  # Zasięg wilgoci od wody (komórki)
+WATER_WETNESS = 0.25  # O ile wilgotniej tuż przy wodzie - dalej liniowo do zera
+SLOPE_DISTANCE = 3  # Zbocza - komórki najwyżej tyle od skał
+SLOPE_DRYNESS = 0.1  # O ile suchsze są zbocza
+MOISTURE_INTERVAL = 10  # Co ile kroków liczona jest zmiana wilgotności
+DRYING_RATE = 0.002  # Część różnicy do celu na krok przy wysychaniu
+WETTING_RATE = 0.004  # ... i przy nasiąkaniu
+WIND_DRYING = 0.5  # Przyspieszenie wysychania na jednostkę siły wiatru
+
+
+def target_moisture(multiplier):
+    """Wilgotność, przy której mnożnik spalania wynosi multiplier"""
+    return float(np.clip(MOISTURE_NORMAL - np.log(multiplier) / SENSITIVITY, 0.0, 1.0))
+
+
+def terrain_offset(grid):
+    """(wysokość, szerokość) float32 - przesunięcie wilgotności od terenu"""
+    offset = np.zeros(grid.shape, dtype=np.float32)
+    water = grid == WATER
+    reached = water
+    for distance in range(1, WET_DISTANCE):
+        ring = dilate(water, distance) & ~reached
+        offset[ring] += WATER_WETNESS * (1 - (distance - 1) / WET_DISTANCE)
+        reached = reached | ring
+    offset[dilate(grid == ROCK, SLOPE_DISTANCE) & ~reached] -= SLOPE_DRYNESS
+    return offset
+
+
+class FuelMoisture:
+    """Raster wilgotności (float16) i płaski mnożnik factor dla p_spread i fire_decay"""
+
+    def __init__(self, grid, multiplier=1.0, step=0):
+        self.offset = terrain_offset(grid)
+        self.multiplier = multiplier
+        self.last_step = step
+        # Start od stanu równowagi - bez skoku po włączeniu
+        self.values = self.equilibrium().astype(np.float16)
+        self._update_factor()
+
+    def equilibrium(self):
+        """Wilgotność, do której dążą komórki przy bieżącej pogodzie"""
+        return np.clip(target_moisture(self.multiplier) + self.offset, 0.0, 1.0)
+
+    def update(self, step, multiplier=1.0, wind_strength=0.0):
+        """Zmiana pogody działa od razu na factor, wilgotność zmienia się co MOISTURE_INTERVAL kroków"""
+        if multiplier != self.multiplier:
+            self.multiplier = multiplier
+            self._update_factor()
+        steps = step - self.last_step
+        if steps < MOISTURE_INTERVAL:
+            return
+        self.last_step = step
+        values = self.values.astype(np.float32)
+        target = self.equilibrium()
+        rate = np.where(values > target, DRYING_RATE * (1 + WIND_DRYING * wind_strength), WETTING_RATE)
+        values += (target - values) * (1 - (1 - rate) ** steps)
+        self.values = values.astype(np.float16)
+        self._update_factor()
+
+    def restore(self, values):
+        """Wilgotność z punktu kontrolnego zamiast stanu równowagi"""
+        self.values = np.asarray(values, dtype=np.float16).reshape(self.offset.shape)
+        self._update_factor()
+
+    def _update_factor(self):
+        values = self.values.astype(np.float32)
+        self.factor = np.exp(SENSITIVITY * (target_moisture(self.multiplier) - values)).ravel()
+        self.mean = float(values.mean())
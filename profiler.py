@@ -0,0 +1,165 @@
+"""Profilowanie na żądanie - kolejne N klatek (F5 w oknie) lub kroków (bez okna).
+
+Tryb 'sample' co kilka milisekund zapisuje stos wątku symulacji i zapisuje
+plik .folded (format flamegraph.pl / speedscope / inferno). Tryb 'cprofile'
+zapisuje plik .prof do obejrzenia w pstats, snakeviz lub flameprof.
+
+Przykład (pustynia + pogoda ekstremalna w koncowy2):
+    python profiler.py --variant koncowy2 --regime desert --weather extreme --steps 200
+"""
+import argparse
+import cProfile
+import importlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_FRAMES = 120  # Domyślna długość przechwytywania
+SAMPLE_INTERVAL = 0.002  # Sekundy między próbkami stosu
+MODES = ['sample', 'cprofile']
+
+
+class SamplingProfiler:
+    """Próbkuje stos wybranego wątku z osobnego wątku - symulacja działa dalej.
+
+    Wątek próbkujący dostaje GIL dopiero, gdy symulacja go odda (NumPy, co
+    kilka ms w czystym Pythonie), więc odstępy między próbkami są przybliżone.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.target_id = None
+
+    def start(self):
+        self.target_id = threading.get_ident()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def write(self, path):
+        """Stosy złożone: 'a;b;c liczba_próbek' w każdej linii"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileCapture:
+    """Przechwytywanie profilu przez określoną liczbę klatek lub kroków"""
+
+    def __init__(self, mode='sample', prefix='profile'):
+        self.mode = mode
+        self.prefix = prefix
+        self.remaining = 0
+        self.profiler = None
+        self.last_path = None
+
+    @property
+    def active(self):
+        return self.profiler is not None
+
+    def start(self, count=PROFILE_FRAMES):
+        if self.active:
+            return
+        self.remaining = count
+        if self.mode == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+
+    def advance(self):
+        """Wywoływane po każdej klatce/kroku - zwraca ścieżkę pliku po zakończeniu"""
+        if not self.active:
+            return None
+        self.remaining -= 1
+        if self.remaining > 0:
+            return None
+        return self.finish()
+
+    def finish(self):
+        if self.mode == 'cprofile':
+            self.profiler.disable()
+            path = time.strftime(f"{self.prefix}_%Y%m%d_%H%M%S.prof")
+            self.profiler.dump_stats(path)
+        else:
+            self.profiler.stop()
+            path = time.strftime(f"{self.prefix}_%Y%m%d_%H%M%S.folded")
+            self.profiler.write(path)
+        self.profiler = None
+        self.last_path = path
+        return path
+
+
+def main(argv=None):
+    # Import tutaj - uruchomienie z wiersza poleceń działa bez okna
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import numpy as np
+    from benchmark import VARIANTS, REGIMES, parse_size, prepare_regime, supports
+
+    parser = argparse.ArgumentParser(description="Profil wybranego scenariusza bez okna")
+    parser.add_argument('--variant', default='koncowy2', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--regime', default='single', choices=REGIMES)
+    parser.add_argument('--weather', help="preset pogody, np. extreme")
+    parser.add_argument('--wind', type=float, help="siła wiatru")
+    parser.add_argument('--steps', type=int, default=PROFILE_FRAMES, help="liczba profilowanych kroków")
+    parser.add_argument('--warmup', type=int, default=0, help="kroki przed profilowaniem")
+    parser.add_argument('--mode', default='sample', choices=MODES)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    module = importlib.import_module(args.variant)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if not supports(sim, args.regime):
+        parser.error(f"{args.variant} nie obsluguje rodzaju pozaru {args.regime}")
+    presets = getattr(module, 'WEATHER_PRESETS', {})
+    if args.weather and (args.weather not in presets or not hasattr(sim, 'set_weather_preset')):
+        parser.error(f"{args.variant} nie ma pogody {args.weather} (dostepne: {', '.join(presets) or 'brak'})")
+
+    if args.regime == 'desert':
+        sim.initialize_forest(desert=True)
+    prepare_regime(sim, args.regime)
+    if args.weather:
+        sim.set_weather_preset(args.weather)
+    if args.wind is not None:
+        sim.wind_strength = args.wind
+
+    for _ in range(args.warmup):
+        sim._do_simulation_step()
+
+    capture = ProfileCapture(args.mode, prefix=f"profile_{args.variant}_{args.regime}")
+    capture.start(args.steps)
+    path = None
+    while path is None:
+        sim._do_simulation_step()
+        path = capture.advance()
+    print(f"Profil zapisany: {path}")
+
+
+if __name__ == "__main__":
+    main()
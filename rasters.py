@@ -0,0 +1,101 @@
+"""Warstwy rastrowe pożaru - krok pierwszego zapłonu i liczba spaleń każdej komórki.
+
+Obie warstwy są aktualizowane wektorowo z rules.ignited, czyli komórek, które
+w danym kroku stały się ogniem. Nakładki: izochrony czasu zapłonu (kolor wg
+kroku i linie co ISOCHRONE_EVERY kroków) oraz mapa cieplna liczby spaleń.
+"""
+import numpy as np
+
+NOT_IGNITED = -1
+ISOCHRONE_EVERY = 10  # Kroki między liniami izochron
+OVERLAY_ALPHA = 0.65
+OVERLAY_MODES = [None, 'isochrones', 'heatmap']
+OVERLAY_NAMES = {'isochrones': 'IZOCHRONY', 'heatmap': 'MAPA SPALEN'}
+
+
+def gradient(stops):
+    """Paleta 256 kolorów (uint8) z równo rozłożonych kolorów stops"""
+    stops = np.asarray(stops, dtype=np.float64)
+    positions = np.linspace(0, 255, len(stops))
+    levels = np.arange(256)
+    return np.stack([np.interp(levels, positions, stops[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+
+# Izochrony: wczesny zapłon niebieski, późny czerwony
+ISOCHRONE_LUT = gradient([(40, 60, 200), (0, 190, 220), (80, 220, 80), (250, 220, 40), (230, 40, 30)])
+# Liczba spaleń: od ciemnego fioletu do jasnożółtego
+HEATMAP_LUT = gradient([(50, 10, 90), (150, 30, 110), (230, 80, 40), (255, 190, 40), (255, 255, 200)])
+ISOCHRONE_LINE = (255, 255, 255)
+
+
+def isochrone_colors(steps, first, last):
+    """(kolory, maska) dla tablicy kroków zapłonu: kolor wg kroku w [first, last]
+    i linie co ISOCHRONE_EVERY kroków; maska - komórki z krokiem różnym od NOT_IGNITED"""
+    mask = steps != NOT_IGNITED
+    span = max(last - first, 1)
+    levels = (steps.astype(np.int64) - first) * 255 // span
+    colors = ISOCHRONE_LUT[np.clip(levels, 0, 255)]
+
+    # Linia tam, gdzie sąsiad (prawy lub dolny) też się palił, ale w innym paśmie czasu
+    bands = steps // ISOCHRONE_EVERY
+    edges = np.zeros(mask.shape, dtype=bool)
+    edges[:, :-1] |= (bands[:, :-1] != bands[:, 1:]) & mask[:, 1:]
+    edges[:-1, :] |= (bands[:-1, :] != bands[1:, :]) & mask[1:, :]
+    colors[edges & mask] = ISOCHRONE_LINE
+    return colors, mask
+
+
+def blend_layer(frame, colors, mask):
+    """Miesza kolory warstwy z klatką w komórkach maski (w miejscu)"""
+    mixed = frame[mask] * (1 - OVERLAY_ALPHA) + colors[mask] * OVERLAY_ALPHA
+    frame[mask] = mixed.astype(np.uint8)
+    return frame
+
+
+class FireRasters:
+    """Krok pierwszego zapłonu (int32, -1 = nigdy) i licznik spaleń (int32) każdej komórki"""
+
+    def __init__(self, height, width):
+        self.ignition_step = np.full((height, width), NOT_IGNITED, dtype=np.int32)
+        self.burn_count = np.zeros((height, width), dtype=np.int32)
+        self.first_step = None  # Zakres kroków i maksimum licznika do skalowania palet
+        self.last_step = 0
+        self.max_count = 0
+
+    def update(self, step, ignited):
+        """ignited - płaskie indeksy komórek zapalonych w kroku step, bez powtórzeń"""
+        if ignited.size == 0:
+            return
+        ignition = self.ignition_step.reshape(-1)
+        first = ignited[ignition[ignited] == NOT_IGNITED]
+        ignition[first] = step
+
+        counts = self.burn_count.reshape(-1)
+        counts[ignited] += 1
+        self.max_count = max(self.max_count, int(counts[ignited].max()))
+        if self.first_step is None:
+            self.first_step = step
+        self.last_step = step
+
+    def colors(self, mode, rows=slice(None), cols=slice(None)):
+        """(kolory, maska) wycinka warstwy - maska to komórki, które w ogóle się paliły"""
+        if mode == 'isochrones':
+            return isochrone_colors(self.ignition_step[rows, cols], self.first_step or 0, self.last_step)
+        counts = self.burn_count[rows, cols]
+        mask = counts > 0
+        levels = counts.astype(np.int64) * 255 // max(self.max_count, 1)
+        return HEATMAP_LUT[levels], mask
+
+    def blend(self, frame, mode, rows=slice(None), cols=slice(None)):
+        """Nakłada warstwę na klatkę compose_colors (w miejscu)"""
+        return blend_layer(frame, *self.colors(mode, rows, cols))
+
+    def render(self, mode):
+        """Sama warstwa na czarnym tle jako tablica RGB (wysokość, szerokość, 3)"""
+        colors, mask = self.colors(mode)
+        colors[~mask] = 0
+        return colors
+
+
+def next_overlay(mode):
+    return OVERLAY_MODES[(OVERLAY_MODES.index(mode) + 1) % len(OVERLAY_MODES)]
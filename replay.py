@@ -0,0 +1,345 @@
+"""Zapis przebiegu symulacji i odtwarzanie bez ponownego liczenia.
+
+Plik powtórki: nagłówek JSON, a po nim rekordy [rodzaj, krok, długość, dane zlib].
+Co KEYFRAME_INTERVAL kroków zapisywana jest pełna klatka (grid, fire_intensity,
+age_grid), pomiędzy nimi tylko zmienione komórki grid i fire_intensity. Rekordy
+są dopisywane na końcu, więc plik nadaje się do odczytu nawet w trakcie nagrywania.
+
+Odtwarzanie:
+    python replay.py replay_20240101_120000.replay
+"""
+import bisect
+import json
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b'FFREPLAY'
+VERSION = 1
+KEYFRAME_INTERVAL = 100  # Co ile kroków pełna klatka - koszt przewijania to maks. tyle delt
+COMPRESS_LEVEL = 3
+QUEUE_SIZE = 64  # Rekordy czekające na kompresję - przy zapełnieniu krok poczeka
+
+KEYFRAME = 0
+DELTA = 1
+
+RECORD_HEADER = struct.Struct('<BqI')  # rodzaj, krok, długość danych
+LENGTH = struct.Struct('<I')
+COUNT = struct.Struct('<i')
+
+GRID_DTYPE = np.int8
+FIRE_DTYPE = np.float32
+AGE_DTYPE = np.int16
+INDEX_DTYPE = np.int32
+
+
+class ReplayRecorder:
+    """Nagrywa kolejne kroki. Kompresja i zapis odbywają się w osobnym wątku."""
+
+    def __init__(self, variant, grid, fire_intensity, age_grid, step, path=None,
+                 keyframe_interval=KEYFRAME_INTERVAL):
+        if path is None:
+            path = time.strftime("replay_%Y%m%d_%H%M%S.replay")
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.last_keyframe = step
+
+        height, width = grid.shape
+        header = json.dumps({
+            'version': VERSION,
+            'variant': variant,
+            'width': width,
+            'height': height,
+            'keyframe_interval': keyframe_interval,
+        }).encode('utf-8')
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC + LENGTH.pack(len(header)) + header)
+
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+        self.last_grid = None
+        self.last_fire = None
+        self._keyframe(step, grid, fire_intensity, age_grid)
+
+    def _keyframe(self, step, grid, fire_intensity, age_grid):
+        self.last_grid = grid.copy()
+        self.last_fire = fire_intensity.copy()
+        self.last_keyframe = step
+        # Kopie - last_grid/last_fire zmieniają się, zanim wątek zapisu je skompresuje
+        self.queue.put((KEYFRAME, step, [grid.copy(), fire_intensity.copy(), age_grid.astype(AGE_DTYPE)]))
+
+    def record(self, step, grid, fire_intensity, age_grid):
+        """Zapisuje stan po kroku - zmiany względem poprzedniego rekordu lub pełną klatkę"""
+        if step - self.last_keyframe >= self.keyframe_interval:
+            self._keyframe(step, grid, fire_intensity, age_grid)
+            return
+
+        # Różnica względem ostatniego rekordu - obejmuje też zmiany od narzędzi (podpalanie, sadzenie)
+        grid_idx = np.flatnonzero(grid != self.last_grid).astype(INDEX_DTYPE)
+        grid_val = grid.ravel()[grid_idx]
+        fire_idx = np.flatnonzero(fire_intensity != self.last_fire).astype(INDEX_DTYPE)
+        fire_val = fire_intensity.ravel()[fire_idx]
+        self.last_grid.ravel()[grid_idx] = grid_val
+        self.last_fire.ravel()[fire_idx] = fire_val
+
+        self.queue.put((DELTA, step, [COUNT.pack(grid_idx.size), grid_idx, grid_val,
+                                      COUNT.pack(fire_idx.size), fire_idx, fire_val]))
+
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            kind, step, parts = item
+            raw = b''.join(part if isinstance(part, bytes) else part.tobytes() for part in parts)
+            payload = zlib.compress(raw, COMPRESS_LEVEL)
+            self.file.write(RECORD_HEADER.pack(kind, step, len(payload)) + payload)
+            self.file.flush()  # Odtwarzacz może czytać plik w trakcie nagrywania
+        self.file.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+
+
+class ReplayPlayer:
+    """Odczyt powtórki i przewijanie do dowolnego kroku.
+
+    Przewinięcie kosztuje co najwyżej wczytanie jednej pełnej klatki i delt od niej
+    - albo tylko delt od bieżącego kroku przy przewijaniu do przodu.
+    age_grid pochodzi z ostatniej pełnej klatki (delty nie zawierają wieku).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} nie jest plikiem powtórki")
+        header_len, = LENGTH.unpack(self.file.read(LENGTH.size))
+        self.header = json.loads(self.file.read(header_len).decode('utf-8'))
+        self.width = self.header['width']
+        self.height = self.header['height']
+        self.variant = self.header['variant']
+
+        self.steps = []
+        self.kinds = []
+        self.offsets = []
+        self.keyframes = []  # Pozycje pełnych klatek na liście rekordów
+        self.end = self.file.tell()  # Koniec ostatniego kompletnego rekordu
+        self.scan()
+        if not self.steps:
+            raise ValueError(f"{path} nie zawiera jeszcze żadnego kroku")
+
+        self.grid = None
+        self.fire_intensity = None
+        self.age_grid = None
+        self.position = -1  # Indeks ostatnio zastosowanego rekordu
+
+    def scan(self):
+        """Indeksuje rekordy dopisane od ostatniego skanu (plik może wciąż rosnąć)"""
+        file_size = self.file.seek(0, 2)
+        offset = self.end
+        while offset + RECORD_HEADER.size <= file_size:
+            self.file.seek(offset)
+            kind, step, size = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+            end = offset + RECORD_HEADER.size + size
+            if end > file_size:
+                break  # Niedokończony rekord - nagrywanie wciąż trwa
+            if kind == KEYFRAME:
+                self.keyframes.append(len(self.steps))
+            self.steps.append(step)
+            self.kinds.append(kind)
+            self.offsets.append(offset)
+            offset = end
+        self.end = offset
+
+    @property
+    def first_step(self):
+        return self.steps[0]
+
+    @property
+    def last_step(self):
+        return self.steps[-1]
+
+    def _read(self, index):
+        self.file.seek(self.offsets[index])
+        _, _, size = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+        return zlib.decompress(self.file.read(size))
+
+    def _apply(self, index):
+        raw = self._read(index)
+        cells = self.width * self.height
+        if self.kinds[index] == KEYFRAME:
+            shape = (self.height, self.width)
+            grid_end = cells * np.dtype(GRID_DTYPE).itemsize
+            fire_end = grid_end + cells * np.dtype(FIRE_DTYPE).itemsize
+            self.grid = np.frombuffer(raw, GRID_DTYPE, cells, 0).reshape(shape).copy()
+            self.fire_intensity = np.frombuffer(raw, FIRE_DTYPE, cells, grid_end).reshape(shape).copy()
+            self.age_grid = np.frombuffer(raw, AGE_DTYPE, cells, fire_end).reshape(shape).copy()
+        else:
+            offset = 0
+            for target, value_dtype in ((self.grid, GRID_DTYPE), (self.fire_intensity, FIRE_DTYPE)):
+                count, = COUNT.unpack_from(raw, offset)
+                offset += COUNT.size
+                idx = np.frombuffer(raw, INDEX_DTYPE, count, offset)
+                offset += idx.nbytes
+                values = np.frombuffer(raw, value_dtype, count, offset)
+                offset += values.nbytes
+                target.ravel()[idx] = values
+        self.position = index
+
+    def seek(self, step):
+        """Stan (grid, fire_intensity, age_grid) po ostatnim rekordzie z krokiem <= step"""
+        index = max(0, bisect.bisect_right(self.steps, step) - 1)
+        keyframe = self.keyframes[bisect.bisect_right(self.keyframes, index) - 1]
+
+        if not (keyframe <= self.position <= index):
+            self._apply(keyframe)
+        for i in range(self.position + 1, index + 1):
+            self._apply(i)
+        return self.grid, self.fire_intensity, self.age_grid
+
+    @property
+    def step(self):
+        return self.steps[self.position]
+
+    def close(self):
+        self.file.close()
+
+
+def main(argv=None):
+    import argparse
+    import importlib
+
+    import pygame
+
+    parser = argparse.ArgumentParser(description="Odtwarzanie zapisanej powtórki")
+    parser.add_argument('path')
+    parser.add_argument('--fps', type=int, default=30, help="kroki na sekundę przy odtwarzaniu")
+    args = parser.parse_args(argv)
+
+    player = ReplayPlayer(args.path)
+    module = importlib.import_module(player.variant)
+    sim = module.ForestFireSimulation(player.width, player.height, module.START_CELL_SIZE)
+    pygame.display.set_caption(f"Powtórka - {args.path}")
+    font = pygame.font.Font(None, 22)
+    clock = pygame.time.Clock()
+    jump = player.header['keyframe_interval']
+
+    def show(step):
+        sim.grid, sim.fire_intensity, sim.age_grid = player.seek(step)
+        sim.step_count = player.step
+        sim.update_stats()
+
+    def step_at(mx):
+        fraction = min(1.0, max(0.0, (mx - bar.x) / bar.width))
+        return player.first_step + round(fraction * (player.last_step - player.first_step))
+
+    bar = pygame.Rect(10, sim.camera.view_height - 30, sim.camera.view_width - 20, 12)
+    step = player.first_step
+    show(step)
+    playing = False
+    scrubbing = False
+    panning = False
+    needs_redraw = True
+    running = True
+
+    while running:
+        if not (playing or scrubbing or panning or needs_redraw):
+            events = [pygame.event.wait()] + pygame.event.get()
+        else:
+            clock.tick(args.fps)
+            events = pygame.event.get()
+
+        target = step
+        for event in events:
+            if event.type != pygame.MOUSEMOTION or scrubbing or panning:
+                needs_redraw = True
+
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                elif event.key == pygame.K_RIGHT:
+                    target += 1
+                elif event.key == pygame.K_LEFT:
+                    target -= 1
+                elif event.key == pygame.K_UP:
+                    target += jump
+                elif event.key == pygame.K_DOWN:
+                    target -= jump
+                elif event.key == pygame.K_HOME:
+                    target = player.first_step
+                elif event.key == pygame.K_END:
+                    player.scan()
+                    target = player.last_step
+                elif event.key == pygame.K_PAGEUP:
+                    sim.change_cell_size(1)
+                elif event.key == pygame.K_PAGEDOWN:
+                    sim.change_cell_size(-1)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1 and bar.inflate(0, 16).collidepoint(event.pos):
+                    scrubbing = True
+                    target = step_at(event.pos[0])
+                elif event.button == 2:
+                    panning = True
+            elif event.type == pygame.MOUSEBUTTONUP:
+                if event.button == 1:
+                    scrubbing = False
+                elif event.button == 2:
+                    panning = False
+            elif event.type == pygame.MOUSEMOTION:
+                if scrubbing:
+                    target = step_at(event.pos[0])
+                elif panning:
+                    sim.camera.pan(*event.rel)
+
+        if playing:
+            target += 1
+            if target > player.last_step:
+                player.scan()  # Plik mógł urosnąć - nagrywanie wciąż trwa
+                if target > player.last_step:
+                    playing = False
+
+        target = max(player.first_step, min(player.last_step, target))
+        if target != step:
+            step = target
+            show(step)
+            needs_redraw = True
+
+        if needs_redraw:
+            sim.screen.fill(module.BACKGROUND_COLOR)
+            sim.draw(sim.screen)
+            sim.draw_ui(sim.screen)
+
+            # Oś czasu
+            span = max(1, player.last_step - player.first_step)
+            pygame.draw.rect(sim.screen, (0, 0, 0), bar.inflate(4, 4))
+            pygame.draw.rect(sim.screen, (80, 80, 80), bar)
+            done = bar.copy()
+            done.width = round(bar.width * (step - player.first_step) / span)
+            pygame.draw.rect(sim.screen, (255, 140, 0), done)
+            label = (f"Krok {step} / {player.last_step}   SPACJA - odtwarzaj, "
+                     f"strzalki - krok / {jump} krokow, HOME/END, LPM na osi - przewin")
+            text_surf = font.render(label, True, (255, 255, 255))
+            text_bg = text_surf.get_rect(bottomleft=(bar.x, bar.y - 4)).inflate(6, 2)
+            pygame.draw.rect(sim.screen, (0, 0, 0), text_bg)
+            sim.screen.blit(text_surf, (bar.x, bar.y - 4 - text_surf.get_height()))
+
+            pygame.display.flip()
+            needs_redraw = False
+
+    player.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,94 @@
+"""Mapa ryzyka - propagacja prawdopodobieństw stanów zamiast losowania (pole średnie).
+
+Dla każdej komórki z paliwem trzymana jest szansa, że jeszcze się nie zapaliła,
+i szansa, że płonie od a kroków (a < burn_steps). W kroku komórka nie zapala się
+od sąsiada z kierunku k z szansą 1 - p_k * S(sąsiad), gdzie p_k to to samo
+prawdopodobieństwo co w RuleKernel.step, a S - szansa, że sąsiad płonie. Sąsiedzi
+traktowani są jako niezależni, więc jeden krok to 8 przesunięć całej siatki.
+
+Niezależność zawyża ryzyko (ogień "wraca" do komórek, od których przyszedł),
+za to całą mapę liczy się w czasie rzędu jednego losowego przebiegu.
+Mapa ryzyka to szansa, że komórka zapali się w ciągu policzonych kroków.
+"""
+import numpy as np
+
+from arrival import burn_steps
+from rasters import gradient
+from rules import DIRECTIONS, param_value, shifted
+
+RISK_HORIZON = 300  # Najdalszy liczony krok
+RISK_STEPS_PER_FRAME = 10  # Kroki liczone w jednej klatce okna
+RISK_MIN = 0.02  # Komórki o mniejszym ryzyku nie są zaznaczane
+RISK_QUIET = 1e-4  # Gdy nic nie płonie z większą szansą, mapa już się nie zmieni
+# Ryzyko: od bladożółtego do ciemnej czerwieni
+RISK_LUT = gradient([(255, 250, 170), (255, 200, 60), (240, 110, 30), (200, 30, 30), (110, 0, 40)])
+
+
+class RiskPreview:
+    """Prawdopodobieństwa stanów liczone od migawki mapy, wiatru i pogody"""
+
+    def __init__(self, kernel, grid, fire_intensity, params):
+        spread = kernel.table['spread']
+        p_spread = param_value(params, spread['probability'])
+        wind = kernel.spread_wind(params)
+        if wind.ndim > 1:
+            wind = wind.reshape((len(DIRECTIONS),) + grid.shape)  # Pole wiatru
+        fuel = np.where(kernel.burnable_lut, kernel.fuel_lut, 0).astype(np.float32)[grid]
+        moisture = getattr(params, 'moisture', None)
+        if moisture is not None:
+            fuel = fuel * moisture.factor.reshape(grid.shape)  # Wilgotność - tylko szansa zapłonu
+        # chance[k] - szansa zapalenia komórki w kroku przez płonącego sąsiada z kierunku k
+        self.chance = np.stack([np.minimum(1.0, p_spread * fuel * wind[k]) for k in range(len(DIRECTIONS))])
+
+        self.has_fuel = fuel > 0
+        self.unburned = self.has_fuel.astype(np.float32)
+        steps = burn_steps(kernel, params)
+        # Bufor kołowy: burning[position] to najstarsza warstwa, za nią coraz młodsze
+        self.burning = np.zeros((steps,) + grid.shape, dtype=np.float32)
+        self.position = 0
+
+        # Płonące komórki wchodzą z tyloma krokami zapalania, ile zostało im z intensywności
+        decay = param_value(params, kernel.table['burnout']['decay'])
+        fire = grid == spread['source']
+        remaining = np.clip(np.ceil(fire_intensity[fire] / decay - 1e-6) - 1, 0, steps).astype(np.intp)
+        ys, xs = np.nonzero(fire)
+        alive = remaining > 0
+        self.burning[remaining[alive] - 1, ys[alive], xs[alive]] = 1.0
+        self.spreading = self.burning.sum(axis=0)
+        self.fire = fire
+        self.step = 0
+        self.horizon = RISK_HORIZON
+
+    @property
+    def done(self):
+        """Czy mapa już się nie zmieni - policzony horyzont albo nic już nie płonie"""
+        return self.step >= self.horizon or self.spreading.max() < RISK_QUIET
+
+    def advance(self, count=1, horizon=RISK_HORIZON):
+        """Liczy do count kolejnych kroków; zwraca False, gdy mapa już się nie zmienia"""
+        self.horizon = horizon
+        if self.done:
+            return False
+        for _ in range(min(count, self.horizon - self.step)):
+            survive = np.ones_like(self.unburned)
+            for k, (dx, dy) in enumerate(DIRECTIONS):
+                survive *= 1.0 - self.chance[k] * shifted(self.spreading, dx, dy)
+            new = self.unburned * (1.0 - survive)
+            self.unburned -= new
+            self.spreading += new - self.burning[self.position]
+            self.burning[self.position] = new
+            self.position = (self.position + 1) % len(self.burning)
+            self.step += 1
+        return True
+
+    def risk(self, rows=slice(None), cols=slice(None)):
+        """Szansa zapłonu komórek wycinka (płonące teraz = 1, bez paliwa = 0)"""
+        risk = np.where(self.has_fuel[rows, cols], 1.0 - self.unburned[rows, cols], 0.0)
+        risk[self.fire[rows, cols]] = 1.0
+        return risk
+
+    def colors(self, rows=slice(None), cols=slice(None)):
+        """(kolory, maska) do rasters.blend_layer - maska to ryzyko >= RISK_MIN"""
+        risk = self.risk(rows, cols)
+        levels = (risk * 255).astype(np.intp)
+        return RISK_LUT[levels], risk >= RISK_MIN
@@ -0,0 +1,317 @@
+import numpy as np
+
+# Stany komórek (wspólne dla wszystkich wersji symulacji)
+EMPTY = 0
+TREE_YOUNG = 1
+TREE_MATURE = 2
+TREE_OLD = 3
+FIRE = 4
+ASH = 6
+WATER = 7
+ROCK = 8
+FIREBREAK = 9
+DESERT = 10
+
+TREES = [TREE_YOUNG, TREE_MATURE, TREE_OLD]
+
+P_DESERT_SPREAD = 0.03  # Bardzo wolne rozprzestrzenianie pustyni
+
+# Kierunki sąsiedztwa (dx, dy) - ta sama kolejność co w dawnym get_neighbors
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+DIRECTIONS_4 = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# TABELE REGUŁ
+# Prawdopodobieństwa podane jako napis to nazwy atrybutów symulacji
+# (np. 'p_grow' zmienia się z pogodą), liczby są stałe.
+#
+#   spread  - zapalanie sąsiadów: mnożniki paliwa, blokery, wpływ wiatru
+#   burnout - wypalanie: intensywność maleje o 'decay', przy 0 komórka zmienia stan
+#   random  - samoistne przejścia z prawdopodobieństwem na krok
+#   aging   - przejścia po przekroczeniu wieku (age_grid)
+#   creep   - stan przechodzący na losowego sąsiada (pustynia)
+RULE_PRESETS = {
+    # koncowy.py - góry i rzeki
+    'koncowy': {
+        'spread': {
+            'source': FIRE,
+            'probability': 'p_spread',
+            'fuel': {TREE_YOUNG: 0.5, TREE_MATURE: 1.0, TREE_OLD: 1.8},
+            'blockers': [WATER, ROCK],
+            'wind_coefficient': 2.5,
+            'leeward_factor': 0.2,
+        },
+        'burnout': {'state': FIRE, 'into': ASH, 'decay': 'fire_decay'},
+        'random': [
+            {'from': ASH, 'into': EMPTY, 'probability': 'p_ash_decay'},
+            {'from': EMPTY, 'into': TREE_YOUNG, 'probability': 'p_grow', 'set_age': 0},
+        ],
+        'aging': [
+            {'from': TREE_YOUNG, 'into': TREE_MATURE, 'after': 80},
+            {'from': TREE_MATURE, 'into': TREE_OLD, 'after': 250},
+        ],
+        'creep': [],
+    },
+    # koncowy1.py - pasy przeciwpożarowe i pogoda
+    'koncowy1': {
+        'spread': {
+            'source': FIRE,
+            'probability': 'p_spread',
+            'fuel': {TREE_YOUNG: 0.5, TREE_MATURE: 1.0, TREE_OLD: 1.8},
+            'blockers': [WATER, ROCK, FIREBREAK],
+            'wind_coefficient': 2.5,
+            'leeward_factor': 0.2,
+        },
+        'burnout': {'state': FIRE, 'into': ASH, 'decay': 'fire_decay'},
+        'random': [
+            {'from': ASH, 'into': EMPTY, 'probability': 'p_ash_decay'},
+            {'from': EMPTY, 'into': TREE_YOUNG, 'probability': 'p_grow', 'set_age': 0},
+        ],
+        'aging': [
+            {'from': TREE_YOUNG, 'into': TREE_MATURE, 'after': 80},
+            {'from': TREE_MATURE, 'into': TREE_OLD, 'after': 250},
+        ],
+        'creep': [],
+    },
+    # koncowy2.py - pustynia i silniejszy wiatr. Dawny przeskok ognia przez wąską
+    # wodę nigdy nie zapalał komórki (sąsiad był wodą, nie drzewem), więc go nie ma.
+    'koncowy2': {
+        'spread': {
+            'source': FIRE,
+            'probability': 'p_spread',
+            'fuel': {TREE_YOUNG: 0.5, TREE_MATURE: 1.0, TREE_OLD: 1.8},
+            'blockers': [WATER, ROCK, FIREBREAK, DESERT],
+            'wind_coefficient': 3.0,
+            'leeward_factor': 0.2,
+        },
+        'burnout': {'state': FIRE, 'into': ASH, 'decay': 'fire_decay'},
+        'random': [
+            {'from': ASH, 'into': EMPTY, 'probability': 'p_ash_decay'},
+            {'from': EMPTY, 'into': TREE_YOUNG, 'probability': 'p_grow', 'set_age': 0,
+             'blocked_by_neighbor': [DESERT]},
+        ],
+        'aging': [
+            {'from': TREE_YOUNG, 'into': TREE_MATURE, 'after': 80},
+            {'from': TREE_MATURE, 'into': TREE_OLD, 'after': 250},
+        ],
+        'creep': [
+            {'from': DESERT, 'probability': P_DESERT_SPREAD,
+             'onto': TREES + [EMPTY, ASH],
+             'not_near': WATER, 'distance': 8},
+        ],
+    },
+}
+
+
+def state_lut(values, dtype=bool, default=0):
+    """Tablica 256 elementów indeksowana stanem komórki"""
+    lut = np.full(256, default, dtype=dtype)
+    for state, value in values.items():
+        lut[state] = value
+    return lut
+
+
+def shifted(array, dx, dy):
+    """Wartość w komórce (x, y) to array[y - dy, x - dx]; poza mapą zero"""
+    height, width = array.shape
+    result = np.zeros_like(array)
+    result[max(0, dy):height + min(0, dy), max(0, dx):width + min(0, dx)] = \
+        array[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+    return result
+
+
+def dilate(mask, radius):
+    """Komórki w odległości (euklidesowej) <= radius od dowolnej komórki maski"""
+    height, width = mask.shape
+    result = mask.copy()
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            if (dx == 0 and dy == 0) or dx * dx + dy * dy > radius * radius:
+                continue
+            src = mask[max(0, -dy):height - max(0, dy), max(0, -dx):width - max(0, dx)]
+            result[max(0, dy):height - max(0, -dy), max(0, dx):width - max(0, -dx)] |= src
+    return result
+
+
+def compile_rules(table):
+    """Zamienia tabelę reguł w wektorowy krok symulacji"""
+    return RuleKernel(table)
+
+
+class RuleKernel:
+    """Krok symulacji skompilowany z tabeli reguł - operacje NumPy zamiast pętli po komórkach"""
+
+    def __init__(self, table):
+        self.table = table
+
+        spread = table['spread']
+        self.fuel_lut = state_lut(spread['fuel'], dtype=np.float32)
+        burnable = {state: True for state in spread['fuel']}
+        for state in spread['blockers']:
+            burnable[state] = False
+        self.burnable_lut = state_lut(burnable)
+
+        self.near_masks = {}
+
+        # Zmiany z ostatniego kroku (płaskie indeksy) - do metryk i warstw analitycznych
+        self.ignited = np.zeros(0, dtype=np.intp)
+        self.burned_out = np.zeros(0, dtype=np.intp)
+        self.burning = np.zeros(0, dtype=np.intp)
+
+    def tile_activity(self):
+        """Parametry indeksu kafelków wynikające z reguł.
+        Stany z reguł 'random' nie trzymają kafelka aktywnym - ich przejścia są planowane"""
+        active = [self.table['burnout']['state']]
+        active += [rule['from'] for rule in self.table['creep']]
+        spreading = [self.table['spread']['source']] + [rule['from'] for rule in self.table['creep']]
+        return {
+            'active_states': active,
+            'age_thresholds': {rule['from']: rule['after'] for rule in self.table['aging']},
+            'spreading_states': spreading,
+            'random_rules': self.table['random'],
+        }
+
+    def prepare_map(self, grid):
+        """Maski zależne tylko od niezmiennego terenu - liczone raz na mapę"""
+        self.near_masks = {}
+        for rule in self.table['creep']:
+            if 'not_near' in rule:
+                key = (rule['not_near'], rule['distance'])
+                if key not in self.near_masks:
+                    self.near_masks[key] = dilate(grid == rule['not_near'], rule['distance'])
+
+    def wind_modifiers(self, wind_direction, wind_strength):
+        """Mnożnik prawdopodobieństwa dla każdego z 8 kierunków"""
+        spread = self.table['spread']
+        modifiers = np.ones(len(DIRECTIONS), dtype=np.float32)
+        if wind_strength > 0:
+            for k, (dx, dy) in enumerate(DIRECTIONS):
+                dot = dx * wind_direction[0] + dy * wind_direction[1]
+                if dot > 0:
+                    modifiers[k] += wind_strength * spread['wind_coefficient'] * dot
+                else:
+                    modifiers[k] *= spread['leeward_factor']
+        return modifiers
+
+    def spread_wind(self, params):
+        """Mnożniki wiatru: (8,) dla wiatru jednolitego albo (8, wysokość * szerokość) z pola params.wind_field"""
+        field = getattr(params, 'wind_field', None)
+        if field is None:
+            return self.wind_modifiers(params.wind_direction, params.wind_strength)
+        return field.modifiers(self, params.wind_direction, params.wind_strength)
+
+    def step(self, grid, age_grid, fire_intensity, params, cells=None):
+        """Jeden krok dla komórek o płaskich indeksach cells (None = cała siatka).
+
+        Parametry (p_spread, p_grow, wiatr...) czytane są z atrybutów params.
+        params.moisture (moisture.FuelMoisture) mnoży p_spread i decay w komórkach.
+        Zwraca (new_grid, new_fire); age_grid jest aktualizowany w miejscu.
+        """
+        height, width = grid.shape
+        if cells is None:
+            cells = np.arange(grid.size)
+
+        flat = grid.ravel()
+        states = flat[cells]
+        new_grid = grid.copy()
+        new_flat = new_grid.ravel()
+        new_fire = fire_intensity.copy()
+        fire_flat = new_fire.ravel()
+        age_flat = age_grid.ravel()
+        moisture = getattr(params, 'moisture', None)
+
+        # Wypalanie
+        burnout = self.table['burnout']
+        burning = cells[states == burnout['state']]
+        decay = param_value(params, burnout['decay'])
+        if moisture is not None:
+            decay = decay * moisture.factor[burning]
+        intensity = fire_flat[burning] - decay
+        burned_out = intensity <= 0
+        fire_flat[burning] = np.where(burned_out, 0, intensity)
+        new_flat[burning[burned_out]] = burnout['into']
+        sources = burning[~burned_out]
+
+        # Przejścia losowe
+        for rule in self.table['random']:
+            candidates = cells[states == rule['from']]
+            hits = candidates[np.random.random(candidates.size) < param_value(params, rule['probability'])]
+            if 'blocked_by_neighbor' in rule:
+                hits = hits[~has_neighbor(flat, hits, rule['blocked_by_neighbor'], width, height)]
+            new_flat[hits] = rule['into']
+            if 'set_age' in rule:
+                age_flat[hits] = rule['set_age']
+
+        # Starzenie
+        for rule in self.table['aging']:
+            aging = cells[states == rule['from']]
+            age_flat[aging] += 1
+            new_flat[aging[age_flat[aging] > rule['after']]] = rule['into']
+
+        # Pełzanie (pustynia zajmuje losowego sąsiada)
+        for rule in self.table['creep']:
+            creeping = cells[states == rule['from']]
+            creeping = creeping[np.random.random(creeping.size) < param_value(params, rule['probability'])]
+            offsets = np.array(DIRECTIONS_4)[np.random.randint(0, len(DIRECTIONS_4), creeping.size)]
+            targets = neighbor_indices(creeping, offsets[:, 0], offsets[:, 1], width, height)
+            targets = targets[np.isin(flat[targets], rule['onto'])]
+            if 'not_near' in rule:
+                near = self.near_masks.get((rule['not_near'], rule['distance']))
+                if near is None or near.shape != grid.shape:
+                    near = dilate(grid == rule['not_near'], rule['distance'])
+                targets = targets[~near.ravel()[targets]]
+            new_flat[targets] = rule['from']
+
+        # Rozprzestrzenianie ognia (na końcu - zapalenie wygrywa z innymi przejściami)
+        spread = self.table['spread']
+        p_spread = param_value(params, spread['probability'])
+        wind_mods = self.spread_wind(params)
+        ignited = []
+        for k, (dx, dy) in enumerate(DIRECTIONS):
+            targets = neighbor_indices(sources, dx, dy, width, height)
+            targets = targets[self.burnable_lut[flat[targets]]]
+            # Pole wiatru (wind.WindField) - mnożnik z komórki celu
+            wind = wind_mods[k] if wind_mods.ndim == 1 else wind_mods[k, targets]
+            fuel = self.fuel_lut[flat[targets]]
+            if moisture is not None:
+                fuel = fuel * moisture.factor[targets]
+            prob = np.minimum(1.0, p_spread * fuel * wind)
+            ignited.append(targets[np.random.random(targets.size) < prob])
+        # Komórka może zapalić się od kilku sąsiadów naraz
+        ignited = np.unique(np.concatenate(ignited))
+        new_flat[ignited] = spread['source']
+        fire_flat[ignited] = 1.0
+
+        self.ignited = ignited
+        self.burned_out = burning[burned_out]
+        self.burning = np.concatenate([sources, ignited])
+
+        return new_grid, new_fire
+
+
+def param_value(params, value):
+    """Liczba z tabeli albo atrybut symulacji o podanej nazwie"""
+    if isinstance(value, str):
+        return getattr(params, value)
+    return value
+
+
+def neighbor_indices(cells, dx, dy, width, height):
+    """Płaskie indeksy sąsiadów (cells przesunięte o dx, dy) - tylko te wewnątrz mapy"""
+    ys, xs = np.divmod(cells, width)
+    nx = xs + dx
+    ny = ys + dy
+    inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+    return (ny * width + nx)[inside]
+
+
+def has_neighbor(flat, cells, neighbor_states, width, height):
+    """Czy komórka ma w sąsiedztwie (4 kierunki) któryś ze stanów neighbor_states"""
+    ys, xs = np.divmod(cells, width)
+    found = np.zeros(cells.size, dtype=bool)
+    for dx, dy in DIRECTIONS_4:
+        nx = xs + dx
+        ny = ys + dy
+        inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        idx = np.where(inside, ny * width + nx, 0)
+        found |= inside & np.isin(flat[idx], neighbor_states)
+    return found
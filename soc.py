@@ -0,0 +1,205 @@
+"""Długie przebiegi w stylu Drossela-Schwabla - pioruny i spalanie całego fragmentu lasu naraz.
+
+Ogień rozchodzi się tu natychmiast w porównaniu ze wzrostem lasu: piorun trafia
+drzewo z prawdopodobieństwem p_lightning na krok, a cały jego fragment
+(clusters.ClusterIndex) od razu zmienia się w popiół. Odrost idzie według reguł
+losowych wariantu (popiół -> pusta ziemia z p_ash_decay, pusta -> drzewo z p_grow).
+
+Między piorunami komórki zmieniają się niezależnie, więc zamiast kroków losowane
+są od razu chwile przejść (rozkład geometryczny): kiedy zniknie popiół, kiedy
+wyrośnie drzewo i kiedy trafi w nie piorun. Koszt zależy od liczby pożarów,
+a nie kroków. Teren (woda, skały, pustynia) stoi w miejscu - pustynia nie pełza.
+"""
+import numpy as np
+
+from clusters import ClusterIndex, flammable_lut
+from rules import DIRECTIONS_4, param_value, shifted, state_lut
+
+P_LIGHTNING = 5e-7  # Szansa trafienia drzewa przez piorun w kroku (p_grow / p_lightning ~ 1000)
+SOC_FAST_FORWARD = 100000  # Kroki przewijane klawiszem L
+NEVER = np.inf
+
+
+class LightningRun:
+    """Przebieg od bieżącego stanu symulacji; fire_sizes - rozmiary kolejnych pożarów"""
+
+    def __init__(self, sim, seed=None):
+        table = sim.rules.table
+        flammable = flammable_lut(sim.rules)
+        grow = [rule for rule in table['random'] if flammable[rule['into']]]
+        if len(grow) != 1:
+            raise ValueError("Tryb SOC wymaga dokładnie jednej reguły wzrostu drzew")
+        self.grow = grow[0]
+        decay = [rule for rule in table['random'] if rule['into'] == self.grow['from']]
+        self.decay = decay[0] if decay else None
+        self.burned_state = table['burnout']['into']
+        self.aging = table['aging']
+        self.p_lightning = sim.p_lightning
+        self.p_grow = param_value(sim, self.grow['probability'])
+        self.p_decay = param_value(sim, self.decay['probability']) if self.decay else 0.0
+        self.rng = np.random.default_rng(seed)
+
+        grid = sim.grid.ravel()
+        self.width, self.height = sim.grid_width, sim.grid_height
+        self.step = float(sim.step_count)
+        self.fire_sizes = []
+
+        # Komórki, które nigdy nie biorą udziału (teren) - zostają w swoim stanie
+        moving = state_lut({state: True for state in (self.grow['from'], self.burned_state, table['spread']['source'])})
+        moving |= flammable
+        self.terrain = ~moving[grid]
+        self.blocked = self.terrain.copy()
+        if 'blocked_by_neighbor' in self.grow:
+            near = state_lut({state: True for state in self.grow['blocked_by_neighbor']})[sim.grid]
+            for dx, dy in DIRECTIONS_4:
+                self.blocked |= shifted(near, dx, dy).ravel()
+
+        # Chwile przejść: empty_at - komórka staje się pusta, ready - wyrasta drzewo, strike - piorun
+        self.empty_at = np.full(grid.size, NEVER)
+        self.ready = np.full(grid.size, NEVER)
+        self.strike = np.full(grid.size, NEVER)
+        trees = flammable[grid]
+        sim.tiles.sync_ages(sim.grid, sim.age_grid, sim.step_count)
+        self.ready[trees] = self.step - sim.age_grid.ravel()[trees]
+        self.empty_at[trees] = self.ready[trees]
+        empty = grid == self.grow['from']
+        self.empty_at[empty] = self.step
+        self._schedule_growth(np.flatnonzero(empty))
+        self._schedule_growth(np.flatnonzero(trees))
+        # Płonące i wypalone komórki - jak świeżo spalone
+        burned = np.flatnonzero((grid == self.burned_state) | (grid == table['spread']['source']))
+        self._burn(burned)
+        self.index = ClusterIndex(flammable, sim.grid)
+
+    def _geometric(self, p, size):
+        if p <= 0:
+            return np.full(size, NEVER)
+        return self.rng.geometric(min(p, 1.0), size).astype(np.float64)
+
+    def _schedule_growth(self, cells):
+        """Drzewo wyrasta po empty_at (o ile nie jest już drzewem), piorun po wyrośnięciu"""
+        waiting = cells[self.ready[cells] > self.step]
+        self.ready[waiting] = self.empty_at[waiting] + self._geometric(self.p_grow, waiting.size)
+        self.ready[waiting[self.blocked[waiting]]] = NEVER
+        # Brak pamięci - dla stojących już drzew piorun liczony od teraz
+        since = np.maximum(self.ready[cells], self.step)
+        self.strike[cells] = since + self._geometric(self.p_lightning, cells.size)
+
+    def _burn(self, cells):
+        """Komórki spalone w chwili self.step - popiół, potem pusta ziemia i nowe drzewo"""
+        if self.decay is None:
+            self.empty_at[cells] = NEVER
+        else:
+            self.empty_at[cells] = self.step + self._geometric(self.p_decay, cells.size)
+        self.ready[cells] = NEVER
+        self._schedule_growth(cells)
+
+    def advance(self, steps):
+        """Przewija steps kroków; zwraca rozmiary pożarów z tego odcinka"""
+        end = self.step + steps
+        first = len(self.fire_sizes)
+        while True:
+            cell = int(np.argmin(self.strike))
+            when = self.strike[cell]
+            if when > end:
+                break
+            # Drzewa wyrosłe od poprzedniego pioruna dołączają do fragmentów
+            self.index.add(np.flatnonzero((self.ready > self.step) & (self.ready <= when)))
+            self.step = when
+            burned = self.index.take_cluster(cell)
+            self.fire_sizes.append(burned.size)
+            self._burn(burned)
+        self.index.add(np.flatnonzero((self.ready > self.step) & (self.ready <= end)))
+        self.step = end
+        return self.fire_sizes[first:]
+
+    def histogram(self):
+        """Liczba pożarów o każdym rozmiarze (indeks = rozmiar w komórkach)"""
+        return np.bincount(np.asarray(self.fire_sizes, dtype=np.int64), minlength=1)
+
+    def apply(self, sim):
+        """Zapisuje stan z chwili self.step do symulacji (siatka, wiek drzew) - resztę odtwarza sim.rebuild_map"""
+        grid = sim.grid.ravel()
+        age = sim.age_grid.ravel()
+        moving = ~self.terrain
+        trees = moving & (self.ready <= self.step)
+        # Wiek rośnie tylko do ostatniego progu starzenia - jak w RuleKernel.step
+        ages = np.minimum(self.step - self.ready[trees], max(rule['after'] for rule in self.aging) + 1)
+        states = np.full(ages.size, self.grow['into'], dtype=grid.dtype)
+        for rule in self.aging:
+            states[(states == rule['from']) & (ages > rule['after'])] = rule['into']
+        grid[trees] = states
+        age[moving] = 0
+        age[trees] = ages
+        grid[moving & ~trees & (self.empty_at > self.step)] = self.burned_state
+        grid[moving & ~trees & (self.empty_at <= self.step)] = self.grow['from']
+        sim.fire_intensity.ravel()[moving] = 0
+        sim.step_count = int(self.step)
+
+
+def log_binned(histogram):
+    """Koszyki [1, 2), [2, 4), ...: (dolne granice, liczba pożarów, gęstość na rozmiar) - do wykresu log-log"""
+    edges = 2 ** np.arange(int(np.log2(max(histogram.size - 1, 1))) + 2)
+    counts = np.array([histogram[low:high].sum() for low, high in zip(edges[:-1], edges[1:])])
+    return edges[:-1], counts, counts / np.diff(edges)
+
+
+def main(argv=None):
+    import argparse
+    import csv
+    import importlib
+    import os
+    import random
+    import time
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from benchmark import VARIANTS, parse_size
+
+    parser = argparse.ArgumentParser(description="Długi przebieg SOC: pioruny i histogram rozmiarów pożarów")
+    parser.add_argument('--variant', default='koncowy', choices=VARIANTS)
+    parser.add_argument('--size', default='300x200')
+    parser.add_argument('--steps', type=float, default=1e7)
+    parser.add_argument('--warmup', type=float, default=1e6, help="kroki przed zbieraniem statystyk")
+    parser.add_argument('--lightning', type=float, default=P_LIGHTNING, help="szansa pioruna na drzewo i krok")
+    parser.add_argument('--output', help="plik CSV z histogramem (rozmiar, liczba pożarów)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    module = importlib.import_module(args.variant)
+    width, height = parse_size(args.size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    sim.p_lightning = args.lightning
+
+    run = LightningRun(sim, args.seed)
+    start = time.perf_counter()
+    run.advance(int(args.warmup))
+    run.fire_sizes = []
+    run.advance(int(args.steps))
+    elapsed = time.perf_counter() - start
+    histogram = run.histogram()
+    print(f"{int(args.warmup + args.steps)} kroków w {elapsed:.1f} s, {len(run.fire_sizes)} pożarów, "
+          f"największy {histogram.size - 1} komórek")
+
+    sizes, counts, density = log_binned(histogram)
+    used = counts > 0
+    print(f"{'rozmiar':>8} {'pozary':>8} {'gestosc':>12}")
+    for size, count, value in zip(sizes[used], counts[used], density[used]):
+        print(f"{size:8d} {count:8d} {value:12.4g}")
+    # Nachylenie n(s) ~ s^-tau na koszykach z co najmniej 10 pożarami, bez pojedynczych drzew
+    fit = (sizes >= 2) & (counts >= 10)
+    if fit.sum() >= 3:
+        slope = np.polyfit(np.log(sizes[fit]), np.log(density[fit]), 1)[0]
+        print(f"tau ~ {-slope:.2f}")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['size', 'fires'])
+            for size in np.flatnonzero(histogram):
+                writer.writerow([size, histogram[size]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Wykresy historii (sparkline) liczby komórek w każdym stanie - w legendzie panelu.
+
+Historia to bufor kołowy (metrics.RingBuffer) o długości równej szerokości
+wykresu. Każdy wykres ma własną powierzchnię: po nowych krokach jest ona
+przesuwana w lewo (Surface.scroll) i dorysowywane są tylko najnowsze kolumny.
+Całość rysowana jest od nowa tylko przy zmianie skali - gdy wartość wyjdzie poza
+zakres albo raz na pełną szerokość wykresu, żeby skala nadążała za danymi.
+"""
+import numpy as np
+import pygame
+
+from metrics import RingBuffer
+
+CHART_WIDTH = 100
+CHART_BACKGROUND = (20, 20, 20)
+
+
+class Sparkline:
+    """Jeden wykres - linia wartości w skali [low, high] dopasowanej do historii"""
+
+    def __init__(self, width, height, color):
+        self.surface = pygame.Surface((width, height))
+        self.color = color
+        self.clear()
+
+    def clear(self):
+        self.surface.fill(CHART_BACKGROUND)
+        self.low = 0
+        self.high = 0  # high <= low - skala jeszcze nieustalona
+        self.last_y = None
+
+    def _to_y(self, values):
+        height = self.surface.get_height()
+        span = max(self.high - self.low, 1)
+        return (height - 1) - (values - self.low) * (height - 1) // span
+
+    def _draw(self, values, x):
+        # Pionowy odcinek od poprzedniej wartości - linia bez przerw przy skokach
+        for y in self._to_y(values).tolist():
+            top = y if self.last_y is None else min(y, self.last_y)
+            bottom = y if self.last_y is None else max(y, self.last_y)
+            pygame.draw.line(self.surface, self.color, (x, top), (x, bottom))
+            self.last_y = y
+            x += 1
+
+    def fit(self, history):
+        """Nowa skala z zakresu historii (z małym zapasem) i pełne przerysowanie"""
+        low, high = int(history.min()), int(history.max())
+        margin = max((high - low) // 8, 1)
+        self.low = max(low - margin, 0)
+        self.high = high + margin
+        self.surface.fill(CHART_BACKGROUND)
+        self.last_y = None
+        self._draw(history, self.surface.get_width() - len(history))
+
+    def push(self, values, history):
+        """Przesuwa wykres o len(values) kolumn i rysuje tylko je"""
+        if self.high <= self.low or values.min() < self.low or values.max() > self.high:
+            self.fit(history)
+            return
+        width, height = self.surface.get_size()
+        new = len(values)
+        self.surface.scroll(-new, 0)
+        self.surface.fill(CHART_BACKGROUND, (width - new, 0, new, height))
+        self._draw(values, width - new)
+
+
+class HistoryCharts:
+    """Historia liczby komórek w stanach states i wykres dla każdego z nich"""
+
+    def __init__(self, states, colors, height, width=CHART_WIDTH):
+        self.states = np.array(sorted(states))
+        self.history = RingBuffer(width, self.states.size)
+        self.charts = {state: Sparkline(width, height, colors[state]) for state in self.states.tolist()}
+        self.drawn = 0  # history.total przy ostatnim rysowaniu
+
+    def record(self, count_bins):
+        """Wywoływane po update_stats w każdym kroku - tylko zapis wiersza do bufora"""
+        self.history.append(count_bins[self.states])
+
+    def clear(self):
+        self.history.clear()
+        self.drawn = self.history.total
+        for chart in self.charts.values():
+            chart.clear()
+
+    def update(self):
+        """Dorysowuje kroki od poprzedniej klatki; zwraca słownik stan -> Sparkline"""
+        new = self.history.total - self.drawn
+        if new == 0:
+            return self.charts
+        rows = self.history.ordered()
+        new = min(new, len(rows))
+        capacity = self.history.capacity
+        # Raz na pełną szerokość wykresu skala dopasowuje się od nowa - stare szczyty już zniknęły
+        refit = new == len(rows) or self.history.total // capacity != self.drawn // capacity
+        for column, state in enumerate(self.states.tolist()):
+            chart = self.charts[state]
+            if refit:
+                chart.fit(rows[:, column])
+            else:
+                chart.push(rows[-new:, column], rows[:, column])
+        self.drawn = self.history.total
+        return self.charts
@@ -0,0 +1,285 @@
+"""Przeglądy parametrów - udział spalonego lasu od gęstości, rozprzestrzeniania, wiatru i pogody.
+
+Każdy punkt siatki parametrów to kilka powtórek (seed, seed + 1, ...) liczonych
+równolegle w osobnych procesach. Wynik powtórki trafia do pamięci podręcznej
+na dysku pod kluczem (parametry, seed, wersja kodu) - przerwany albo
+rozszerzony przegląd liczy tylko brakujące punkty. Wersja kodu to skrót
+źródeł modułów repozytorium załadowanych przez wariant, więc zmiana reguł
+unieważnia stare wyniki.
+
+Próg krytyczny (--critical) szukany jest bisekcją: w połowie przedziału liczona
+jest miara (--measure) i przedział zawęża się do strony, po której mija --target.
+Domyślnie to średnia część spalonych drzew - na mapach wariantów rzeki często
+przecinają mapę, więc szansa przejścia ognia od krawędzi do krawędzi
+(--measure spanning) może nigdy nie dojść do 0.5.
+
+Przykłady:
+    python sweep.py --variant koncowy1 --grid density=0.4:0.8:0.05 weather=normal,dry --replicas 8
+    python sweep.py --grid p_spread=0.1,0.25,0.5 wind=0,1,3 --output przeglad.csv
+    python sweep.py --critical density=0.3:0.9 --replicas 16 --tolerance 0.01
+"""
+import argparse
+import csv
+import hashlib
+import importlib
+import inspect
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Symulacje działają bez okna - sterownik musi być ustawiony przed importem pygame
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from benchmark import VARIANTS, parse_size, ignite_center, ignite_front
+from rasters import FireRasters, NOT_IGNITED
+from rules import FIRE, TREES
+
+PARAMETERS = ['density', 'p_spread', 'wind', 'weather']
+IGNITIONS = {'front': ignite_front, 'single': ignite_center}
+CACHE_DIR = 'sweep_cache'
+MAX_STEPS = 5000  # Limit kroków jednej powtórki - ogień zwykle gaśnie dużo wcześniej
+
+
+def default_parameters(module):
+    """Wartości parametrów, których przegląd nie zmienia - jak w oknie wariantu"""
+    p_spread = getattr(module, 'P_SPREAD_BASE', None) or module.P_SPREAD
+    return {'density': 0.75, 'p_spread': p_spread, 'wind': 1.0, 'weather': 'normal'}
+
+
+def code_version():
+    """Skrót źródeł modułów repozytorium załadowanych w tym procesie"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for name in sorted(sys.modules):
+        path = getattr(sys.modules[name], '__file__', None)
+        if path and os.path.dirname(os.path.abspath(path)) == root and path.endswith('.py'):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def run_replica(variant, size, ignition, max_steps, params, seed):
+    """Jedna powtórka: świeża mapa, podpalenie i kroki do wygaśnięcia ognia.
+
+    burned - część drzew z chwili podpalenia, które spłonęły; spans - spalone
+    komórki sięgają lewej i prawej krawędzi mapy.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    module = importlib.import_module(variant)
+    width, height = parse_size(size)
+    sim = module.ForestFireSimulation(width, height, module.START_CELL_SIZE, headless=True)
+    if 'desert' in inspect.signature(sim.initialize_forest).parameters:
+        sim.initialize_forest(params['density'], desert=False)
+    else:
+        sim.initialize_forest(params['density'])
+
+    multiplier = 1.0
+    if hasattr(sim, 'set_weather_preset'):
+        sim.set_weather_preset(params['weather'])
+        multiplier = sim.burn_rate_multiplier
+    sim.p_spread = params['p_spread'] * multiplier
+    sim.wind_strength = params['wind']
+    sim.rasters = FireRasters(height, width)
+
+    trees = int(np.count_nonzero(np.isin(sim.grid, TREES)))
+    IGNITIONS[ignition](sim)
+    burned = sim.grid == FIRE
+    steps = 0
+    while steps < max_steps and np.any(sim.grid == FIRE):
+        sim._do_simulation_step()
+        steps += 1
+    burned |= sim.rasters.ignition_step != NOT_IGNITED
+    return {
+        'burned': float(np.count_nonzero(burned) / max(trees, 1)),
+        'spans': bool(burned[:, 0].any() and burned[:, -1].any()),
+        'steps': steps,
+    }
+
+
+class ResultCache:
+    """Wyniki powtórek w plikach JSON - jeden plik na (przypadek, parametry, seed, wersja kodu)"""
+
+    def __init__(self, directory, version):
+        self.directory = directory
+        self.version = version
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, task):
+        key = json.dumps(dict(task, version=self.version), sort_keys=True)
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def get(self, task):
+        try:
+            with open(self._path(task), encoding='utf-8') as f:
+                return json.load(f)['result']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, task, result):
+        """Zapis przez plik tymczasowy - przerwanie nie zostawia połówkowych plików"""
+        path = self._path(task)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'task': task, 'version': self.version, 'result': result}, f)
+        os.replace(path + '.tmp', path)
+
+
+class SweepRunner:
+    """Liczy powtórki punktów parametrów - z pamięci podręcznej albo w puli procesów"""
+
+    def __init__(self, variant, size, ignition, max_steps, replicas, seed, cache, jobs):
+        self.case = {'variant': variant, 'size': size, 'ignition': ignition, 'max_steps': max_steps}
+        self.replicas = replicas
+        self.seed = seed
+        self.cache = cache
+        self.jobs = jobs
+        self.computed = 0
+        self.reused = 0
+
+    def run(self, points):
+        """Lista wyników dla każdego punktu (słownika parametrów) - po jednym na powtórkę"""
+        tasks = [dict(self.case, params=params, seed=self.seed + r)
+                 for params in points for r in range(self.replicas)]
+        results = [self.cache.get(task) for task in tasks]
+        missing = [i for i, result in enumerate(results) if result is None]
+        self.reused += len(tasks) - len(missing)
+        self.computed += len(missing)
+
+        def arguments(task):
+            return (task['variant'], task['size'], task['ignition'], task['max_steps'], task['params'], task['seed'])
+
+        if self.jobs <= 1:
+            for i in missing:
+                results[i] = run_replica(*arguments(tasks[i]))
+                self.cache.put(tasks[i], results[i])
+        elif missing:
+            with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+                futures = {pool.submit(run_replica, *arguments(tasks[i])): i for i in missing}
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    self.cache.put(tasks[i], results[i])  # Od razu - przerwanie nie traci gotowych
+        return [results[i:i + self.replicas] for i in range(0, len(results), self.replicas)]
+
+
+def summarize(results):
+    burned = np.array([r['burned'] for r in results])
+    return {
+        'burned_mean': float(burned.mean()),
+        'burned_std': float(burned.std()),
+        'spanning': float(np.mean([r['spans'] for r in results])),
+        'steps_mean': float(np.mean([r['steps'] for r in results])),
+    }
+
+
+def parse_values(name, text):
+    """'0.4:0.8:0.05' - zakres z końcem włącznie, '0,1,3' - lista; pogoda jako nazwy"""
+    if name == 'weather':
+        return text.split(',')
+    if ':' in text:
+        low, high, step = (float(v) for v in text.split(':'))
+        return [round(float(v), 10) for v in np.arange(low, high + step / 2, step)]
+    return [float(v) for v in text.split(',')]
+
+
+def parse_assignment(text):
+    name, _, values = text.partition('=')
+    if name not in PARAMETERS or not values:
+        raise argparse.ArgumentTypeError(f"oczekiwano nazwa=wartosci, nazwa z {PARAMETERS}: {text}")
+    return name, values
+
+
+def bisect(runner, base, name, low, high, tolerance, measure, target):
+    """Wartość parametru name, przy której miara measure (pole summarize) mija target.
+
+    Miara rośnie z parametrem; przedział [low, high] musi obejmować przejście.
+    Zwraca (oszacowanie, lista (wartość, miara)) albo (None, ...) bez przejścia w przedziale.
+    """
+    def probe(value):
+        result = summarize(runner.run([dict(base, **{name: value})])[0])[measure]
+        probes.append((value, result))
+        print(f"{name}={value:.4f}  {measure} {result:.3f}", flush=True)
+        return result
+
+    probes = []
+    if probe(low) >= target or probe(high) < target:
+        return None, probes
+    while high - low > tolerance:
+        middle = (low + high) / 2
+        if probe(middle) >= target:
+            high = middle
+        else:
+            low = middle
+    return (low + high) / 2, probes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Przeglad parametrow pozaru z pamiecia wynikow")
+    parser.add_argument('--variant', default='koncowy', choices=VARIANTS)
+    parser.add_argument('--size', default='200x200')
+    parser.add_argument('--grid', nargs='*', type=parse_assignment, default=[],
+                        help="np. density=0.4:0.8:0.05 wind=0,1,3 weather=normal,dry")
+    parser.add_argument('--critical', type=parse_assignment, help="bisekcja progu, np. density=0.3:0.9")
+    parser.add_argument('--measure', default='burned_mean', choices=['burned_mean', 'spanning'],
+                        help="miara progu: średnia część spalonych drzew albo szansa przejścia ognia")
+    parser.add_argument('--target', type=float, default=0.5, help="wartość miary w progu")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="szerokość przedziału końca bisekcji")
+    parser.add_argument('--ignition', default='front', choices=sorted(IGNITIONS))
+    parser.add_argument('--replicas', type=int, default=8)
+    parser.add_argument('--max-steps', type=int, default=MAX_STEPS)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cache', default=CACHE_DIR, help="katalog pamięci wyników")
+    parser.add_argument('--output', help="plik CSV z wynikami punktów")
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(args.variant)
+    base = default_parameters(module)
+    grid = {name: parse_values(name, values) for name, values in args.grid}
+    presets = getattr(module, 'WEATHER_PRESETS', {'normal': None})
+    for preset in grid.get('weather', [base['weather']]):
+        if preset not in presets:
+            parser.error(f"{args.variant} nie ma pogody {preset} (dostepne: {', '.join(presets)})")
+
+    cache = ResultCache(args.cache, code_version())
+    runner = SweepRunner(args.variant, args.size, args.ignition, args.max_steps,
+                         args.replicas, args.seed, cache, args.jobs)
+    start = time.perf_counter()
+
+    if args.critical:
+        name, values = args.critical
+        low, high = (float(v) for v in values.split(':')[:2])
+        estimate, _ = bisect(runner, dict(base, **{n: v[0] for n, v in grid.items()}),
+                             name, low, high, args.tolerance, args.measure, args.target)
+        if estimate is None:
+            print(f"Przedzial {low}:{high} nie obejmuje progu dla {name}")
+        else:
+            print(f"Prog {name} ~ {estimate:.4f} (+/- {args.tolerance / 2:.4f})")
+    else:
+        names = list(grid)
+        points = [dict(base, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+        rows = []
+        for params, results in zip(points, runner.run(points)):
+            rows.append(dict(params, **summarize(results)))
+        print(' '.join(f"{n:>9}" for n in names) + f" {'spalone':>8} {'odch.':>6} {'przejscie':>9} {'kroki':>7}")
+        for row in rows:
+            print(' '.join(f"{row[n]:>9}" for n in names) +
+                  f" {row['burned_mean']:8.3f} {row['burned_std']:6.3f} {row['spanning']:9.2f} {row['steps_mean']:7.0f}")
+        if args.output:
+            with open(args.output, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+
+    print(f"{runner.computed} powtorek policzonych, {runner.reused} z pamieci ({args.cache}), "
+          f"{time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Okno pygame niepotrzebne - symulacje tworzone są z headless=True
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
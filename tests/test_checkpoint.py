@@ -0,0 +1,28 @@
+import random
+
+import numpy as np
+
+import koncowy1
+from checkpoint import read_meta
+
+
+def test_loaded_arrays_do_not_keep_the_file(tmp_path):
+    random.seed(0)
+    np.random.seed(0)
+    sim = koncowy1.ForestFireSimulation(80, 60, 4, headless=True)
+    sim.start_fire(40, 30)
+    for _ in range(10):
+        sim._do_simulation_step()
+    path = str(tmp_path / 'stan.ffsim')
+    sim.save(path)
+
+    loaded = koncowy1.ForestFireSimulation(80, 60, 4, headless=True)
+    loaded.load(path)
+    assert not any(isinstance(value, np.memmap) for value in vars(loaded).values())
+    grid = loaded.grid.copy()
+    loaded._do_simulation_step()
+    loaded.save(path)  # Ten sam plik, z którego wczytano
+    assert read_meta(path)['step_count'] == 11
+    (tmp_path / 'stan.ffsim').unlink()
+    loaded._do_simulation_step()
+    assert loaded.grid.shape == grid.shape
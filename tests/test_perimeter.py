@@ -0,0 +1,30 @@
+import random
+
+import numpy as np
+import pytest
+
+import koncowy
+import koncowy1
+import koncowy2
+from metrics import fire_perimeter
+from rules import FIRE, TREE_MATURE
+
+
+@pytest.mark.parametrize('module', [koncowy, koncowy1, koncowy2])
+def test_incident_perimeters_match_fire_perimeter_at_border(module):
+    """Obwody pożarów przy brzegu mapy sumują się do fire_perimeter - ta sama definicja"""
+    random.seed(0)
+    np.random.seed(0)
+    sim = module.ForestFireSimulation(80, 60, 4, headless=True)
+    sim.grid[:, :] = TREE_MATURE
+    sim.rebuild_map()
+    sim.start_fire(0, 30, 3)  # Ognisko na lewym brzegu
+    sim.start_fire(79, 0, 2)  # i w rogu
+    assert np.count_nonzero(np.asarray(sim.grid)[:, 0] == FIRE) > 0
+    for _ in range(8):
+        sim._do_simulation_step()
+        grid = np.asarray(sim.grid)
+        burning = np.flatnonzero(grid.ravel() == FIRE)
+        assert burning.size > 0
+        total = sum(record['perimeter'] for record in sim.incidents.incidents(sim.step_count, active_only=True))
+        assert total == fire_perimeter(burning, grid.ravel(), sim.grid_width, sim.grid_height)
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+import koncowy
+import koncowy1
+import koncowy2
+from risk import RISK_HORIZON
+from rules import FIRE, TREE_MATURE
+
+
+def make_sim(module):
+    random.seed(0)
+    np.random.seed(0)
+    return module.ForestFireSimulation(120, 80, 4, headless=True)
+
+
+def drive_idle_loop(sim):
+    """Jak pętla okna: update_risk co klatkę, dopóki is_idle() nie pozwoli czekać na zdarzenie"""
+    frames = 0
+    while not sim.is_idle():
+        sim.update()
+        if sim.risk is not None:
+            sim.update_risk()
+        frames += 1
+        assert frames <= RISK_HORIZON
+    return frames
+
+
+def test_risk_converges_before_ignition():
+    sim = make_sim(koncowy)
+    sim.grid[20:60, 30:90] = TREE_MATURE
+    sim.grid[39:42, 59:62] = FIRE  # Ogień bez start_fire - symulacja stoi
+    sim.fire_intensity[39:42, 59:62] = 1.0
+    sim.toggle_risk()
+    assert not sim.is_idle()
+    assert drive_idle_loop(sim) > 1
+    assert sim.risk.done
+    assert sim.step_count == 0
+    assert (sim.risk.risk() > 0.5).sum() > 1
+
+
+@pytest.mark.parametrize('module', [koncowy1, koncowy2])
+def test_risk_converges_while_paused(module):
+    sim = make_sim(module)
+    sim.grid[20:60, 30:90] = TREE_MATURE
+    sim.start_fire(60, 40)
+    sim.paused = True
+    sim.toggle_risk()
+    drive_idle_loop(sim)
+    assert sim.risk.done
+    assert sim.step_count == 0
+    assert sim.is_idle()
+
+
+def test_idle_without_risk():
+    sim = make_sim(koncowy)
+    assert sim.is_idle()
+    sim.toggle_risk()
+    assert sim.is_idle()  # Bez ognia mapa ryzyka nie ma czego liczyć
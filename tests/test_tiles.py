@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+
+import koncowy
+from rules import ASH, EMPTY, TREE_MATURE, TREE_OLD, TREE_YOUNG
+
+
+def make_sim(seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    sim = koncowy.ForestFireSimulation(100, 96, 4, headless=True)
+    sim.fire_started = True
+    return sim
+
+
+def test_sleeping_tiles_age_like_full_step():
+    sim = make_sim()
+    sim.p_grow = 0.0
+    sim.p_ash_decay = 0.0
+    grid, ages = sim.grid.copy(), sim.age_grid.copy()
+    for _ in range(120):
+        sim._do_simulation_step()
+        grid, _ = sim.rules.step(grid, ages, np.zeros_like(sim.fire_intensity), sim)
+    assert sim.tiles.active_fraction(sim.step_count) < 0.5
+    sim.tiles.sync_ages(sim.grid, sim.age_grid, sim.step_count)
+    np.testing.assert_array_equal(sim.grid, grid)
+    np.testing.assert_array_equal(sim.age_grid, ages)
+
+
+def test_planned_regrowth_matches_per_step_chance():
+    sim = make_sim()
+    sim.grid.fill(EMPTY)
+    sim.grid[:, :50] = ASH
+    sim.rebuild_map()
+    sim.p_grow = 0.01
+    sim.p_ash_decay = 0.05
+    steps = 40
+    for _ in range(steps):
+        sim._do_simulation_step()
+    assert sim.tiles.active_fraction(sim.step_count) == 0
+    empty_side = sim.grid[:, 50:]
+    grown = np.isin(empty_side, [TREE_YOUNG, TREE_MATURE, TREE_OLD]).mean()
+    assert abs(grown - (1 - (1 - sim.p_grow) ** steps)) < 0.03
+    ash_left = (sim.grid[:, :50] == ASH).mean()
+    assert abs(ash_left - (1 - sim.p_ash_decay) ** steps) < 0.03
+    # Drzewa z planu mają wiek liczony od kroku odrostu
+    sim.tiles.sync_ages(sim.grid, sim.age_grid, sim.step_count)
+    trees = sim.grid == TREE_YOUNG
+    assert sim.age_grid[trees].max() < steps
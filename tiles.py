@@ -0,0 +1,208 @@
+import math
+
+import numpy as np
+
+from rules import has_neighbor, param_value
+
+TILE_SIZE = 32
+
+NEVER = np.iinfo(np.int64).max // 2  # Krok "nigdy" dla kafelków bez dojrzewających drzew
+
+
+class TileActivityIndex:
+    """Podział siatki na kafelki z flagą aktywności.
+
+    Kafelek jest aktywny, gdy zawiera stan, który zmienia się w każdym kroku
+    (ogień, pełzająca pustynia). Uśpione kafelki są pomijane przez krok symulacji.
+    Drzewa w uśpionych kafelkach starzeją się leniwie - wiek jest nadrabiany przy
+    przebudzeniu, a kafelek budzi się sam w kroku, w którym najstarsze drzewo
+    przekroczy próg dojrzewania.
+
+    Przejścia losowe (popiół -> gleba, odrost lasu) nie trzymają kafelka w pamięci
+    kroku: każda komórka uśpionego kafelka ma zaplanowany krok następnego przejścia
+    z rozkładu geometrycznego - tego samego, co losowanie w każdym kroku. Rozkład
+    nie ma pamięci, więc plan można w każdej chwili wylosować od nowa.
+
+    Komórki podawane są jako płaskie indeksy siatki, pogrupowane kafelkami.
+    """
+
+    def __init__(self, height, width, active_states, age_thresholds, spreading_states, random_rules=(),
+                 tile_size=TILE_SIZE):
+        self.height = height
+        self.width = width
+        self.tile_size = tile_size
+        self.tiles_y = math.ceil(height / tile_size)
+        self.tiles_x = math.ceil(width / tile_size)
+
+        self.active_states = list(active_states)
+        self.age_thresholds = dict(age_thresholds)  # stan -> wiek, po którym drzewo dojrzewa
+        self.spreading_states = list(spreading_states)  # stany, które przechodzą na sąsiadów
+        self.random_rules = list(random_rules)  # reguły 'random' z tabeli - planowane w uśpionych kafelkach
+
+        shape = (self.tiles_y, self.tiles_x)
+        self.active = np.ones(shape, dtype=bool)
+        self.wake_step = np.zeros(shape, dtype=np.int64)
+        self.last_step = np.zeros(shape, dtype=np.int64)
+        self.random_step = np.full(shape, NEVER, dtype=np.int64)  # Najbliższe zaplanowane przejście losowe
+        self.due = np.full(height * width, NEVER, dtype=np.int64)  # Krok przejścia losowego komórki
+        self.rates = None  # Prawdopodobieństwa reguł losowych, z którymi policzono due
+
+        # Położenie komórek wewnątrz kafelka (wiersz, kolumna)
+        self.local_y, self.local_x = np.divmod(np.arange(tile_size * tile_size), tile_size)
+
+    def due_tiles(self, step):
+        """Płaskie indeksy kafelków do przetworzenia w danym kroku"""
+        return np.flatnonzero(self.active | (self.wake_step <= step))
+
+    def active_fraction(self, step):
+        return self.due_tiles(step).size / self.active.size
+
+    def active_cells(self, step):
+        """(cells, cell_tiles) - komórki aktywnych kafelków i kafelek każdej z nich"""
+        return self.tile_cells(self.due_tiles(step))
+
+    def tile_cells(self, tiles):
+        """(cells, cell_tiles) - komórki kafelków tiles (płaskie indeksy) i kafelek każdej z nich"""
+        ty, tx = np.divmod(tiles, self.tiles_x)
+        ys = (ty * self.tile_size)[:, None] + self.local_y[None, :]
+        xs = (tx * self.tile_size)[:, None] + self.local_x[None, :]
+        inside = (ys < self.height) & (xs < self.width)
+
+        cells = (ys * self.width + xs)[inside]
+        cell_tiles = np.broadcast_to(tiles[:, None], ys.shape)[inside]
+        return cells, cell_tiles
+
+    def wake_region(self, x0, y0, x1, y1):
+        """Budzi kafelki pokrywające prostokąt komórek [x0, x1] x [y0, y1]"""
+        tx0 = max(0, x0 // self.tile_size)
+        ty0 = max(0, y0 // self.tile_size)
+        tx1 = min(self.tiles_x - 1, x1 // self.tile_size)
+        ty1 = min(self.tiles_y - 1, y1 // self.tile_size)
+        if tx0 <= tx1 and ty0 <= ty1:
+            self.active[ty0:ty1 + 1, tx0:tx1 + 1] = True
+
+    def wake_cell(self, x, y):
+        self.wake_region(x, y, x, y)
+
+    def catch_up_ages(self, grid, age_grid, cells, cell_tiles, step):
+        """Nadrabia starzenie drzew z kroków, w których kafelek spał"""
+        missed = step - 1 - self.last_step.ravel()[cell_tiles]
+        aging = (missed > 0) & np.isin(grid.ravel()[cells], list(self.age_thresholds))
+        age_flat = age_grid.ravel()
+        age_flat[cells[aging]] += missed[aging].astype(age_grid.dtype)
+
+    def sync_ages(self, grid, age_grid, step, rows=slice(None), cols=slice(None)):
+        """Wiek drzew uśpionych kafelków wycinka [rows, cols] aktualny na koniec kroku step -
+        przed rysowaniem wieku i zapisem stanu"""
+        y0, y1 = rows.indices(self.height)[:2]
+        x0, x1 = cols.indices(self.width)[:2]
+        if y1 <= y0 or x1 <= x0:
+            return
+        region = np.zeros_like(self.active)
+        region[y0 // self.tile_size:(y1 - 1) // self.tile_size + 1,
+               x0 // self.tile_size:(x1 - 1) // self.tile_size + 1] = True
+        tiles = np.flatnonzero(region & (self.last_step < step))
+        if tiles.size == 0:
+            return
+        cells, cell_tiles = self.tile_cells(tiles)
+        self.catch_up_ages(grid, age_grid, cells, cell_tiles, step + 1)
+        self.last_step.ravel()[tiles] = step
+
+    def refresh(self, old_grid, grid, age_grid, cells, cell_tiles, step, params):
+        """Aktualizuje flagi przetworzonych kafelków i budzi sąsiadów przy krawędzi ognia.
+
+        old_grid to stan sprzed kroku - ogień przy krawędzi mógł w tym kroku
+        przeskoczyć do sąsiedniego, uśpionego kafelka. W uśpionych kafelkach
+        wykonuje zaplanowane na ten krok przejścia losowe (params - prawdopodobieństwa).
+        """
+        rates = tuple(float(param_value(params, rule['probability'])) for rule in self.random_rules)
+        if rates != self.rates:
+            # Zmiana pogody albo parametrów - plan od nowa dla całej mapy, od bieżącego kroku
+            self.rates = rates
+            self._plan(old_grid, *self.tile_cells(np.arange(self.active.size)), step - 1)
+        self._apply_planned(old_grid, grid, age_grid, step)
+        if cells.size == 0:
+            return
+
+        starts = np.flatnonzero(np.r_[True, cell_tiles[1:] != cell_tiles[:-1]])
+        tiles = cell_tiles[starts]
+        states = grid.ravel()[cells]
+
+        self.active.ravel()[tiles] = np.logical_or.reduceat(np.isin(states, self.active_states), starts)
+        self.last_step.ravel()[tiles] = step
+
+        # Najbliższy krok, w którym któreś drzewo przekroczy próg wieku
+        remaining = np.full(cells.size, NEVER, dtype=np.int64)
+        ages = age_grid.ravel()[cells]
+        for state, threshold in self.age_thresholds.items():
+            aging = states == state
+            remaining[aging] = np.maximum(1, threshold + 1 - ages[aging].astype(np.int64))
+        self.wake_step.ravel()[tiles] = step + np.minimum.reduceat(remaining, starts)
+
+        # Sąsiedzi ognia leżący w innych kafelkach
+        spreading = cells[np.isin(old_grid.ravel()[cells], self.spreading_states)]
+        ys, xs = np.divmod(spreading, self.width)
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                ny = ys + dy
+                nx = xs + dx
+                inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+                self.active[ny[inside] // self.tile_size, nx[inside] // self.tile_size] = True
+
+        # Usypiane kafelki - plan przejść losowych od następnego kroku
+        sleeping = ~self.active.ravel()[cell_tiles]
+        self._plan(grid, cells[sleeping], cell_tiles[sleeping], step)
+
+    def _apply_planned(self, old_grid, grid, age_grid, step):
+        """Przejścia losowe zaplanowane na krok step w kafelkach pominiętych przez krok reguł"""
+        tiles = np.flatnonzero(~self.active & (self.wake_step > step) & (self.random_step <= step))
+        if tiles.size == 0:
+            return
+        cells, cell_tiles = self.tile_cells(tiles)
+        # Krok reguł omija te kafelki - wiek nadrabiany także za bieżący krok (nikt w nim nie dojrzewa)
+        self.catch_up_ages(old_grid, age_grid, cells, cell_tiles, step + 1)
+        self.last_step.ravel()[tiles] = step
+
+        planned = self.due[cells] <= step
+        hits, hit_tiles = cells[planned], cell_tiles[planned]
+        old_flat = old_grid.ravel()
+        flat = grid.ravel()
+        age_flat = age_grid.ravel()
+        states = old_flat[hits]
+        free = flat[hits] == states  # Pustynia z sąsiedniego kafelka wygrywa - jak w RuleKernel.step
+        for rule in self.random_rules:
+            moving = hits[free & (states == rule['from'])]
+            if 'blocked_by_neighbor' in rule:
+                moving = moving[~has_neighbor(old_flat, moving, rule['blocked_by_neighbor'], self.width, self.height)]
+            flat[moving] = rule['into']
+            if 'set_age' in rule:
+                age_flat[moving] = rule['set_age']
+
+        # Nowy plan dla komórek po przejściu; młode drzewa budzą kafelek, gdy dorosną
+        states = flat[hits]
+        self._schedule(hits, states, step)
+        wake_flat = self.wake_step.ravel()
+        for state, threshold in self.age_thresholds.items():
+            aging = states == state
+            ages = age_flat[hits[aging]].astype(np.int64)
+            np.minimum.at(wake_flat, hit_tiles[aging], step + np.maximum(1, threshold + 1 - ages))
+        self._nearest_random(cells, cell_tiles)
+
+    def _plan(self, grid, cells, cell_tiles, step):
+        """Plan przejść losowych komórek cells (pogrupowanych kafelkami) od kroku step + 1"""
+        if cells.size == 0:
+            return
+        self._schedule(cells, grid.ravel()[cells], step)
+        self._nearest_random(cells, cell_tiles)
+
+    def _schedule(self, cells, states, step):
+        due = np.full(cells.size, NEVER, dtype=np.int64)
+        for rule, p in zip(self.random_rules, self.rates):
+            match = states == rule['from']
+            if p > 0:
+                due[match] = step + np.random.geometric(min(p, 1.0), np.count_nonzero(match))
+        self.due[cells] = due
+
+    def _nearest_random(self, cells, cell_tiles):
+        starts = np.flatnonzero(np.r_[True, cell_tiles[1:] != cell_tiles[:-1]])
+        self.random_step.ravel()[cell_tiles[starts]] = np.minimum.reduceat(self.due[cells], starts)
@@ -0,0 +1,141 @@
+import csv
+import time
+from collections import deque
+
+import numpy as np
+
+TIMING_WINDOW = 120  # Liczba ostatnich klatek, z których liczone są statystyki
+OVERLAY_REFRESH_MS = 500  # Nakładka nie musi się zmieniać co klatkę
+
+# Fazy klatki - kolejność kolumn w CSV i wierszy w nakładce
+PHASES = ['step', 'tiles', 'rules', 'stats', 'metrics', 'record', 'export', 'draw', 'draw_ui', 'flip', 'frame']
+
+
+class _Probe:
+    """Mierzy czas bloku with i dolicza go do bieżącej klatki"""
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+
+
+class _NullProbe:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_PROBE = _NullProbe()
+
+
+class PhaseTimer:
+    """Czasy faz pętli głównej - kroczące min/średnia/p95 z ostatnich klatek.
+
+    Wyłączony timer zwraca pustą sondę, więc pomiary prawie nic nie kosztują.
+    Faza wywołana kilka razy w klatce (kilka kroków na klatkę) jest sumowana.
+    """
+
+    def __init__(self, phases=PHASES, window=TIMING_WINDOW):
+        self.phases = list(phases)
+        self.samples = {name: deque(maxlen=window) for name in self.phases}
+        self.current = {}
+        self.frame_start = None
+        self.frame_index = 0
+
+        self.show = False  # Nakładka w panelu
+        self.csv_file = None
+        self.csv_writer = None
+        self.csv_path = None
+
+    @property
+    def enabled(self):
+        return self.show or self.csv_writer is not None
+
+    def measure(self, name):
+        if not self.enabled:
+            return NULL_PROBE
+        return _Probe(self, name)
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter() if self.enabled else None
+
+    def end_frame(self):
+        """Zamyka klatkę: próbki trafiają do okna statystyk i do CSV"""
+        if self.frame_start is not None and self.enabled:
+            self.add('frame', time.perf_counter() - self.frame_start)
+        self.frame_start = None
+        if not self.current:
+            return
+        self.frame_index += 1
+        for name, seconds in self.current.items():
+            self.samples[name].append(seconds)
+        if self.csv_writer is not None:
+            row = [self.frame_index, f"{time.time():.3f}"]
+            row += [f"{self.current[name] * 1000:.3f}" if name in self.current else ""
+                    for name in self.phases]
+            self.csv_writer.writerow(row)
+        self.current = {}
+
+    def stats(self, name):
+        """(min, średnia, p95) w milisekundach lub None, gdy brak próbek"""
+        samples = self.samples[name]
+        if not samples:
+            return None
+        values = np.fromiter(samples, dtype=np.float64, count=len(samples)) * 1000
+        return values.min(), values.mean(), np.percentile(values, 95)
+
+    def toggle_overlay(self):
+        self.show = not self.show
+        if not self.enabled:
+            self.reset()
+
+    def reset(self):
+        for samples in self.samples.values():
+            samples.clear()
+        self.current = {}
+
+    def start_csv(self, path=None):
+        """Zaczyna zapisywać czasy każdej klatki do pliku CSV"""
+        if self.csv_writer is not None:
+            return self.csv_path
+        if path is None:
+            path = time.strftime("timing_%Y%m%d_%H%M%S.csv")
+        self.csv_path = path
+        self.csv_file = open(path, 'w', newline='', encoding='utf-8')
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(['frame', 'time'] + [f"{name}_ms" for name in self.phases])
+        return path
+
+    def stop_csv(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+        self.csv_file = None
+        self.csv_writer = None
+        if not self.enabled:
+            self.reset()
+
+    def toggle_csv(self):
+        if self.csv_writer is None:
+            self.start_csv()
+        else:
+            self.stop_csv()
+
+    def overlay_rows(self):
+        """Wiersze nakładki: (faza, min, średnia, p95) dla faz, które mają próbki"""
+        rows = []
+        for name in self.phases:
+            values = self.stats(name)
+            if values is not None:
+                rows.append((name,) + tuple(values))
+        return rows
@@ -0,0 +1,85 @@
+"""Wiatr zmienny w przestrzeni - wektor w każdej komórce, wyprowadzony z terenu.
+
+Globalny wiatr (wind_direction, wind_strength) zmieniany jest przez teren:
+  - za skałami (ROCK) wiatr słabnie - cień sięga SHELTER_DISTANCE komórek z wiatrem,
+  - przy wodzie (WATER) wiatr idzie korytem rzeki - zostaje tylko składowa wzdłuż
+    osi rzeki, wzmocniona CHANNEL_GAIN razy.
+Z pola liczone są mnożniki rozprzestrzeniania (8, wysokość * szerokość) - tym samym
+wzorem co RuleKernel.wind_modifiers, dla wiatru w komórce celu. Tablica liczona jest
+tylko przy zmianie wiatru lub reguł, więc krok kosztuje tyle co przy wietrze jednolitym.
+"""
+import numpy as np
+
+from rules import DIRECTIONS, ROCK, WATER, dilate, shifted
+
+SHELTER_DISTANCE = 6  # Zasięg cienia za skałą (komórki)
+SHELTER_FACTOR = 0.3  # Siła wiatru tuż za skałą - dalej rośnie liniowo do pełnej
+CHANNEL_DISTANCE = 3  # Odległość od wody, w której wiatr idzie wzdłuż rzeki
+CHANNEL_REACH = 5  # Zasięg szukania osi rzeki w każdą stronę
+CHANNEL_GAIN = 1.5  # Wzmocnienie wiatru w korycie
+# Osie, wzdłuż których może biec rzeka (kierunek i przeciwny)
+AXES = np.array([(1, 0), (0, 1), (1, 1), (1, -1)], dtype=np.float32)
+AXES /= np.linalg.norm(AXES, axis=1)[:, None]
+ARROW_SPACING = 48  # Odstęp strzałek pola w trybie W (piksele)
+ARROW_SCALE = 10  # Długość strzałki na jednostkę siły wiatru (piksele)
+
+
+class WindField:
+    """Teren mapy liczony raz; vectors i mnożniki - przy zmianie wiatru"""
+
+    def __init__(self, grid):
+        self.shape = grid.shape
+        self.rock = grid == ROCK
+        water = grid == WATER
+        self.channel = dilate(water, CHANNEL_DISTANCE)
+        # Oś rzeki: kierunek, w którym woda ciągnie się najdalej od komórki
+        reach = np.zeros((len(AXES),) + grid.shape, dtype=np.int16)
+        for a, (ax, ay) in enumerate(np.sign(AXES).astype(int)):
+            for d in range(-CHANNEL_REACH, CHANNEL_REACH + 1):
+                reach[a] += shifted(water, d * ax, d * ay)
+        self.axis = AXES[np.argmax(reach, axis=0)]  # (wysokość, szerokość, 2)
+        self.key = None
+        self.vectors = None
+        self._modifiers = None
+
+    def compute_vectors(self, wind_direction, wind_strength):
+        """(2, wysokość, szerokość) float32 - wiatr w komórkach (kierunek * siła)"""
+        wind = np.asarray(wind_direction, dtype=np.float32) * wind_strength
+        length = float(np.hypot(*wind_direction))
+        # Cień: komórka za skałą w odległości d (pod wiatr) ma wiatr osłabiony
+        shelter = np.ones(self.shape, dtype=np.float32)
+        if wind_strength > 0 and length > 0:
+            ux, uy = wind_direction[0] / length, wind_direction[1] / length
+            for d in range(SHELTER_DISTANCE, 0, -1):
+                behind = shifted(self.rock, round(d * ux), round(d * uy))
+                shelter[behind] = SHELTER_FACTOR + (1 - SHELTER_FACTOR) * (d - 1) / SHELTER_DISTANCE
+        along = self.axis @ wind  # Składowa wzdłuż osi rzeki
+        vectors = np.where(self.channel[None], CHANNEL_GAIN * along[None] * self.axis.transpose(2, 0, 1),
+                           wind[:, None, None])
+        return (vectors * shelter).astype(np.float32)
+
+    def modifiers(self, kernel, wind_direction, wind_strength):
+        """(8, wysokość * szerokość) float32 - mnożnik p dla zapłonu komórki od sąsiada z kierunku k"""
+        key = (id(kernel.table), tuple(wind_direction), wind_strength)
+        if key != self.key:
+            self.key = key
+            self.vectors = self.compute_vectors(wind_direction, wind_strength)
+            spread = kernel.table['spread']
+            vx, vy = self.vectors[0].ravel(), self.vectors[1].ravel()
+            windy = (vx != 0) | (vy != 0)
+            self._modifiers = np.ones((len(DIRECTIONS), vx.size), dtype=np.float32)
+            for k, (dx, dy) in enumerate(DIRECTIONS):
+                dot = dx * vx + dy * vy
+                self._modifiers[k] = np.where(dot > 0, 1 + spread['wind_coefficient'] * dot,
+                                              np.where(windy, spread['leeward_factor'], 1))
+        return self._modifiers
+
+    def arrows(self, x0, y0, x1, y1, spacing):
+        """(x, y, vx, vy) próbek pola co spacing komórek w prostokącie - do rysowania"""
+        if self.vectors is None:
+            return []
+        start_x = x0 + (-x0) % spacing
+        start_y = y0 + (-y0) % spacing
+        return [(x, y, float(self.vectors[0, y, x]), float(self.vectors[1, y, x]))
+                for y in range(start_y, y1, spacing) for x in range(start_x, x1, spacing)]
+